@@ -12,10 +12,16 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 
 from pathlib import Path
 import os
+import sys
+import tempfile
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 MEDIA_URL = '/media/'
+JOBS_ROOT = os.path.join(BASE_DIR, 'jobs')  # Status and output files of background jobs (api.jobs)
+AUDIT_ARCHIVE_ROOT = os.path.join(BASE_DIR, 'audit_archive')  # Monthly audit log archives (api.audit_archive)
+AUDIT_LOG_RETENTION_DAYS = 365  # archive_audit_logs moves older entries out of the LogEntry table
+BACKUP_INCREMENTAL_KEEP = 30  # Incremental backups kept in backups/store; older ones and objects only they use are pruned. 0 keeps all
 
 
 # Quick-start development settings - unsuitable for production
@@ -47,6 +53,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.ProfilingMiddleware',  # First, to time the whole request (api.profiling)
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',#INSTALLED
@@ -55,7 +62,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'auditlog.middleware.AuditlogMiddleware',
+    'api.middleware.AuditlogMiddleware',  # django-auditlog's, made async-capable for ASGI
 ]
 
 
@@ -110,6 +117,20 @@ DATABASES = {
     }
 }
 
+# Cache shared by every worker process on this host. Table versions behind the 304s
+# (api.conditional), the dashboard summary and the analytics version must be the same in
+# all of them; the default LocMemCache is per process and would let a worker that didn't
+# handle a write serve stale data. It only ever holds a handful of keys (schedules are
+# versioned in the database), so the file backend's cull on every set stays cheap. Switch
+# to django.core.cache.backends.redis.RedisCache when the app runs on more than one host.
+# Test runs get a cache of their own so they never see or clear the development one.
+TESTING = sys.argv[1:2] == ['test']
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(tempfile.gettempdir(), 'lms_test_cache') if TESTING else os.path.join(BASE_DIR, 'cache'),
+    }
+}
 
 from datetime import timedelta
 
@@ -122,6 +143,22 @@ SIMPLE_JWT = {
     'AUTH_COOKIE_SAMESITE': 'Lax',  # Use 'Lax' for local development, 'None' in production
 }
 
+# Per-process cache of users resolved from access tokens (api.authentication.user_cache)
+AUTH_USER_CACHE_TTL = 30  # Seconds; bounds how long other processes may serve a changed user. 0 disables the cache
+AUTH_USER_CACHE_SIZE = 1000  # Entries (user id + token jti) kept before the least recently used is evicted
+
+# Threads (and so database connections) per ASGI worker running the async views' queries (api.async_views)
+ASYNC_QUERY_THREADS = 16
+
+# Request profiling (api.profiling): share of requests measured, and when one counts as slow
+PROFILING_SAMPLE_RATE = 0.1  # 0 turns profiling off, 1 measures every request
+PROFILING_SLOW_REQUEST_MS = 500  # Sampled requests at least this slow are logged with their SQL
+PROFILING_WINDOW = 1000  # Most recent samples per endpoint behind the percentiles
+PROFILING_MAX_SQL = 200  # Statements kept per slow request; the rest are only counted
+PROFILING_LOG_ROOT = os.path.join(BASE_DIR, 'logs')  # slow_requests.log, rotated at PROFILING_LOG_MAX_BYTES
+PROFILING_LOG_MAX_BYTES = 10 * 1024 * 1024
+PROFILING_LOG_BACKUPS = 5
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
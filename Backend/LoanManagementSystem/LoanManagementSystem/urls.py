@@ -4,11 +4,17 @@ from django.conf.urls.static import static
 from django.conf import settings
 from api.views import login_user,logout_view,refresh_token_view,protected_view,generate_loan_report,last_backup_time,last_restore_time,create_amortization_schedule,search_members
 from api import views  
-from api.backup_restore import backup_view, restore_view  # import the views
+from api import async_views, pictures
+import os
+from api.backup_restore import backup_view, restore_view, backup_manifests  # import the views
 
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+#---DASHBOARD--------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+    path('api/dashboard/summary/', views.dashboard_summary, name='dashboard_summary'),
+#---ANALYTICS--------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+    path('api/analytics/portfolio/', views.portfolio_analytics, name='portfolio_analytics'),
 #---USERS--------------------------------------------------------------------------------------------------------------------------------------------------------------------------
     path('api/users/', views.user_list, name='user_list'),
     path('api/users/<int:pk>/', views.user_detail, name='user_detail'),
@@ -18,20 +24,35 @@ urlpatterns = [
 #---MEMBERS--------------------------------------------------------------------------------------------------------------------------------------------------------------------------
     path('api/members/', views.get_members),
     path('api/members/create/', views.create_member),
+    path('api/members/import/', views.import_members, name='import_members'),
     path('api/members/<int:pk>/update/', views.update_member),
+    path('api/members/<int:pk>/signature/', views.member_signature, name='member-signature'),
     path('api/members/search/<str:query>/', search_members, name='search-members'),
 #---LOANS--------------------------------------------------------------------------------------------------------------------------------------------------------------------------
     path('api/loans/create/', views.create_loan, name='create_loan'),
     path('api/loans/', views.get_loan, name='get_loan'),
+    path('api/loans/quote/', views.loan_quote, name='loan_quote'),
+    path('api/loans/summaries/', views.loan_summaries, name='loan_summaries'),
     path('api/loans/create/', views.create_loan, name='create_loan'),
     path('api/loans/update/<int:pk>/', views.update_loan, name='update_loan'),
+    path('api/loans/status/batch/', views.batch_update_loan_status, name='batch_update_loan_status'),
     path('api/loans/search/<int:pk>/', views.search_loan, name='search-loan'),
     path('api/loans/<int:pk>/amortization/', views.amortization_list, name='amortization-list'),
     path('api/loans/<int:pk>/amortization/create/', create_amortization_schedule, name='create-amortization-schedule'),
     path('api/loans/<int:loan_id>/report/', generate_loan_report, name='generate_loan_report'),
+    path('api/loans/reports/export/', views.create_report_export, name='create_report_export'),
+#---PAYMENTS--------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+    path('api/loans/<int:pk>/payments/', views.loan_payments, name='loan_payments'),
+    path('api/loans/<int:pk>/ledger/', views.loan_ledger, name='loan_ledger'),
+    path('api/payments/payroll/', views.post_payroll, name='post_payroll'),
+#---BACKGROUND JOBS--------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+    path('api/jobs/<str:job_id>/', views.job_status, name='job_status'),
+    path('api/jobs/<str:job_id>/cancel/', views.cancel_job, name='cancel_job'),
+    path('api/jobs/<str:job_id>/download/', views.download_job_result, name='download_job_result'),
 #---BACKUP & RESTORE--------------------------------------------------------------------------------------------------------------------------------------------------------------------------
     path('api/backup/', backup_view, name='backup'),
     path('api/backup/last/', last_backup_time, name='last_backup_time'),
+    path('api/backup/manifests/', backup_manifests, name='backup_manifests'),
     path('api/restore/', restore_view, name='restore'),
     path('api/restore/last/', last_restore_time, name='last_restore_time'),
 #---LOGIN & LOGOUT JWT--------------------------------------------------------------------------------------------------------------------------------------------------------------------------
@@ -39,8 +60,21 @@ urlpatterns = [
     path('api/logout/', logout_view),
     path('api/refresh/', refresh_token_view),
     path('api/protected/', protected_view),
+    path('api/auth/cache-stats/', views.auth_cache_stats, name='auth_cache_stats'),
+    path('api/profiling/summary/', views.profiling_summary, name='profiling_summary'),
 #---AUDIT LOGS--------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 
      path('api/auditlogs/', views.get_audit_logs, name='auditlogs-list'),
+     path('api/auditlogs/archive/', views.get_archived_audit_logs, name='auditlogs-archive'),
+     path('api/history/<str:model>/<int:pk>/', views.object_history, name='object-history'),
+     path('api/history/<str:model>/<int:pk>/state/', views.object_state, name='object-state'),
+#---ASYNC (ASGI) READ ENDPOINTS--------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+    path('api/async/dashboard/summary/', async_views.dashboard_summary, name='async-dashboard-summary'),
+    path('api/async/members/', async_views.get_members, name='async-members'),
+    path('api/async/loans/', async_views.get_loan, name='async-loans'),
+    path('api/async/loans/<int:pk>/amortization/', async_views.amortization_list, name='async-amortization-list'),
+    path('api/async/auditlogs/', async_views.get_audit_logs, name='async-auditlogs-list'),
    
-]+ static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT) # Serves media files during development
+]+ static(settings.MEDIA_URL + pictures.DERIVED_DIR + '/', view=views.serve_derived_image,
+          document_root=os.path.join(settings.MEDIA_ROOT, pictures.DERIVED_DIR)) \
+ + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT) # Serves media files during development
@@ -0,0 +1,120 @@
+from collections import namedtuple
+from functools import lru_cache
+from datetime import timedelta
+from decimal import Decimal, ROUND_CEILING, ROUND_HALF_UP
+
+# Pure amortization math: no database access, Decimal in and Decimal out.
+# api.utils persists what these functions return.
+
+CENT = Decimal('0.01')
+ZERO = Decimal('0.00')
+DUE_DATE_STEP = timedelta(days=30)  # Installments fall every 30 days from the first due date
+
+# One installment of a schedule; field names match the Amortization model
+ScheduleRow = namedtuple('ScheduleRow', ['seq', 'due_date', 'amortization', 'principal', 'interest', 'remaining_balance'])
+
+
+def to_decimal(value):
+    # Convert through str so floats like 0.1 don't carry binary noise into the schedule
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+
+def quantize(value):
+    return value.quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def monthly_rate(annual_interest):
+    # Annual percentage (e.g. 12.00) to a monthly fraction (0.01)
+    return (to_decimal(annual_interest) / Decimal('100')) / Decimal('12')
+
+
+def level_payment(principal, annual_interest, term):
+    """
+    Fixed monthly amortization that pays off `principal` over `term` months
+    (standard annuity formula, rounded up to the cent so the last installment is never larger).
+    """
+    principal = to_decimal(principal)
+    if term <= 0:
+        raise ValueError('Term must be at least one month.')
+    rate = monthly_rate(annual_interest)
+    if rate == 0:
+        payment = principal / term
+    else:
+        payment = principal * rate / (1 - (1 + rate) ** -term)
+    return payment.quantize(CENT, rounding=ROUND_CEILING)
+
+
+def build_schedule(principal, annual_interest, term, start_date, amortization):
+    """
+    Returns the full schedule as a list of ScheduleRow without touching the database.
+
+    Each month charges interest on the remaining balance, applies the rest of the fixed
+    amortization to principal, and shortens the final installment so the balance ends at zero.
+    Stops early once the loan is paid off. `start_date` is the first due date.
+    """
+    remaining_balance = quantize(to_decimal(principal))
+    amortization = to_decimal(amortization)
+    rate = monthly_rate(annual_interest)
+    due_date = start_date
+    rows = []
+
+    for seq in range(1, term + 1):
+        # Interest on the current balance, the rest of the payment goes to principal
+        interest = quantize(remaining_balance * rate)
+        principal_paid = quantize(amortization - interest)
+        payment = amortization
+
+        # Final payment: only pay what is left
+        if principal_paid > remaining_balance:
+            principal_paid = remaining_balance
+            payment = quantize(principal_paid + interest)
+
+        remaining_balance = quantize(remaining_balance - principal_paid)
+        rows.append(ScheduleRow(seq, due_date, payment, principal_paid, interest, max(remaining_balance, ZERO)))
+
+        due_date += DUE_DATE_STEP
+        if remaining_balance <= 0:
+            break
+
+    return rows
+
+
+def build_loan_schedule(loan, amortization=None):
+    # Schedule for a Loans instance; solves for the level payment when no amortization is given
+    if amortization is None:
+        amortization = level_payment(loan.loan_amount, loan.interest, loan.term)
+    return build_schedule(loan.loan_amount, loan.interest, loan.term, loan.payment_start_date, amortization)
+
+
+@lru_cache(maxsize=1024)
+def quote_schedule(principal, annual_interest, term, start_date, amortization=None):
+    """
+    Memoized schedule for a loan quote. Arguments must already be normalized (see
+    normalize_quote) so equal loans share a cache entry; the result is a tuple so
+    cached schedules can't be modified by callers.
+    """
+    if amortization is None:
+        amortization = level_payment(principal, annual_interest, term)
+    return tuple(build_schedule(principal, annual_interest, term, start_date, amortization))
+
+
+def normalize_quote(principal, annual_interest, term, start_date, amortization=None):
+    # Canonical cache key: cents for money, a plain int for the term
+    return (
+        quantize(to_decimal(principal)),
+        quantize(to_decimal(annual_interest)),
+        int(term),
+        start_date,
+        None if amortization is None else quantize(to_decimal(amortization)),
+    )
+
+
+def summarize_schedule(schedule):
+    # Totals shown next to a quote
+    return {
+        'amortization': schedule[0].amortization if schedule else ZERO,
+        'installments': len(schedule),
+        'total_interest': sum((row.interest for row in schedule), ZERO),
+        'total_payment': sum((row.amortization for row in schedule), ZERO),
+        'final_balance': schedule[-1].remaining_balance if schedule else ZERO,
+    }
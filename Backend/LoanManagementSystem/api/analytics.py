@@ -0,0 +1,250 @@
+import datetime
+import threading
+import time
+from decimal import Decimal
+import numpy as np
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import BigIntegerField, F
+from django.db.models.functions import Cast, Round
+from .models import Loans, Amortization
+from .utils import PORTFOLIO_VERSION_KEY
+
+# Portfolio analytics over released loans.
+#
+# Schedules are loaded once into columnar NumPy arrays (money as integer cents, dates
+# as datetime64[D]) and every figure is computed with vectorized group-bys (bincount),
+# so a 1M-row portfolio is analysed in tens of milliseconds. The arrays are kept per
+# process and reloaded when PORTFOLIO_VERSION_KEY (in the shared cache) changes, which
+# signals bump on writes, or once they are SNAPSHOT_MAX_AGE old, which bounds how long a
+# write that sends no signal can go unseen. Finished results are cached per (as_of, months).
+
+DEFAULT_MONTHS = 12
+MAX_MONTHS = 120
+FETCH_SIZE = 100_000  # Rows converted to arrays per batch while loading
+AGING_EDGES = (30, 60, 90, 180)  # Days past due closing each aging bucket
+AGING_LABELS = ('1-30', '31-60', '61-90', '91-180', '180+')
+RESULT_CACHE_TIMEOUT = 300  # Seconds; a version bump makes older results unreachable earlier
+SNAPSHOT_MAX_AGE = 300  # Seconds a process reuses its arrays without a version bump
+
+
+class Portfolio:
+    """
+    Columnar snapshot of released loans and their schedules.
+
+    Loan arrays are indexed by loan position (sorted by id); schedule arrays hold one entry
+    per installment, sorted by (loan, seq), with loan_idx pointing into the loan arrays.
+    """
+    def __init__(self, loan_ids, loan_types, branches, rates, terms, amounts, loan_idx, due, principal, interest, balance):
+        self.loan_ids = loan_ids
+        self.type_labels, self.type_codes = np.unique(loan_types, return_inverse=True)
+        self.branch_labels, self.branch_codes = np.unique(branches, return_inverse=True)
+        self.rates = rates  # Annual interest, percent
+        self.terms = terms
+        self.amounts = amounts  # Cents
+        self.loan_idx = loan_idx
+        self.due = due
+        self.principal = principal  # Cents
+        self.interest = interest  # Cents
+        self.balance = balance  # Cents, remaining after the installment
+
+    def __len__(self):
+        return len(self.due)
+
+    @classmethod
+    def from_database(cls):
+        loans = list(
+            Loans.objects.filter(status='released').order_by('id')
+            .values_list('id', 'loan_type', 'member__branch_of_service', 'interest', 'term', 'loan_amount')
+        )
+        ids, types, branches, rates, terms, amounts = zip(*loans) if loans else ((),) * 6
+        loan_ids = np.array(ids, dtype=np.int64)
+
+        # Money is read as integer cents computed by the database, which keeps the fetch exact
+        # and skips building a Decimal per value
+        cents = {name: Cast(Round(F(name) * 100), BigIntegerField()) for name in ('principal', 'interest', 'remaining_balance')}
+        schedule = (
+            Amortization.objects.filter(loan__status='released')
+            .annotate(**{f'{name}_cents': expression for name, expression in cents.items()})
+            .order_by()  # Sorted below; letting the database sort costs more than lexsort
+            .values_list('loan_id', 'seq', 'due_date', 'principal_cents', 'interest_cents', 'remaining_balance_cents')
+        )
+        columns = fetch_columns(schedule, (np.int64, np.int64, 'datetime64[D]', np.int64, np.int64, np.int64))
+        order = np.lexsort((columns[1], columns[0]))
+        loan_column, _, due, principal, interest, balance = (column[order] for column in columns)
+
+        return cls(
+            loan_ids=loan_ids,
+            loan_types=np.array(types, dtype=str),
+            branches=np.array(branches, dtype=str),
+            rates=np.array([float(rate) for rate in rates], dtype=np.float64),
+            terms=np.array(terms, dtype=np.int64),
+            amounts=np.array([int(amount * 100) for amount in amounts], dtype=np.int64),
+            loan_idx=np.searchsorted(loan_ids, loan_column),
+            due=due, principal=principal, interest=interest, balance=balance,
+        )
+
+
+def fetch_columns(queryset, dtypes):
+    """
+    Runs a values_list() queryset on a raw cursor and returns one array per column.
+    Rows are converted in FETCH_SIZE batches, so Python tuples for the whole table
+    never exist at once.
+    """
+    sql, params = queryset.query.sql_with_params()
+    batches = [[] for _ in dtypes]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        while rows := cursor.fetchmany(FETCH_SIZE):
+            for batch, column, dtype in zip(batches, zip(*rows), dtypes):
+                batch.append(to_dates(column) if dtype == 'datetime64[D]' else np.array(column, dtype=dtype))
+    return [np.concatenate(batch) if batch else np.array([], dtype=dtype) for batch, dtype in zip(batches, dtypes)]
+
+
+def to_dates(values):
+    """
+    datetime64[D] array from dates or ISO strings (SQLite). Schedules repeat a small set of
+    due dates, so each distinct value is parsed once and the rest is an index lookup.
+    """
+    distinct = {}
+    codes = np.array([distinct.setdefault(value, len(distinct)) for value in values], dtype=np.int64)
+    return np.array(list(distinct), dtype='datetime64[D]')[codes]
+
+
+_snapshot = {'version': None, 'portfolio': None, 'loaded_at': 0.0}
+_snapshot_lock = threading.Lock()
+
+
+def current_version():
+    # A missing version (cache cleared or culled) starts afresh, so no snapshot built for an older one matches it
+    return cache.get_or_set(PORTFOLIO_VERSION_KEY, time.time_ns, None)
+
+
+def get_portfolio():
+    # The process-wide snapshot (read-only once built), reloaded after a version bump or SNAPSHOT_MAX_AGE
+    version = current_version()
+    with _snapshot_lock:
+        if _snapshot['version'] != version or time.monotonic() - _snapshot['loaded_at'] > SNAPSHOT_MAX_AGE:
+            _snapshot['portfolio'] = Portfolio.from_database()
+            _snapshot['version'] = version
+            _snapshot['loaded_at'] = time.monotonic()
+        return _snapshot['portfolio']
+
+
+def to_money(cents):
+    return Decimal(int(round(cents))).scaleb(-2)
+
+
+def weighted_averages(codes, labels, weights, rates, remaining, count_per_code):
+    # Per group: outstanding balance and the rate / remaining term weighted by it
+    size = len(labels)
+    outstanding = np.bincount(codes, weights=weights, minlength=size)
+    rate_sum = np.bincount(codes, weights=weights * rates, minlength=size)
+    term_sum = np.bincount(codes, weights=weights * remaining, minlength=size)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rate = np.where(outstanding > 0, rate_sum / outstanding, 0)
+        term = np.where(outstanding > 0, term_sum / outstanding, 0)
+    return [
+        {
+            'key': str(label),
+            'loans': int(count_per_code[i]),
+            'outstanding_principal': to_money(outstanding[i]),
+            'weighted_average_rate': round(float(rate[i]), 4),
+            'weighted_average_remaining_term': round(float(term[i]), 2),
+        }
+        for i, label in enumerate(labels)
+    ]
+
+
+def analyze(portfolio, as_of, months=DEFAULT_MONTHS):
+    """
+    Projections for `portfolio` as of the date `as_of`:
+
+    - collections_by_month: principal and interest scheduled in each of the next `months`
+      calendar months (the current month counts from as_of), with totals
+    - interest_income_forecast: the same months' interest split by loan type
+    - aging: installments already due, bucketed by days past due
+    - by_loan_type / by_branch_of_service: outstanding principal, weighted average rate
+      and remaining term (weights: outstanding principal)
+    """
+    p = portfolio
+    today = np.datetime64(as_of, 'D')
+    first_month = today.astype('datetime64[M]')
+    loan_count = len(p.loan_ids)
+
+    # Collections: future installments grouped by month offset
+    month = (p.due.astype('datetime64[M]') - first_month).astype(np.int64)
+    upcoming = (p.due >= today) & (month < months)
+    month_up = month[upcoming]
+    principal_by_month = np.bincount(month_up, weights=p.principal[upcoming], minlength=months)
+    interest_by_month = np.bincount(month_up, weights=p.interest[upcoming], minlength=months)
+    type_count = len(p.type_labels)
+    type_up = p.type_codes[p.loan_idx[upcoming]]
+    interest_by_type = np.bincount(month_up * type_count + type_up, weights=p.interest[upcoming],
+                                   minlength=months * type_count).reshape(months, type_count)
+
+    # Aging: installments whose due date has passed
+    past = p.due < today
+    days_past = (today - p.due[past]).astype(np.int64)
+    bucket = np.searchsorted(AGING_EDGES, days_past, side='left')
+    amount_past = p.principal[past] + p.interest[past]
+    aging_amount = np.bincount(bucket, weights=amount_past, minlength=len(AGING_LABELS))
+    aging_count = np.bincount(bucket, minlength=len(AGING_LABELS))
+
+    # Outstanding principal per loan: balance after its last installment before as_of
+    due_count = np.bincount(p.loan_idx[past], minlength=loan_count)
+    total_count = np.bincount(p.loan_idx, minlength=loan_count)
+    starts = np.searchsorted(p.loan_idx, np.arange(loan_count))
+    last_row = np.clip(starts + due_count - 1, 0, max(len(p) - 1, 0))
+    balance_after = p.balance[last_row] if len(p) else np.zeros(loan_count, dtype=np.int64)
+    outstanding = np.where(due_count > 0, balance_after, p.amounts).astype(np.float64)
+    remaining = np.where(total_count > 0, total_count - due_count, p.terms).astype(np.float64)
+
+    month_labels = np.arange(first_month, first_month + months).astype(str)
+    return {
+        'as_of': as_of,
+        'months': months,
+        'loans': loan_count,
+        'installments': len(p),
+        'collections_by_month': [
+            {
+                'month': str(label),
+                'principal': to_money(principal_by_month[i]),
+                'interest': to_money(interest_by_month[i]),
+                'total': to_money(principal_by_month[i] + interest_by_month[i]),
+            }
+            for i, label in enumerate(month_labels)
+        ],
+        'collections_total': {
+            'principal': to_money(principal_by_month.sum()),
+            'interest': to_money(interest_by_month.sum()),
+        },
+        'interest_income_forecast': [
+            {'month': str(label), **{str(t): to_money(interest_by_type[i, j]) for j, t in enumerate(p.type_labels)}}
+            for i, label in enumerate(month_labels)
+        ],
+        'aging': [
+            {'bucket': label, 'installments': int(aging_count[i]), 'amount': to_money(aging_amount[i])}
+            for i, label in enumerate(AGING_LABELS)
+        ],
+        'outstanding_principal': to_money(outstanding.sum()),
+        'by_loan_type': weighted_averages(p.type_codes, p.type_labels, outstanding, p.rates, remaining,
+                                          np.bincount(p.type_codes, minlength=type_count)),
+        'by_branch_of_service': weighted_averages(p.branch_codes, p.branch_labels, outstanding, p.rates, remaining,
+                                                  np.bincount(p.branch_codes, minlength=len(p.branch_labels))),
+    }
+
+
+def portfolio_analytics(as_of=None, months=DEFAULT_MONTHS):
+    """
+    Cached analyze() of the current portfolio. Returns (result, cached); the cache key
+    includes the portfolio version, so writes make earlier results unreachable.
+    """
+    as_of = as_of or datetime.date.today()
+    key = f'portfolio_analytics:{current_version()}:{as_of.isoformat()}:{months}'
+    result = cache.get(key)
+    if result is not None:
+        return result, True
+    result = analyze(get_portfolio(), as_of, months)
+    cache.set(key, result, RESULT_CACHE_TIMEOUT)
+    return result, False
@@ -4,4 +4,6 @@ class ApiConfig(AppConfig):
     name = 'api'
 
     def ready(self):
-        import api.signals  
\ No newline at end of file
+        import api.signals
+        from api import profiling
+        profiling.install()  
\ No newline at end of file
@@ -0,0 +1,145 @@
+import asyncio
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+from django.http import HttpResponse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException, AuthenticationFailed
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from .authentication import CookieJWTAuthentication
+from .conditional import on_tables, on_schedule
+from .models import Member, Loans, Amortization
+from .pagination import paginated_list_response
+from .serializers import MemberSerializer, LoanSerializer, AmortizationSerializer
+from .utils import DASHBOARD_SUMMARY_CACHE_KEY, DASHBOARD_SUMMARY_CACHE_TIMEOUT
+from . import views
+
+# Async versions of the read-heavy endpoints (dashboard, members, loans, amortization,
+# audit logs), served under /api/async/ when the project runs under ASGI (asgi.py).
+# Responses are the same as the sync views'; the load_test command compares the two.
+#
+# Django's async ORM methods (acount(), aget(), async for) hand every query to the one
+# thread Django keeps for sync code, so under load they run one at a time. Queries here
+# go through in_thread() instead, which uses a pool of ASYNC_QUERY_THREADS threads:
+# independent queries of one request (the dashboard's aggregates) and those of concurrent
+# requests run side by side, and the event loop never waits on the database. Each pool
+# thread holds its own database connection while it runs a query.
+
+authenticator = CookieJWTAuthentication()
+query_executor = ThreadPoolExecutor(getattr(settings, 'ASYNC_QUERY_THREADS', 16), thread_name_prefix='async-query')
+
+
+def releasing_connection(func):
+    # Worker threads keep their own connection; close it like request_finished would
+    @functools.wraps(func)
+    def run(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return run
+
+
+async def in_thread(func, *args, **kwargs):
+    # Runs blocking (ORM) code in the thread pool and waits for it without blocking the loop
+    return await sync_to_async(releasing_connection(func), thread_sensitive=False, executor=query_executor)(*args, **kwargs)
+
+
+async def gather_queries(queries):
+    # {name: callable} -> {name: result}, all queries running concurrently
+    results = await asyncio.gather(*(in_thread(query) for query in queries.values()))
+    return dict(zip(queries, results))
+
+
+def render(data, status_code=status.HTTP_200_OK):
+    # JSON exactly as DRF's Response would render it; `data` is kept for api.conditional
+    response = HttpResponse(JSONRenderer().render(data), status=status_code, content_type='application/json')
+    response.data = data
+    return response
+
+
+def render_drf(response):
+    # A DRF Response built by shared sync code (paginated_list_response, ...)
+    return render(response.data, response.status_code)
+
+
+def async_api_view(view):
+    """
+    The async counterpart of @api_view(['GET']) with the default authentication
+    (JWT cookie) and IsAuthenticated permission. DRF errors become JSON responses.
+    """
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            response = render({'detail': f'Method "{request.method}" not allowed.'}, status.HTTP_405_METHOD_NOT_ALLOWED)
+            response['Allow'] = 'GET, HEAD'
+            return response
+        try:
+            # Cached users need no query, but a miss does: resolve it off the event loop
+            authenticated = await in_thread(authenticator.authenticate, request)
+            if authenticated is None:
+                raise AuthenticationFailed('Authentication credentials were not provided.')
+            request.user = authenticated[0]
+            return await view(request, *args, **kwargs)
+        except AuthenticationFailed as exc:
+            response = render({'detail': exc.detail}, status.HTTP_401_UNAUTHORIZED)
+            response['WWW-Authenticate'] = authenticator.authenticate_header(request)
+            return response
+        except APIException as exc:
+            return render({'detail': exc.detail}, exc.status_code)
+    return wrapper
+
+#---DASHBOARD--------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+@async_api_view
+async def dashboard_summary(request):
+    # Same cache as the sync view; on a miss the six aggregates run concurrently. The cache
+    # is read from disk (FileBasedCache), so it is used from the pool like the database
+    started = time.perf_counter()
+    summary = await in_thread(cache.get, DASHBOARD_SUMMARY_CACHE_KEY)
+    cached = summary is not None
+    if not cached:
+        summary = views.compute_dashboard_summary(await gather_queries(views.dashboard_queries()))
+        summary['computed_ms'] = round((time.perf_counter() - started) * 1000, 2)
+        summary['computed_at'] = timezone.now()
+        await in_thread(cache.set, DASHBOARD_SUMMARY_CACHE_KEY, summary, DASHBOARD_SUMMARY_CACHE_TIMEOUT)
+
+    return render({
+        **summary,
+        'cached': cached,
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 2),
+    })
+
+#---MEMBERS--------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+@async_api_view
+@on_tables('member')
+async def get_members(request):
+    return render_drf(await in_thread(paginated_list_response, Request(request), Member.objects.all(), MemberSerializer))
+
+#---LOANS--------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+@async_api_view
+@on_tables('loans', 'member')
+async def get_loan(request):
+    return render_drf(await in_thread(paginated_list_response, Request(request), Loans.objects.all(), LoanSerializer))
+
+@async_api_view
+@on_schedule()
+async def amortization_list(request, pk):
+    def schedule():
+        return AmortizationSerializer(Amortization.objects.filter(loan_id=pk).order_by('seq'), many=True).data
+    return render(await in_thread(schedule))
+
+#---AUDIT LOGS--------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+@async_api_view
+async def get_audit_logs(request):
+    # Same filters, ?latest=N fast path and paging as views.get_audit_logs
+    return render_drf(await in_thread(views.audit_log_response, Request(request)))
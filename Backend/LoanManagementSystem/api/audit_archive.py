@@ -0,0 +1,185 @@
+import datetime
+import gzip
+import json
+import os
+import re
+from auditlog.models import LogEntry
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from . import audit, history
+
+# Audit log archive.
+#
+# Entries older than the retention window are moved out of the LogEntry table into one
+# gzip'd JSON-lines file per month (AUDIT_ARCHIVE_ROOT/auditlog-YYYY-MM.jsonl.gz), so the
+# hot table only holds recent history. Each archiving batch is appended to its month's
+# file as a new gzip member (readers see one continuous stream), synced to disk, and only
+# then deleted from the table. A crash between the two steps leaves entries in both
+# places; readers drop the duplicates by id. Objects are checkpointed (api.history) at
+# their last archived entry first, so their state stays reconstructible.
+#
+# Rows keep the LogEntry's actor and content type ids. Each batch starts with a header
+# line mapping those ids to the usernames and model names of the moment, resolved once
+# per batch; read_month() puts the names back on every row.
+#
+# search() answers the same filters as the hot table, opening only the months the date
+# range touches.
+
+FILE_PATTERN = re.compile(r'^auditlog-(\d{4})-(\d{2})\.jsonl\.gz$')
+BATCH_SIZE = 5000
+
+HEADER = 'header'
+
+# LogEntry columns kept in the archive
+COLUMNS = ('id', 'timestamp', 'action', 'actor_id', 'content_type_id', 'object_pk', 'object_id', 'object_repr',
+           'changes', 'cid', 'remote_addr', 'additional_data')
+
+
+def archive_root():
+    return settings.AUDIT_ARCHIVE_ROOT
+
+
+def month_path(year, month):
+    return os.path.join(archive_root(), f'auditlog-{year:04d}-{month:02d}.jsonl.gz')
+
+
+def archived_months():
+    # [(year, month)] of every archive file, oldest first
+    if not os.path.isdir(archive_root()):
+        return []
+    matches = (FILE_PATTERN.match(name) for name in os.listdir(archive_root()))
+    return sorted((int(match.group(1)), int(match.group(2))) for match in matches if match)
+
+
+def content_type_names():
+    # content type id -> (model name, label as AuditLogSerializer shows it)
+    return {ct.pk: (ct.model, str(ct)) for ct in ContentType.objects.filter(model__in=audit.audited_models())}
+
+
+def archive_batch(rows, names):
+    # Append one batch of LogEntry values to the month files they belong to, each after its header
+    by_month = {}
+    for row in rows:
+        row = {**row, 'timestamp': row['timestamp'].isoformat()}
+        by_month.setdefault((row['timestamp'][:4], row['timestamp'][5:7]), []).append(row)
+    actor_ids = {row['actor_id'] for row in rows if row['actor_id'] is not None}
+    actors = dict(get_user_model().objects.filter(pk__in=actor_ids).values_list('pk', 'username'))
+
+    os.makedirs(archive_root(), exist_ok=True)
+    for (year, month), month_rows in by_month.items():
+        header = {
+            'actors': {row['actor_id']: actors.get(row['actor_id']) for row in month_rows if row['actor_id'] is not None},
+            'content_types': {row['content_type_id']: names.get(row['content_type_id'], (None, None)) for row in month_rows},
+        }
+        with open(month_path(int(year), int(month)), 'ab') as raw:
+            with gzip.GzipFile(fileobj=raw, mode='wb') as f:
+                f.write(json.dumps({HEADER: header}).encode() + b'\n')
+                for row in month_rows:
+                    f.write(json.dumps(row, default=str).encode() + b'\n')
+            raw.flush()
+            os.fsync(raw.fileno())
+    return by_month
+
+
+def archive_before(cutoff, batch_size=BATCH_SIZE, dry_run=False):
+    """
+    Moves entries with timestamp < cutoff into the monthly archive files, batch_size at a
+    time. Returns {'YYYY-MM': entries archived}; with dry_run only counts them.
+    """
+    old = LogEntry.objects.filter(timestamp__lt=cutoff)
+    counts = {}
+    if dry_run:
+        for month in old.dates('timestamp', 'month'):
+            key = month.strftime('%Y-%m')
+            counts[key] = old.filter(timestamp__year=month.year, timestamp__month=month.month).count()
+        return counts
+
+    names = content_type_names()
+    last_id = 0
+    while True:
+        rows = list(old.filter(id__gt=last_id).order_by('id').values(*COLUMNS)[:batch_size])
+        if not rows:
+            return counts
+        last_id = rows[-1]['id']
+        # Checkpoint each object at its last archived entry so api.history can still reconstruct it
+        history.checkpoint_objects({(row['content_type_id'], row['object_id']): row['id'] for row in rows})
+        written = archive_batch(rows, names)
+        # Files are synced before the rows go, so an entry is never only in memory
+        with transaction.atomic():
+            LogEntry.objects.filter(id__in=[row['id'] for row in rows]).delete()
+        for (year, month), month_rows in written.items():
+            counts[f'{year}-{month}'] = counts.get(f'{year}-{month}', 0) + len(month_rows)
+
+
+def read_month(year, month):
+    # Archived entries of one month, each id once, with the actor and model names from their batch's header
+    seen = set()
+    header = {'actors': {}, 'content_types': {}}
+    with gzip.open(month_path(year, month), 'rt') as f:
+        for line in f:
+            row = json.loads(line)
+            if HEADER in row:
+                header = row[HEADER]
+            elif row['id'] not in seen:
+                seen.add(row['id'])
+                model, label = header['content_types'].get(str(row['content_type_id']), (None, None))
+                yield {'actor': header['actors'].get(str(row['actor_id'])), 'model': model, 'model_label': label, **row}
+
+
+def matches(row, filters, start, end):
+    # The archive counterpart of audit.filter_entries
+    if 'actor' in filters and row['actor'] != filters['actor']:
+        return False
+    if 'model' in filters and row['model'] != filters['model']:
+        return False
+    if 'object_id' in filters and row['object_id'] != filters['object_id']:
+        return False
+    if 'action' in filters and row['action'] != audit.ACTIONS[filters['action']]:
+        return False
+    timestamp = parse_datetime(row['timestamp'])
+    return (start is None or timestamp >= start) and (end is None or timestamp < end)
+
+
+def search(filters, before_id=None, limit=50):
+    """
+    Archived entries matching validated AuditLogFilterSerializer data, newest first
+    (by id, which follows insertion order). Returns (rows, more) where `more` tells
+    whether entries older than the last row exist; pass the last id as before_id to
+    continue. Only the months overlapping date_from/date_to are read.
+    """
+    start, end = audit.day_bounds(filters.get('date_from'), filters.get('date_to'))
+    first = (start.year, start.month) if start else None
+    last = (end - datetime.timedelta(microseconds=1)).timetuple()[:2] if end else None
+
+    found = []
+    for year, month in reversed(archived_months()):
+        if (last and (year, month) > tuple(last)) or (first and (year, month) < first):
+            continue
+        rows = [
+            row for row in read_month(year, month)
+            if (before_id is None or row['id'] < before_id) and matches(row, filters, start, end)
+        ]
+        found.extend(sorted(rows, key=lambda row: row['id'], reverse=True))
+        if len(found) > limit:
+            break
+    return found[:limit], len(found) > limit
+
+
+def represent(row):
+    # Same shape as AuditLogSerializer, plus the id used as the paging cursor
+    return {
+        'id': row['id'],
+        'action': audit.ACTION_NAMES.get(row['action'], row['action']),
+        'actor': row['actor'],
+        'timestamp': row['timestamp'],
+        'object': {'model': row['model_label'], 'id': row['object_pk'], 'representation': row['object_repr']},
+        'changes': row['changes'],
+    }
+
+
+def cutoff_for(days):
+    return timezone.now() - datetime.timedelta(days=days)
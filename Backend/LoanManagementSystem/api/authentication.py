@@ -1,7 +1,100 @@
 # authentication.py
+import copy
+import threading
+import time
+from collections import OrderedDict
 from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
 from django.conf import settings
 
+
+class UserCache:
+    """
+    Per-process LRU of authenticated users keyed on (user id, token jti).
+
+    Entries expire after `ttl` seconds and the least recently used one is evicted past
+    `max_size`. Saving or deleting a user drops its entries (api.signals), so a
+    deactivated account or changed usertype takes effect on the next request in this
+    process and within `ttl` seconds in the others.
+    """
+    def __init__(self, ttl, max_size):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()  # (user id, jti) -> (expires at, user)
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+        self.hit_seconds = self.miss_seconds = 0.0  # Time spent resolving the user, per outcome
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key, user):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, user)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, user_id):
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == user_id]:
+                del self._entries[key]
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def record(self, hit, seconds):
+        with self._lock:
+            if hit:
+                self.hits += 1
+                self.hit_seconds += seconds
+            else:
+                self.misses += 1
+                self.miss_seconds += seconds
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            hit_ms = self.hit_seconds * 1000 / self.hits if self.hits else 0.0
+            miss_ms = self.miss_seconds * 1000 / self.misses if self.misses else 0.0
+            # Every hit saved a database lookup: its average cost minus the cache's
+            saved_ms = max(miss_ms - hit_ms, 0.0) * self.hits
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'avg_hit_ms': round(hit_ms, 4),
+                'avg_miss_ms': round(miss_ms, 4),
+                'saved_ms_total': round(saved_ms, 2),
+                'saved_ms_per_request': round(saved_ms / lookups, 4) if lookups else 0.0,
+            }
+
+
+user_cache = UserCache(
+    ttl=getattr(settings, 'AUTH_USER_CACHE_TTL', 30),
+    max_size=getattr(settings, 'AUTH_USER_CACHE_SIZE', 1000),
+)
+
+
 class CookieJWTAuthentication(JWTAuthentication):
     def authenticate(self, request):
         cookie_name = settings.SIMPLE_JWT.get("AUTH_COOKIE", "access_token")
@@ -11,4 +104,21 @@ class CookieJWTAuthentication(JWTAuthentication):
             return None
 
         validated_token = self.get_validated_token(raw_token)
-        return self.get_user(validated_token), validated_token
+        return self.get_cached_user(validated_token), validated_token
+
+    def get_cached_user(self, validated_token):
+        # get_user() costs a tblUser query; reuse the user resolved for this token recently
+        key = (validated_token.get(api_settings.USER_ID_CLAIM), validated_token.get(api_settings.JTI_CLAIM))
+        if None in key or user_cache.ttl <= 0:
+            return self.get_user(validated_token)
+
+        start = time.perf_counter()
+        user = user_cache.get(key)
+        if user is not None:
+            user_cache.record(True, time.perf_counter() - start)
+            return copy.copy(user)  # Requests may modify request.user; keep the cached one pristine
+
+        user = self.get_user(validated_token)  # Raises for unknown or inactive users, which are never cached
+        user_cache.put(key, copy.copy(user))
+        user_cache.record(False, time.perf_counter() - start)
+        return user
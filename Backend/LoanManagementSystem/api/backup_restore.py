@@ -2,7 +2,11 @@ import os
 import shutil
 import tarfile
 import subprocess
+import threading
+from functools import partial
 from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, StopFutureHandlers, StopUpload
 from django.http import FileResponse, JsonResponse
 from rest_framework.decorators import api_view
 from datetime import datetime
@@ -10,6 +14,10 @@ import logging
 import datetime
 from .models import BackupLog  
 from .models import RestoreLog
+from . import backup_store, compression, jobs
+from .conditional import bump_table_versions
+
+RESTORE_UPLOAD_PERCENT = 60  # Share of a restore job's progress bar spent receiving/extracting the upload
 
 def is_within_directory(directory, target):
     # Check if the target path is within the given directory to avoid path traversal attacks
@@ -25,7 +33,50 @@ def safe_extract(tar, path=".", members=None):
             raise Exception("Attempted Path Traversal in Tar File")
     tar.extractall(path, members)
 
-def full_backup():
+def dump_command(db_settings):
+    # Command and environment that write a SQL dump of a PostgreSQL/MySQL database to stdout
+    engine = db_settings['ENGINE']
+    env = os.environ.copy()
+    if "postgresql" in engine:
+        # Use pg_dump to export PostgreSQL database
+        env["PGPASSWORD"] = db_settings["PASSWORD"]
+        command = [
+            "pg_dump",
+            "-U", db_settings["USER"],
+            "-h", db_settings.get("HOST", "localhost"),
+            "-p", str(db_settings.get("PORT", "5432")),
+            "-F", "p",
+            db_settings["NAME"]
+        ]
+    elif "mysql" in engine:
+        # Use mysqldump for MySQL database (custom path to mysqldump.exe in XAMPP)
+        env["MYSQL_PWD"] = db_settings["PASSWORD"]
+        command = [
+            "D:\\xampp\\mysql\\bin\\mysqldump.exe",
+            "-u", db_settings["USER"],
+            db_settings["NAME"]
+        ]
+    else:
+        raise Exception("Unsupported database engine for backup.")
+    return command, env
+
+def media_entries(media_root):
+    # (path, arcname) for MEDIA_ROOT and everything under it, parents before children
+    base = os.path.dirname(media_root)
+    for root, dirs, files in os.walk(media_root):
+        dirs.sort()
+        yield root, os.path.relpath(root, base)
+        for fname in sorted(files):
+            path = os.path.join(root, fname)
+            yield path, os.path.relpath(path, base)
+
+def full_backup(progress=None):
+    """
+    Writes the database and MEDIA_ROOT into backups/full_backup_<timestamp>.tar.gz.
+    The gzip stream is compressed on all cores (api.compression.ParallelGzipWriter).
+    progress(done, total) is called with the bytes archived so far; if it raises
+    (e.g. the job was cancelled) the partial archive is removed.
+    """
     # Create backups directory if it doesn't exist
     backup_dir = os.path.join(settings.BASE_DIR, 'backups')
     os.makedirs(backup_dir, exist_ok=True)
@@ -33,67 +84,160 @@ def full_backup():
     # Generate timestamp string for unique backup filename
     timestamp_str = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
     backup_filename = os.path.join(backup_dir, f"full_backup_{timestamp_str}.tar.gz")
+    partial_filename = f"{backup_filename}.part"
+    temp_dump = None
 
-    # Open tar.gz archive for writing
-    with tarfile.open(backup_filename, "w:gz") as tar:
+    try:
         db_settings = settings.DATABASES['default']
         engine = db_settings['ENGINE']
-        env = os.environ.copy()
 
+        entries = []
         if "sqlite3" in engine:
             # For SQLite, add the database file directly to the archive
             db_file = db_settings['NAME']
             if os.path.exists(db_file):
-                tar.add(db_file, arcname=os.path.basename(db_file))
+                entries.append((db_file, os.path.basename(db_file)))
         else:
             # For other DB engines, create a SQL dump first
             temp_dump = os.path.join(backup_dir, f"db_dump_{timestamp_str}.sql")
-
-            if "postgresql" in engine:
-                # Use pg_dump to export PostgreSQL database
-                env["PGPASSWORD"] = db_settings["PASSWORD"]
-                command = [
-                    "pg_dump",
-                    "-U", db_settings["USER"],
-                    "-h", db_settings.get("HOST", "localhost"),
-                    "-p", str(db_settings.get("PORT", "5432")),
-                    "-F", "p",
-                    db_settings["NAME"]
-                ]
-                with open(temp_dump, "w") as dump_file:
-                    subprocess.run(command, stdout=dump_file, check=True, env=env)
-            elif "mysql" in engine:
-                # Use mysqldump for MySQL database (custom path to mysqldump.exe in XAMPP)
-                env["MYSQL_PWD"] = db_settings["PASSWORD"]
-                command = [
-                    "D:\\xampp\\mysql\\bin\\mysqldump.exe",
-                    "-u", db_settings["USER"],
-                    db_settings["NAME"]
-                ]
-                with open(temp_dump, "w") as dump_file:
-                    subprocess.run(command, stdout=dump_file, check=True, env=env)
-            else:
-                raise Exception("Unsupported database engine for backup.")
-
-            # Add the SQL dump file to the archive and remove the temp dump
-            tar.add(temp_dump, arcname=os.path.basename(temp_dump))
-            os.remove(temp_dump)
+            command, env = dump_command(db_settings)
+            with open(temp_dump, "w") as dump_file:
+                subprocess.run(command, stdout=dump_file, check=True, env=env)
+            entries.append((temp_dump, os.path.basename(temp_dump)))
 
         # Add the MEDIA_ROOT folder to the backup archive
         media_root = settings.MEDIA_ROOT
         if os.path.exists(media_root):
-            tar.add(media_root, arcname=os.path.basename(media_root))
+            entries.extend(media_entries(media_root))
+
+        total = sum(os.path.getsize(path) for path, _ in entries if os.path.isfile(path))
+        done = 0
+        # Tar is written as a stream into the parallel gzip writer, then renamed into place
+        with open(partial_filename, "wb") as raw, compression.ParallelGzipWriter(raw) as gz, \
+                tarfile.open(fileobj=gz, mode="w|") as tar:
+            for path, arcname in entries:
+                tar.add(path, arcname=arcname, recursive=False)
+                if os.path.isfile(path):
+                    done += os.path.getsize(path)
+                    if progress:
+                        progress(done, total)
+        os.replace(partial_filename, backup_filename)
+    finally:
+        # Remove the temp dump, and the partial archive if anything failed
+        if temp_dump and os.path.exists(temp_dump):
+            os.remove(temp_dump)
+        if os.path.exists(partial_filename):
+            os.remove(partial_filename)
 
-    # Log the backup operation with filename and timestamp in DB
-    BackupLog.objects.create(filename=os.path.basename(backup_filename), backup_time=datetime.datetime.now())
+    # Log the backup operation with filename, timestamp and size in DB
+    BackupLog.objects.create(
+        filename=os.path.basename(backup_filename),
+        backup_time=datetime.datetime.now(),
+        bytes_written=os.path.getsize(backup_filename),
+    )
 
     # Return full path to backup archive file
     return backup_filename
 
-@api_view(["GET"])
+def incremental_backup(progress=None):
+    """
+    Writes a point-in-time backup into the content-addressed store (api.backup_store):
+    the database is chunked and media files are stored by content hash, so anything
+    unchanged since an earlier backup is not written again. Returns (manifest name, stats).
+    progress(done, total) counts the database as one step and each media file as one.
+    """
+    stats = backup_store.BackupStats()
+    db_settings = settings.DATABASES['default']
+    engine = db_settings['ENGINE']
+
+    if "sqlite3" in engine:
+        # SQLite: chunk the database file itself
+        db_file = db_settings['NAME']
+        with open(db_file, "rb") as f:
+            chunks = backup_store.store_database(f, binary=True, stats=stats)
+        database = {'binary': True, 'filename': os.path.basename(db_file), 'chunks': chunks}
+    else:
+        # PostgreSQL/MySQL: chunk the SQL dump as it streams out of the dump tool
+        command, env = dump_command(db_settings)
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, env=env)
+        chunks = backup_store.store_database(process.stdout, binary=False, stats=stats)
+        if process.wait() != 0:
+            raise Exception(f"Database dump failed with exit code {process.returncode}.")
+        database = {'binary': False, 'filename': 'db_dump.sql', 'chunks': chunks}
+
+    if progress:
+        progress(1, 2)
+
+    media_root = settings.MEDIA_ROOT
+    media = []
+    if os.path.exists(media_root):
+        # Second half of the progress bar is the media files
+        media_progress = (lambda done, total: progress(total + done, 2 * total)) if progress else None
+        media = backup_store.store_media(media_root, stats, media_progress)
+
+    manifest_name = backup_store.write_manifest({
+        'created_at': datetime.datetime.now().isoformat(),
+        'engine': engine,
+        'database': database,
+        'media': media,
+        'media_dir': os.path.basename(media_root),
+        **stats.as_dict(),
+    })
+
+    # Log the backup with the bytes it actually added to the store
+    BackupLog.objects.create(
+        filename=manifest_name,
+        backup_time=datetime.datetime.now(),
+        mode=BackupLog.INCREMENTAL,
+        bytes_written=stats.bytes_written,
+        bytes_deduplicated=stats.bytes_deduplicated,
+    )
+
+    # Retention: drop the oldest manifests and the objects only they referenced
+    if settings.BACKUP_INCREMENTAL_KEEP:
+        manifests, objects, freed = backup_store.prune(settings.BACKUP_INCREMENTAL_KEEP)
+        if manifests or objects:
+            logger.info(f"Pruned {manifests} backup manifests and {objects} objects ({freed} bytes)")
+    return manifest_name, stats
+
+def backup_job(job_id, mode):
+    # Background job body for backup_view; the archive is linked into the job directory for download
+    if mode == BackupLog.INCREMENTAL:
+        manifest_name, stats = incremental_backup(progress=jobs.progress_reporter(job_id))
+        jobs.update_job(job_id, manifest=manifest_name, **stats.as_dict())
+        return None
+
+    backup_file_path = full_backup(progress=jobs.progress_reporter(job_id))
+    download_path = jobs.job_file(job_id, os.path.basename(backup_file_path))
+    try:
+        os.link(backup_file_path, download_path)  # Same bytes, no copy
+    except OSError:
+        shutil.copyfile(backup_file_path, download_path)
+    return os.path.basename(download_path)
+
+@api_view(["GET", "POST"])
 def backup_view(request):
-    # API endpoint to trigger full backup and return the backup file as download
+    """
+    POST starts a backup job and returns it (202): poll /api/jobs/<id>/ for progress,
+    cancel with /api/jobs/<id>/cancel/ and fetch a full backup from /api/jobs/<id>/download/.
+    ?mode=incremental writes into the deduplicated store instead of a .tar.gz.
+
+    GET runs a full backup inside the request and returns the archive (kept for old clients).
+    """
+    mode = request.query_params.get("mode") or BackupLog.FULL
+    if mode not in (BackupLog.FULL, BackupLog.INCREMENTAL):
+        return JsonResponse({"detail": "Invalid backup mode."}, status=400)
+
+    if request.method == "POST":
+        job = jobs.create_job("backup", {"mode": mode}, request.user)
+        jobs.start_job(job["id"], backup_job, mode)
+        return JsonResponse(job, status=202)
+
     try:
+        if mode == BackupLog.INCREMENTAL:
+            manifest_name, stats = incremental_backup()
+            return JsonResponse({"detail": "Incremental backup completed.", "manifest": manifest_name, **stats.as_dict()})
+
         backup_file_path = full_backup()
         return FileResponse(
             open(backup_file_path, "rb"),
@@ -108,128 +252,250 @@ def backup_view(request):
 
 logger = logging.getLogger(__name__)
 
-@api_view(["POST"])
-def restore_view(request):
-    # API endpoint to restore backup from uploaded file
-    backup_file = request.FILES.get("backup_file")
-    if not backup_file:
-        return JsonResponse({"detail": "No backup file provided."}, status=400)
+def load_database(dump_file):
+    # Load a database file (SQLite) or SQL dump (PostgreSQL/MySQL) into the configured database
+    db_settings = settings.DATABASES["default"]
+    engine = db_settings["ENGINE"]
+    env = os.environ.copy()
 
-    # Ensure backups directory exists
-    backup_dir = os.path.join(settings.BASE_DIR, "backups")
-    os.makedirs(backup_dir, exist_ok=True)
+    if "sqlite3" in engine:
+        shutil.copyfile(dump_file, db_settings["NAME"])
+    elif "postgresql" in engine:
+        env["PGPASSWORD"] = db_settings["PASSWORD"]
+        command = [
+            "psql",
+            "-U", db_settings["USER"],
+            "-h", db_settings.get("HOST", "localhost"),
+            "-p", str(db_settings.get("PORT", "5432")),
+            "-d", db_settings["NAME"],
+            "-f", dump_file
+        ]
+        subprocess.run(command, check=True, env=env)
+    elif "mysql" in engine:
+        env["MYSQL_PWD"] = db_settings["PASSWORD"]
+        command = [
+            "D:\\xampp\\mysql\\bin\\mysql.exe",
+            "-u", db_settings["USER"],
+            db_settings["NAME"]
+        ]
+        with open(dump_file, "r") as f:
+            subprocess.run(command, stdin=f, check=True, env=env)
+    else:
+        raise Exception("Unsupported database engine for restore.")
+    # Every row may have changed: no client copy (ETag) of any endpoint is valid any more
+    bump_table_versions()
 
-    # Save uploaded backup file temporarily on disk
-    temp_backup_path = os.path.join(backup_dir, backup_file.name)
-    with open(temp_backup_path, "wb+") as destination:
-        for chunk in backup_file.chunks():
-            destination.write(chunk)
+def restore_from_manifest(manifest_name, progress=None):
+    """
+    Rebuilds the database and MEDIA_ROOT as recorded in an incremental backup manifest.
+    Returns the number of media files restored. progress(done, total) is only called
+    before the database is touched, so a cancel never leaves a half-restored system.
+    """
+    manifest = backup_store.load_manifest(manifest_name)
+    if manifest["engine"] != settings.DATABASES["default"]["ENGINE"]:
+        raise Exception("Backup was taken from a different database engine.")
 
+    # Reassemble the database file/dump from its chunks, then load it as usual
+    backup_dir = os.path.join(settings.BASE_DIR, "backups")
+    temp_dump = os.path.join(backup_dir, f"restore_{manifest['database']['filename']}")
     try:
-        # Debugging info about base and media paths
-        logger.debug(f"BASE_DIR: {settings.BASE_DIR}")
-        logger.debug(f"MEDIA_ROOT: {settings.MEDIA_ROOT}")
-        print(f"BASE_DIR: {settings.BASE_DIR}")
-        print(f"MEDIA_ROOT: {settings.MEDIA_ROOT}")
+        with open(temp_dump, "wb") as out:
+            backup_store.write_database(manifest, out)
+        if progress:
+            progress(1, 2)  # Last point where the restore can be cancelled
+        load_database(temp_dump)
+    finally:
+        if os.path.exists(temp_dump):
+            os.remove(temp_dump)
 
-        if not settings.MEDIA_ROOT:
-            raise Exception("MEDIA_ROOT is not configured in Django settings.")
+    media_files = backup_store.restore_media(manifest, settings.MEDIA_ROOT)
 
-        # Prepare temp directory to extract backup archive contents
-        temp_extract_dir = os.path.join(backup_dir, "temp_restore")
-        if os.path.exists(temp_extract_dir):
-            shutil.rmtree(temp_extract_dir)
-        os.makedirs(temp_extract_dir)
+    # Log restore operation in database
+    RestoreLog.objects.create()
+    return media_files
 
-        # Safely extract backup archive contents to temp directory
-        with tarfile.open(temp_backup_path, "r:gz") as tar:
-            safe_extract(tar, path=temp_extract_dir)
+def find_database_file(extract_dir):
+    # The SQLite file or SQL dump inside an extracted full backup
+    names = sorted(os.listdir(extract_dir))
+    if "sqlite3" in settings.DATABASES["default"]["ENGINE"]:
+        candidates = [n for n in names if n.endswith(".sqlite3")]
+        if not candidates:
+            raise Exception("SQLite database file not found in backup.")
+    else:
+        # Prefer the db_dump file; any .sql file is the fallback
+        candidates = [n for n in names if n.startswith("db_dump")] or [n for n in names if n.endswith(".sql")]
+        if not candidates:
+            raise Exception("SQL dump file not found in backup.")
+    return os.path.join(extract_dir, candidates[0])
 
-        db_settings = settings.DATABASES["default"]
-        engine = db_settings["ENGINE"]
-        env = os.environ.copy()
+def restore_extracted(extract_dir, progress=None):
+    """
+    Loads the database and MEDIA_ROOT from an extracted full backup.
+    Returns whether media was restored. Like restore_from_manifest, progress is only
+    reported (and a cancel honoured) before the database is replaced.
+    """
+    if not settings.MEDIA_ROOT:
+        raise Exception("MEDIA_ROOT is not configured in Django settings.")
 
-        if "sqlite3" in engine:
-            # For SQLite, copy extracted .sqlite3 database file back to original location
-            for fname in os.listdir(temp_extract_dir):
-                if fname.endswith(".sqlite3"):
-                    db_file = os.path.join(temp_extract_dir, fname)
-                    shutil.copyfile(db_file, db_settings["NAME"])
-                    break
-            else:
-                raise Exception("SQLite database file not found in backup.")
-        else:
-            # For PostgreSQL/MySQL, find the SQL dump file extracted from backup
-            dump_file = None
-            for fname in os.listdir(temp_extract_dir):
-                if fname.startswith("db_dump"):
-                    dump_file = os.path.join(temp_extract_dir, fname)
-                    break
-            if not dump_file:
-                # Try to find any .sql file as fallback
-                for fname in os.listdir(temp_extract_dir):
-                    if fname.endswith(".sql"):
-                        dump_file = os.path.join(temp_extract_dir, fname)
-                        break
-            if not dump_file:
-                raise Exception("SQL dump file not found in backup.")
-
-            print(f"Using SQL dump file: {dump_file}")
-
-            # Restore database from SQL dump file depending on engine
-            if "postgresql" in engine:
-                env["PGPASSWORD"] = db_settings["PASSWORD"]
-                command = [
-                    "psql",
-                    "-U", db_settings["USER"],
-                    "-h", db_settings.get("HOST", "localhost"),
-                    "-p", str(db_settings.get("PORT", "5432")),
-                    "-d", db_settings["NAME"],
-                    "-f", dump_file
-                ]
-                subprocess.run(command, check=True, env=env)
-            elif "mysql" in engine:
-                env["MYSQL_PWD"] = db_settings["PASSWORD"]
-                command = [
-                    "D:\\xampp\\mysql\\bin\\mysql.exe",  
-                    "-u", db_settings["USER"],
-                    db_settings["NAME"]
-                ]
-                with open(dump_file, "r") as f:
-                    subprocess.run(command, stdin=f, check=True, env=env)
-            else:
-                raise Exception("Unsupported database engine for restore.")
-
-        # Restore media files by copying extracted media folder over MEDIA_ROOT
-        media_dir_name = os.path.basename(settings.MEDIA_ROOT)
-        print(f"media_dir_name (basename of MEDIA_ROOT): {media_dir_name}")
-
-        media_backup_path = os.path.join(temp_extract_dir, media_dir_name)
-        print(f"media_backup_path: {media_backup_path}")
-
-        media_restored = False
-        if os.path.exists(media_backup_path):
-            if os.path.exists(settings.MEDIA_ROOT):
-                shutil.rmtree(settings.MEDIA_ROOT)
-            shutil.copytree(media_backup_path, settings.MEDIA_ROOT)
-            media_restored = True
-        else:
-            logger.warning("Media backup folder not found in archive. Skipping media restore.")
+    dump_file = find_database_file(extract_dir)
+    if progress:
+        progress(1, 2)
+    load_database(dump_file)
 
-        # Clean up temporary extracted files and uploaded backup archive
-        shutil.rmtree(temp_extract_dir)
-        os.remove(temp_backup_path)
+    # Restore media files by moving the extracted media folder over MEDIA_ROOT
+    media_backup_path = os.path.join(extract_dir, os.path.basename(settings.MEDIA_ROOT))
+    media_restored = False
+    if os.path.exists(media_backup_path):
+        if os.path.exists(settings.MEDIA_ROOT):
+            shutil.rmtree(settings.MEDIA_ROOT)
+        shutil.move(media_backup_path, settings.MEDIA_ROOT)
+        media_restored = True
+    else:
+        logger.warning("Media backup folder not found in archive. Skipping media restore.")
 
-        # Log restore operation in database
-        RestoreLog.objects.create()
+    # Log restore operation in database
+    RestoreLog.objects.create()
+    return media_restored
 
-        # Return success response with restore info
-        return JsonResponse({
-            "detail": "Restore completed successfully.",
-            "media_restored": media_restored,
-            "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        })
-    except Exception as e:
-        # Log and return error response if restore fails
-        logger.error(f"Restore failed: {e}")
-        return JsonResponse({"detail": f"Restore failed: {e}"}, status=500)
+def extract_stream(stream, path):
+    # Extract a .tar.gz read sequentially from `stream` (no seeking), validating every member
+    with tarfile.open(fileobj=stream, mode="r|gz") as tar:
+        for member in tar:
+            member_path = os.path.join(path, member.name)
+            if not is_within_directory(path, member_path) or member.issym() or member.islnk():
+                raise Exception("Attempted Path Traversal in Tar File")
+            tar.extract(member, path)
+
+class StreamingRestoreHandler(FileUploadHandler):
+    """
+    Upload handler for restore_view: the "backup_file" upload is never written to disk
+    as an archive. Each chunk is piped to a thread that decompresses and extracts it
+    into the restore job's directory while the rest of the upload is still arriving.
+    The job is created when the upload starts, so its progress covers the upload too.
+    """
+    def __init__(self, request):
+        super().__init__(request)
+        self.job = None
+        self.extract_dir = None
+        self.error = None
+        self.cancelled = False
+        self.pipe = None
+        self.thread = None
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        self.content_length = content_length
+
+    def new_file(self, field_name, file_name, *args, **kwargs):
+        if field_name != "backup_file":
+            return
+        super().new_file(field_name, file_name, *args, **kwargs)
+        self.job = jobs.create_job("restore", {"filename": file_name}, self.request.user)
+        self.job = jobs.update_job(self.job["id"], status=jobs.RUNNING)
+        self.progress = jobs.progress_reporter(self.job["id"], 0, RESTORE_UPLOAD_PERCENT)
+        self.extract_dir = jobs.job_file(self.job["id"], "extract")
+        os.makedirs(self.extract_dir)
+        self.pipe = compression.ChunkPipe()
+        self.thread = threading.Thread(target=self.extract, daemon=True)
+        self.thread.start()
+        raise StopFutureHandlers()  # Nobody else stores this file
+
+    def extract(self):
+        try:
+            extract_stream(self.pipe, self.extract_dir)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.pipe.abort()  # Stop the upload side from waiting on a dead reader
+
+    def finish(self):
+        # End the stream and wait for the extractor; safe to call more than once
+        if self.thread is not None and self.thread.is_alive():
+            self.pipe.close()
+            self.thread.join()
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.pipe is None:
+            return raw_data
+        self.pipe.write(raw_data)
+        try:
+            self.progress(start + len(raw_data), self.content_length)
+        except jobs.JobCancelled:
+            self.cancelled = True
+            raise StopUpload(connection_reset=True)
+        return None
+
+    def file_complete(self, file_size):
+        if self.pipe is None:
+            return None
+        self.finish()
+        return UploadedFile(name=self.file_name, size=file_size, content_type=self.content_type)
+
+    def upload_interrupted(self):
+        # Client went away before the file was complete
+        if self.pipe is not None:
+            self.finish()
+            self.error = self.error or Exception("Upload was interrupted.")
+
+def restore_upload_job(job_id, extract_dir):
+    # Background job body for an uploaded archive that was already extracted during the upload
+    progress = jobs.progress_reporter(job_id, RESTORE_UPLOAD_PERCENT, 100)
+    jobs.update_job(job_id, media_restored=restore_extracted(extract_dir, progress))
+
+def restore_manifest_job(job_id, manifest_name):
+    # Background job body for restoring an incremental backup from the store
+    media_files = restore_from_manifest(manifest_name, jobs.progress_reporter(job_id))
+    jobs.update_job(job_id, media_restored=media_files)
+
+@api_view(["POST"])
+def restore_view(request):
+    """
+    Starts a restore job and returns it (202); poll /api/jobs/<id>/ and cancel with
+    /api/jobs/<id>/cancel/ (honoured until the database is being replaced).
+
+    An uploaded "backup_file" is decompressed and extracted while it streams in
+    (StreamingRestoreHandler); a posted "manifest" restores an incremental backup instead.
+    """
+    handler = StreamingRestoreHandler(request)
+    request.upload_handlers.insert(0, handler)  # Must happen before request.data is read
+
+    try:
+        manifest_name = request.data.get("manifest")
+    finally:
+        handler.finish()
+
+    if manifest_name:
+        try:
+            backup_store.load_manifest(manifest_name)
+        except FileNotFoundError:
+            return JsonResponse({"detail": "Backup manifest not found."}, status=404)
+        except Exception as e:
+            return JsonResponse({"detail": f"Restore failed: {e}"}, status=400)
+        job = jobs.create_job("restore", {"manifest": manifest_name}, request.user)
+        jobs.start_job(job["id"], restore_manifest_job, manifest_name)
+        return JsonResponse(job, status=202)
+
+    if handler.job is None:
+        return JsonResponse({"detail": "No backup file provided."}, status=400)
+
+    job_id = handler.job["id"]
+    if handler.cancelled:
+        shutil.rmtree(handler.extract_dir, ignore_errors=True)
+        return JsonResponse(jobs.update_job(job_id, status=jobs.CANCELLED), status=202)
+    if handler.error is not None or not request.FILES.get("backup_file"):
+        shutil.rmtree(handler.extract_dir, ignore_errors=True)
+        logger.error(f"Restore failed: {handler.error}")
+        jobs.update_job(job_id, status=jobs.FAILED, error=str(handler.error))
+        return JsonResponse({"detail": f"Restore failed: {handler.error}", "id": job_id}, status=400)
+
+    # Archive is fully extracted; loading the database and media continues in the background.
+    # The extracted files are removed however the job ends, even if it's cancelled before it starts
+    jobs.update_job(job_id, status=jobs.QUEUED)
+    jobs.start_job(job_id, restore_upload_job, handler.extract_dir,
+                   cleanup=partial(shutil.rmtree, handler.extract_dir, ignore_errors=True))
+    return JsonResponse(jobs.get_job(job_id), status=202)
+
+
+@api_view(["GET"])
+def backup_manifests(request):
+    # Point-in-time incremental backups available to restore_view, newest first
+    return JsonResponse({"manifests": backup_store.list_manifests()})
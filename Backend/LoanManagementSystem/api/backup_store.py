@@ -0,0 +1,234 @@
+import datetime
+import hashlib
+import json
+import os
+import shutil
+import time
+import zlib
+from django.conf import settings
+
+# Content-addressed store for incremental backups.
+#
+#   backups/store/objects/ab/abcdef...      media file, stored as-is
+#   backups/store/objects/ab/abcdef....z    database chunk, zlib-compressed
+#   backups/store/manifests/incremental_<timestamp>.json
+#
+# Objects are named by the SHA-256 of their raw content, so a picture or a chunk of
+# the database dump that is already in the store is never written twice. A manifest
+# lists the chunks and files that make up one point-in-time backup. prune() applies
+# the retention: old manifests are deleted, then every object no remaining manifest uses.
+
+STORE_DIR = os.path.join(settings.BASE_DIR, 'backups', 'store')
+OBJECTS_DIR = os.path.join(STORE_DIR, 'objects')
+MANIFESTS_DIR = os.path.join(STORE_DIR, 'manifests')
+MANIFEST_TIME_FORMAT = '%Y%m%d_%H%M%S_%f'
+
+FIXED_CHUNK_SIZE = 1024 * 1024  # SQLite files change page by page, so fixed offsets line up between backups
+MIN_CHUNK_SIZE = 64 * 1024  # Line-based chunks for SQL dumps stay between these sizes
+MAX_CHUNK_SIZE = 4 * 1024 * 1024
+BOUNDARY_MASK = 0x3F  # A line whose hash ends in six zero bits closes a chunk (~1 in 64 lines)
+PRUNE_GRACE = 24 * 60 * 60  # Seconds an unreferenced object is kept: a running backup may not have written its manifest yet
+
+
+class BackupStats:
+    # Byte counters recorded on BackupLog
+    def __init__(self):
+        self.bytes_written = 0  # New bytes actually written to the store
+        self.bytes_deduplicated = 0  # Raw bytes that were already stored
+
+    def as_dict(self):
+        return {'bytes_written': self.bytes_written, 'bytes_deduplicated': self.bytes_deduplicated}
+
+
+def object_path(digest, compressed=False):
+    return os.path.join(OBJECTS_DIR, digest[:2], digest + ('.z' if compressed else ''))
+
+
+def put_object(data, stats, compress=False):
+    # Store one blob unless an identical one exists; returns its digest
+    digest = hashlib.sha256(data).hexdigest()
+    path = object_path(digest, compress)
+    if os.path.exists(path):
+        os.utime(path)  # Recently used, so a concurrent prune() leaves it alone
+        stats.bytes_deduplicated += len(data)
+        return digest
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    payload = zlib.compress(data, 6) if compress else data
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(payload)
+    os.replace(tmp_path, path)  # Never leave a truncated object under its final name
+    stats.bytes_written += len(payload)
+    return digest
+
+
+def read_object(digest, compressed=False):
+    with open(object_path(digest, compressed), 'rb') as f:
+        data = f.read()
+    if compressed:
+        data = zlib.decompress(data)
+    if hashlib.sha256(data).hexdigest() != digest:
+        raise Exception(f"Backup object {digest} is corrupt.")
+    return data
+
+
+def fixed_chunks(stream, size=FIXED_CHUNK_SIZE):
+    while chunk := stream.read(size):
+        yield chunk
+
+
+def line_chunks(stream):
+    """
+    Content-defined chunking for SQL dumps: chunks end after a line whose hash hits
+    BOUNDARY_MASK, so inserting rows only changes the chunks around the insert and
+    the rest of the dump still deduplicates against earlier backups.
+    """
+    buffer = []
+    size = 0
+    for line in stream:
+        buffer.append(line)
+        size += len(line)
+        at_boundary = size >= MIN_CHUNK_SIZE and (zlib.crc32(line) & BOUNDARY_MASK) == 0
+        if at_boundary or size >= MAX_CHUNK_SIZE:
+            yield b''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def store_database(stream, binary, stats):
+    # Chunks a database dump/file into the store; returns the chunk digests in order
+    chunker = fixed_chunks if binary else line_chunks
+    return [put_object(chunk, stats, compress=True) for chunk in chunker(stream)]
+
+
+def previous_media_index():
+    # path -> entry from the newest manifest, so unchanged files aren't re-hashed
+    latest = list_manifests()[:1]
+    if not latest:
+        return {}
+    return {entry['path']: entry for entry in load_manifest(latest[0]['name'])['media']}
+
+
+def store_media(media_root, stats, progress=None):
+    previous = previous_media_index()
+    paths = []
+    for root, _, files in os.walk(media_root):
+        paths.extend(os.path.join(root, fname) for fname in sorted(files))
+    entries = []
+    for done, full_path in enumerate(paths, 1):
+        rel_path = os.path.relpath(full_path, media_root).replace(os.sep, '/')
+        stat = os.stat(full_path)
+        known = previous.get(rel_path)
+        if known and known['size'] == stat.st_size and known['mtime'] == stat.st_mtime and os.path.exists(object_path(known['sha256'])):
+            # Same size and mtime as last time: reuse the digest without reading the file
+            stats.bytes_deduplicated += stat.st_size
+            digest = known['sha256']
+            os.utime(object_path(digest))
+        else:
+            with open(full_path, 'rb') as f:
+                digest = put_object(f.read(), stats)
+        entries.append({'path': rel_path, 'sha256': digest, 'size': stat.st_size, 'mtime': stat.st_mtime})
+        if progress:
+            progress(done, len(paths))
+    return entries
+
+
+def write_manifest(manifest):
+    os.makedirs(MANIFESTS_DIR, exist_ok=True)
+    name = f"incremental_{datetime.datetime.now().strftime(MANIFEST_TIME_FORMAT)}.json"
+    with open(os.path.join(MANIFESTS_DIR, name), 'w') as f:
+        json.dump(manifest, f, indent=1)
+    return name
+
+
+def manifest_path(name):
+    # Manifests are addressed by bare filename only
+    if os.path.basename(name) != name or not name.endswith('.json'):
+        raise Exception("Invalid manifest name.")
+    return os.path.join(MANIFESTS_DIR, name)
+
+
+def load_manifest(name):
+    with open(manifest_path(name)) as f:
+        return json.load(f)
+
+
+def list_manifests():
+    # Newest first
+    if not os.path.isdir(MANIFESTS_DIR):
+        return []
+    names = sorted((n for n in os.listdir(MANIFESTS_DIR) if n.endswith('.json')), reverse=True)
+    # The timestamp is part of the name, so listing doesn't open every manifest
+    return [
+        {'name': name, 'created_at': datetime.datetime.strptime(name[len('incremental_'):-len('.json')], MANIFEST_TIME_FORMAT)}
+        for name in names
+    ]
+
+
+def write_database(manifest, out):
+    # Reassemble the database dump/file of a manifest into a binary stream
+    for digest in manifest['database']['chunks']:
+        out.write(read_object(digest, compressed=True))
+
+
+def restore_media(manifest, media_root):
+    # Rebuild MEDIA_ROOT exactly as it was when the manifest was written
+    staging = f"{media_root.rstrip(os.sep)}.restoring"
+    if os.path.exists(staging):
+        shutil.rmtree(staging)
+    os.makedirs(staging)
+    for entry in manifest['media']:
+        target = os.path.join(staging, *entry['path'].split('/'))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, 'wb') as f:
+            f.write(read_object(entry['sha256']))
+        os.utime(target, (entry['mtime'], entry['mtime']))
+    # Swap only after every file was read back and verified
+    if os.path.exists(media_root):
+        shutil.rmtree(media_root)
+    os.replace(staging, media_root)
+    return len(manifest['media'])
+
+
+def referenced_objects(manifest):
+    # Paths of every object a manifest needs
+    paths = {object_path(digest, compressed=True) for digest in manifest['database']['chunks']}
+    paths.update(object_path(entry['sha256']) for entry in manifest['media'])
+    return paths
+
+
+def prune(keep, grace=None):
+    """
+    Deletes all but the `keep` newest manifests, then every object (or leftover .tmp
+    file) that none of the remaining manifests references. Objects modified in the last
+    `grace` seconds (PRUNE_GRACE) are kept: a backup still in progress may have just
+    written or reused them. Returns (manifests removed, objects removed, bytes freed).
+    """
+    if keep < 1:
+        raise ValueError("At least one manifest must be kept.")
+    names = [manifest['name'] for manifest in list_manifests()]
+    for name in names[keep:]:
+        os.remove(manifest_path(name))
+
+    referenced = set()
+    for name in names[:keep]:
+        referenced |= referenced_objects(load_manifest(name))
+
+    cutoff = time.time() - (PRUNE_GRACE if grace is None else grace)
+    removed = freed = 0
+    for root, _, files in os.walk(OBJECTS_DIR):
+        for fname in files:
+            path = os.path.join(root, fname)
+            if path in referenced:
+                continue
+            try:
+                stat = os.stat(path)
+                if stat.st_mtime > cutoff:
+                    continue
+                os.remove(path)
+            except FileNotFoundError:
+                continue  # Removed by another prune
+            removed += 1
+            freed += stat.st_size
+    return len(names[keep:]), removed, freed
@@ -0,0 +1,125 @@
+import os
+import queue
+import struct
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# Streaming helpers for backup archives.
+#
+# ParallelGzipWriter compresses blocks on every core (zlib releases the GIL) and
+# stitches them into one standard .gz stream, the way pigz does: each block is raw
+# deflate ending in a sync flush, so the blocks concatenate into a single valid
+# deflate stream. Output is readable by gzip, tarfile and the existing restore.
+#
+# ChunkPipe hands bytes from one thread to another, so an upload can be extracted
+# while it is still arriving.
+
+BLOCK_SIZE = 1024 * 1024
+GZIP_HEADER = b'\x1f\x8b\x08\x00' + b'\x00\x00\x00\x00' + b'\x00\xff'  # deflate, no name, mtime 0, unknown OS
+
+
+def compress_block(data, level, last):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+
+class ParallelGzipWriter:
+    # Write-only file object producing a .gz stream into `fileobj`
+    def __init__(self, fileobj, level=6, workers=None, block_size=BLOCK_SIZE):
+        self.fileobj = fileobj
+        self.level = level
+        self.block_size = block_size
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = ThreadPoolExecutor(self.workers)
+        self.pending = deque()  # Compressed blocks, written out in submission order
+        self.buffer = bytearray()
+        self.crc = 0
+        self.size = 0
+        self.closed = False
+        self.fileobj.write(GZIP_HEADER)
+
+    def write(self, data):
+        self.buffer += data
+        self.crc = zlib.crc32(data, self.crc)
+        self.size += len(data)
+        while len(self.buffer) >= self.block_size:
+            self._submit(bytes(self.buffer[:self.block_size]), last=False)
+            del self.buffer[:self.block_size]
+        return len(data)
+
+    def _submit(self, block, last):
+        self.pending.append(self.pool.submit(compress_block, block, self.level, last))
+        # Bound memory: keep at most two blocks per worker in flight
+        while len(self.pending) > self.workers * 2:
+            self.fileobj.write(self.pending.popleft().result())
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self._submit(bytes(self.buffer), last=True)
+        while self.pending:
+            self.fileobj.write(self.pending.popleft().result())
+        self.pool.shutdown()
+        self.fileobj.write(struct.pack('<II', self.crc & 0xffffffff, self.size & 0xffffffff))
+
+    def flush(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ChunkPipe:
+    """
+    Bounded, thread-safe byte pipe. The producer calls write()/close(); the consumer
+    reads it like a file. A full pipe blocks the producer, so a slow consumer applies
+    back-pressure instead of buffering the whole stream in memory.
+    """
+    def __init__(self, max_chunks=64):
+        self.chunks = queue.Queue(max_chunks)
+        self.current = b''
+        self.eof = False
+        self.aborted = False
+
+    def write(self, data):
+        # Once the consumer gave up, drop data instead of blocking forever
+        while not self.aborted:
+            try:
+                self.chunks.put(bytes(data), timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def close(self):
+        while not self.aborted:
+            try:
+                self.chunks.put(None, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def abort(self):
+        self.aborted = True
+
+    def read(self, size=-1):
+        parts = []
+        remaining = size
+        while not self.eof and (size < 0 or remaining > 0):
+            if not self.current:
+                chunk = self.chunks.get()
+                if chunk is None:
+                    self.eof = True
+                    break
+                self.current = chunk
+            take = self.current if size < 0 else self.current[:remaining]
+            self.current = self.current[len(take):]
+            parts.append(take)
+            if size >= 0:
+                remaining -= len(take)
+        return b''.join(parts)
+
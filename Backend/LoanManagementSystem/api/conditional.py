@@ -0,0 +1,119 @@
+import datetime
+import functools
+import hashlib
+import time
+from asgiref.sync import iscoroutinefunction
+from django.core.cache import cache
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+from .models import LoanLedger
+
+# Conditional GET for list and detail endpoints.
+#
+# Every table behind an endpoint has a version in the cache (a time_ns() value) that
+# signals and the bulk writers bump on each change. ETag and Last-Modified are derived
+# from those versions alone, so answering If-None-Match / If-Modified-Since with a 304
+# costs one cache read and never touches the rows. The versions live in the default
+# cache (settings.CACHES), which every worker process shares.
+#
+# A loan's schedule is versioned by its LoanLedger's updated_at instead: the ledger is
+# written when the schedule is generated and by every posting to it (api.payments), so a
+# schedule costs one primary-key read to validate and there is no cache key per loan.
+
+TABLE_VERSION_KEY = 'table_version:{}'
+TABLES = ('user', 'member', 'membersignature', 'loans', 'amortization', 'payment', 'schedules')  # 'schedules': epoch of every loan's schedule
+
+
+def get_versions(keys):
+    # Current versions for cache keys; a missing one (first use, cache cleared) starts now
+    versions = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def bump_table_versions(*tables):
+    # Tables whose rows changed; every cached copy of their endpoints becomes stale
+    now = time.time_ns()
+    cache.set_many({TABLE_VERSION_KEY.format(table): now for table in tables or TABLES}, None)
+
+
+def schedule_version(loan_id):
+    # Version of one loan's schedule; 0 until it has a ledger
+    updated_at = LoanLedger.objects.filter(loan_id=loan_id).values_list('updated_at', flat=True).first()
+    return int(updated_at.timestamp() * 1e6) * 1000 if updated_at else 0
+
+
+def validators(request, keys, extra=None):
+    """
+    (ETag, Last-Modified) for the request from the versions under `keys`, plus the ones
+    `extra()` returns. The path and query string are part of the tag, so every page or
+    projection has its own. Computed once per request: Django's condition() asks for each separately.
+    """
+    cached = getattr(request, '_conditional_validators', None)
+    if cached is None:
+        versions = get_versions(keys) + (extra() if extra else [])
+        digest = hashlib.blake2s(f"{request.get_full_path()}|{versions}".encode(), digest_size=12).hexdigest()
+        last_modified = datetime.datetime.fromtimestamp(max(versions) / 1e9, tz=datetime.timezone.utc)
+        cached = request._conditional_validators = (f'"{digest}"', last_modified)
+    return cached
+
+
+def conditional(keys_for, extra_for=None):
+    """
+    Decorator for GET views, sync or async (placed below @api_view / @async_api_view, so
+    authentication runs first).
+    keys_for(request, *args, **kwargs) returns the version keys the response depends on;
+    extra_for(request, *args, **kwargs), if given, versions read from elsewhere.
+    Responses must always be revalidated.
+    """
+    def request_validators(request, *args, **kwargs):
+        extra = (lambda: extra_for(request, *args, **kwargs)) if extra_for else None
+        return validators(request, keys_for(request, *args, **kwargs), extra)
+
+    def etag(request, *args, **kwargs):
+        return request_validators(request, *args, **kwargs)[0]
+
+    def last_modified(request, *args, **kwargs):
+        return request_validators(request, *args, **kwargs)[1]
+
+    def cache_control(response):
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def decorator(view):
+        conditional_view = condition(etag_func=etag, last_modified_func=last_modified)(view)
+
+        if iscoroutinefunction(view):
+            @functools.wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                if request.method not in ('GET', 'HEAD'):
+                    return await view(request, *args, **kwargs)
+                # Cache and ledger reads block: compute the validators in the async views' query pool
+                from .async_views import in_thread  # async_views imports this module
+                await in_thread(request_validators, request, *args, **kwargs)
+                return cache_control(await conditional_view(request, *args, **kwargs))
+            return async_wrapper
+
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            return cache_control(conditional_view(request, *args, **kwargs))
+        return wrapper
+    return decorator
+
+
+def on_tables(*tables):
+    # Versions of whole tables (lists and detail views)
+    keys = [TABLE_VERSION_KEY.format(table) for table in tables]
+    return conditional(lambda request, *args, **kwargs: keys)
+
+
+def on_schedule(pk_kwarg='pk'):
+    # One loan's schedule, plus the schedules epoch so a restore invalidates all of them
+    keys = [TABLE_VERSION_KEY.format('schedules')]
+    return conditional(lambda request, *args, **kwargs: keys,
+                       lambda request, *args, **kwargs: [schedule_version(kwargs[pk_kwarg])])
@@ -0,0 +1,135 @@
+from auditlog.models import LogEntry
+from django.contrib.contenttypes.models import ContentType
+from django.db import IntegrityError, transaction
+from .models import AuditSnapshot
+
+# Per-object history from the audit log.
+#
+# The state of an object at time T is its CREATE entry with every later change diff
+# folded in. To keep that bounded, AuditSnapshot checkpoints hold the folded state after
+# every SNAPSHOT_INTERVAL-th entry of an object: a reconstruction starts from the latest
+# checkpoint before T and replays fewer than SNAPSHOT_INTERVAL diffs. Checkpoints are
+# written as entries arrive (signals), by any reconstruction that had to replay further,
+# and before entries are archived (api.audit_archive), so archiving never breaks history.
+#
+# Values are the strings auditlog recorded ("None" for empty foreign keys and nulls).
+
+SNAPSHOT_INTERVAL = 50
+
+ENTRY_COLUMNS = ('id', 'timestamp', 'action', 'changes')
+
+
+def apply_entry(state, entry):
+    # The state after one LogEntry (as a dict of ENTRY_COLUMNS); None means deleted
+    if entry['action'] == LogEntry.Action.DELETE:
+        return None
+    if entry['action'] == LogEntry.Action.CREATE or state is None:
+        state = {}
+    else:
+        state = dict(state)
+    for field, change in (entry['changes'] or {}).items():
+        # m2m changes are dicts, not [old, new] pairs; audited models have none
+        if isinstance(change, list) and len(change) == 2:
+            state[field] = change[1]
+    return state
+
+
+def latest_snapshot(content_type_id, object_id, at=None, entry_id=None):
+    # The newest checkpoint taken no later than `at` / entry `entry_id`
+    snapshots = AuditSnapshot.objects.filter(content_type_id=content_type_id, object_id=object_id)
+    if at is not None:
+        snapshots = snapshots.filter(timestamp__lte=at)
+    if entry_id is not None:
+        snapshots = snapshots.filter(entry_id__lte=entry_id)
+    return snapshots.order_by('-entry_id').first()
+
+
+def save_snapshot(content_type_id, object_id, entry, state):
+    try:
+        with transaction.atomic():
+            AuditSnapshot.objects.create(content_type_id=content_type_id, object_id=object_id,
+                                         entry_id=entry['id'], timestamp=entry['timestamp'], state=state)
+    except IntegrityError:
+        pass  # Another request checkpointed the same entry
+
+
+def replay(content_type_id, object_id, at=None, entry_id=None):
+    """
+    Folds the object's entries up to `at` (a datetime) and/or `entry_id` onto the latest
+    checkpoint before them. Returns (state, last entry folded or None, entries replayed,
+    whether a checkpoint was used), checkpointing every SNAPSHOT_INTERVAL entries it walks past.
+    """
+    snapshot = latest_snapshot(content_type_id, object_id, at, entry_id)
+    state = snapshot.state if snapshot else None
+    last = {'id': snapshot.entry_id, 'timestamp': snapshot.timestamp} if snapshot else None
+
+    entries = LogEntry.objects.filter(content_type_id=content_type_id, object_id=object_id)
+    if snapshot:
+        entries = entries.filter(id__gt=snapshot.entry_id)
+    if at is not None:
+        entries = entries.filter(timestamp__lte=at)
+    if entry_id is not None:
+        entries = entries.filter(id__lte=entry_id)
+
+    replayed = 0
+    for entry in entries.order_by('id').values(*ENTRY_COLUMNS).iterator():
+        state = apply_entry(state, entry)
+        last = entry
+        replayed += 1
+        if replayed % SNAPSHOT_INTERVAL == 0:
+            save_snapshot(content_type_id, object_id, entry, state)
+    return state, last, replayed, snapshot is not None
+
+
+def has_full_history(content_type_id, object_id):
+    # True when the table still starts the object's history: its first entry is the CREATE,
+    # or it has no history at all. False once early entries were archived (or predate auditing).
+    first = LogEntry.objects.filter(content_type_id=content_type_id, object_id=object_id).order_by('id').values('action').first()
+    if first is None:
+        return not AuditSnapshot.objects.filter(content_type_id=content_type_id, object_id=object_id).exists()
+    return first['action'] == LogEntry.Action.CREATE
+
+
+def state_at(model, object_id, at=None):
+    """
+    Reconstructed fields of a `model` row at datetime `at` (default: latest entry).
+    Returns {'exists', 'state', 'complete', 'entry_id', 'entry_timestamp', 'replayed'}.
+    exists is False before the object was created and after it was deleted; complete is
+    False when `at` falls before the history still available (archived entries), in which
+    case state only holds the fields changed since.
+    """
+    content_type = ContentType.objects.get_for_model(model)
+    state, last, replayed, from_snapshot = replay(content_type.pk, object_id, at=at)
+    return {
+        'exists': state is not None,
+        'state': state,
+        'complete': from_snapshot or has_full_history(content_type.pk, object_id),
+        'entry_id': last['id'] if last else None,
+        'entry_timestamp': last['timestamp'] if last else None,
+        'replayed': replayed,
+    }
+
+
+def checkpoint_if_due(entry):
+    # Called for each new LogEntry: checkpoint once SNAPSHOT_INTERVAL entries piled up since the last one
+    if entry.object_id is None:
+        return
+    snapshot = latest_snapshot(entry.content_type_id, entry.object_id)
+    pending = LogEntry.objects.filter(content_type_id=entry.content_type_id, object_id=entry.object_id, id__lte=entry.id)
+    if snapshot:
+        pending = pending.filter(id__gt=snapshot.entry_id)
+    if pending.count() >= SNAPSHOT_INTERVAL:
+        replay(entry.content_type_id, entry.object_id, entry_id=entry.id)  # Checkpoints as it goes
+
+
+def checkpoint_objects(last_entries):
+    """
+    Checkpoints objects at the given entries, e.g. the last of each object's entries
+    about to be archived. `last_entries` maps (content_type_id, object_id) -> entry id.
+    """
+    for (content_type_id, object_id), entry_id in last_entries.items():
+        if object_id is None:
+            continue
+        state, last, replayed, _ = replay(content_type_id, object_id, entry_id=entry_id)
+        if replayed and last['id'] == entry_id:
+            save_snapshot(content_type_id, object_id, last, state)
@@ -0,0 +1,160 @@
+import codecs
+import csv
+import os
+from itertools import islice
+from zipfile import BadZipFile
+from auditlog.models import LogEntry
+from django.db import transaction
+from openpyxl import load_workbook
+from openpyxl.utils.exceptions import InvalidFileException
+from rest_framework.serializers import ValidationError, as_serializer_error
+from . import audit, search
+from .models import Member, SearchToken
+from .serializers import MemberImportSerializer
+from .utils import invalidate_dashboard_summary, invalidate_portfolio_analytics
+from .conditional import bump_table_versions
+
+# Bulk member import from .csv / .xlsx files.
+#
+# Rows are streamed from the file (openpyxl in read-only mode, csv line by line) and
+# handled CHUNK_SIZE at a time: each row is validated with MemberImportSerializer, the
+# chunk's service numbers are checked against the database in one query, and the valid
+# members are written with one bulk_create, together with their search tokens and audit
+# log entries. Invalid rows are skipped and reported by row number.
+
+CHUNK_SIZE = 500
+EXCEL_EXTENSIONS = ('.xlsx', '.xlsm')
+CSV_EXTENSIONS = ('.csv',)
+
+
+def compact(value):
+    # "Service No" / "service-no" / " SERVICE_NO " -> "serviceno"
+    return ''.join(ch for ch in str(value or '').lower() if ch.isalnum())
+
+
+def cell_text(value):
+    # Spreadsheet cells come back typed; 12345.0 is a service number typed as a number
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def read_header(values, serializer_class=MemberImportSerializer):
+    """
+    Serializer field names for the header cells (None for unknown columns). Headers match
+    regardless of case, spaces and punctuation, so "Last Name" maps to lastname.
+    Fails before anything is imported when a required column is missing altogether.
+    """
+    fields = serializer_class().fields
+    by_compact = {compact(name): name for name in fields}
+    header = [by_compact.get(compact(value)) for value in values]
+    missing = [name for name, field in fields.items() if field.required and name not in header]
+    if missing:
+        raise ValueError(f"Missing column(s): {', '.join(missing)}.")
+    return header
+
+
+def table_rows(rows, serializer_class=MemberImportSerializer):
+    """
+    (row number, {field: text}) for every non-empty row of an iterator of cell tuples
+    whose first item is the header. Row numbers match the spreadsheet, header being row 1.
+    """
+    header = read_header(next(rows, ()), serializer_class)
+    for number, values in enumerate(rows, start=2):
+        row = {field: cell_text(value) for field, value in zip(header, values) if field}
+        if any(row.values()):
+            yield number, row
+
+
+def read_rows(fileobj, name, serializer_class=MemberImportSerializer):
+    # Rows of an uploaded or opened (binary) .csv / .xlsx file, streamed; columns are serializer_class's fields
+    extension = os.path.splitext(name)[1].lower()
+    if extension in EXCEL_EXTENSIONS:
+        try:
+            workbook = load_workbook(fileobj, read_only=True, data_only=True)
+        except (InvalidFileException, BadZipFile, KeyError) as exc:
+            raise ValueError("The file is not a readable .xlsx workbook.") from exc
+        try:
+            yield from table_rows(workbook.active.iter_rows(values_only=True), serializer_class)
+        finally:
+            workbook.close()
+    elif extension in CSV_EXTENSIONS:
+        try:
+            yield from table_rows(csv.reader(codecs.iterdecode(fileobj, 'utf-8-sig')), serializer_class)
+        except UnicodeDecodeError as exc:
+            raise ValueError("CSV files must be UTF-8 encoded.") from exc
+    else:
+        raise ValueError("Unsupported file type; upload a .csv or .xlsx file.")
+
+
+def validate_chunk(chunk, seen, errors):
+    """
+    Unsaved members for the valid rows of `chunk`. Problems are appended to `errors`;
+    `seen` maps service numbers taken by earlier rows of the file to their row number.
+    """
+    # One serializer validates every row, as ListSerializer does with its child; building
+    # a ModelSerializer's fields costs more than validating a row
+    serializer = MemberImportSerializer()
+    candidates = []
+    for number, row in chunk:
+        try:
+            candidates.append((number, serializer.run_validation(row)))
+        except ValidationError as exc:
+            errors.append({'row': number, 'errors': as_serializer_error(exc)})
+
+    service_numbers = [data['service_no'] for _, data in candidates]
+    existing = set(Member.objects.filter(service_no__in=service_numbers).values_list('service_no', flat=True))
+
+    members = []
+    for number, data in candidates:
+        service_no = data['service_no']
+        if service_no in existing:
+            errors.append({'row': number, 'errors': {'service_no': ['member with this service no already exists.']}})
+        elif service_no in seen:
+            errors.append({'row': number, 'errors': {'service_no': [f'duplicate of row {seen[service_no]}.']}})
+        else:
+            seen[service_no] = number
+            members.append(Member(**data))
+    return members
+
+
+def save_chunk(members, actor=None):
+    # bulk_create sends no signals, so search tokens and audit entries are written here
+    with transaction.atomic():
+        Member.objects.bulk_create(members)
+        if any(member.pk is None for member in members):
+            # MySQL doesn't return the ids of bulk-inserted rows
+            ids = dict(Member.objects.filter(service_no__in=[m.service_no for m in members]).values_list('service_no', 'pk'))
+            for member in members:
+                member.pk = ids[member.service_no]
+        SearchToken.objects.bulk_create(
+            SearchToken(kind=SearchToken.MEMBER, object_id=member.pk, field=field, token=token)
+            for member in members
+            for field, token in search.tokens_for(SearchToken.MEMBER, member)
+        )
+        audit.bulk_log(members, LogEntry.Action.CREATE, actor)
+    return len(members)
+
+
+def import_members(rows, actor=None, chunk_size=CHUNK_SIZE, dry_run=False):
+    """
+    Imports (row number, row) pairs as members. Valid rows are saved even when other rows
+    fail; with dry_run nothing is saved. Returns {'rows', 'created', 'errors'}, where each
+    error is {'row': number, 'errors': {field: [messages]}}.
+    """
+    report = {'rows': 0, 'created': 0, 'errors': []}
+    seen = {}
+    rows = iter(rows)
+    while chunk := list(islice(rows, chunk_size)):
+        report['rows'] += len(chunk)
+        members = validate_chunk(chunk, seen, report['errors'])
+        if members and not dry_run:
+            report['created'] += save_chunk(members, actor)
+    report['errors'].sort(key=lambda error: error['row'])
+    if report['created']:
+        invalidate_dashboard_summary()
+        invalidate_portfolio_analytics()
+        bump_table_versions('member')
+    return report
@@ -0,0 +1,185 @@
+import json
+import logging
+import os
+import threading
+import uuid
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+# Background jobs without a broker: each job is a directory under JOBS_ROOT holding
+# status.json (state, progress, result) plus whatever files the job produces.
+# Jobs run in a daemon thread of the web process that created them.
+# status.json is only written by the process running the job; a cancel request,
+# which can come from any worker, is a separate "cancel" flag file in the job's
+# directory, so it can never be lost to the runner's next progress write.
+
+logger = logging.getLogger(__name__)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+COMPLETED = 'completed'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+FINISHED = (COMPLETED, FAILED, CANCELLED)
+
+CANCEL_FLAG = 'cancel'
+
+_lock = threading.Lock()  # Serializes read-modify-write of status files within this process
+
+
+class JobCancelled(Exception):
+    # Raised inside a job when a cancellation was requested
+    pass
+
+
+def job_dir(job_id):
+    # Job ids are generated uuids; reject anything else so the id can't escape JOBS_ROOT
+    return os.path.join(settings.JOBS_ROOT, uuid.UUID(str(job_id)).hex)
+
+
+def job_file(job_id, name):
+    return os.path.join(job_dir(job_id), name)
+
+
+def _write(job):
+    # Write to a temp file and rename so readers never see a half-written status
+    path = job_file(job['id'], 'status.json')
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(job, f, default=str)
+    os.replace(tmp_path, path)
+
+
+def create_job(kind, params=None, user=None):
+    job_id = uuid.uuid4().hex
+    os.makedirs(job_dir(job_id))
+    now = timezone.now().isoformat()
+    job = {
+        'id': job_id,
+        'kind': kind,
+        'status': QUEUED,
+        'progress': 0,
+        'done': 0,
+        'total': None,
+        'params': params or {},
+        'user': getattr(user, 'username', None),
+        'result': None,
+        'error': None,
+        'cancel_requested': False,
+        'created_at': now,
+        'updated_at': now,
+    }
+    _write(job)
+    return job
+
+
+def cancel_requested(job_id):
+    return os.path.exists(job_file(job_id, CANCEL_FLAG))
+
+
+def _read(job_id):
+    try:
+        with open(job_file(job_id, 'status.json')) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def get_job(job_id):
+    # The stored status with the cancel flag applied; a queued job that was cancelled never starts
+    job = _read(job_id)
+    if job is not None and job['status'] not in FINISHED and cancel_requested(job_id):
+        job['cancel_requested'] = True
+        if job['status'] == QUEUED:
+            job['status'] = CANCELLED
+    return job
+
+
+def update_job(job_id, **fields):
+    # Returns None, writing nothing, once the job's directory is gone
+    with _lock:
+        job = _read(job_id)
+        if job is None:
+            return None
+        job.update(fields, updated_at=timezone.now().isoformat())
+        try:
+            _write(job)
+        except FileNotFoundError:
+            return None
+        return job
+
+
+def report_progress(job_id, done, total):
+    """
+    Records progress and raises JobCancelled if a cancel was requested (or the job
+    was deleted), so long-running jobs call this between units of work.
+    """
+    if cancel_requested(job_id):
+        raise JobCancelled()
+    progress = 100 if not total else int(done * 100 / total)
+    job = update_job(job_id, done=done, total=total, progress=min(progress, 99))
+    if job is None:
+        raise JobCancelled()
+    return job
+
+
+def progress_reporter(job_id, start=0, end=100):
+    """
+    Returns a progress(done, total) callback for one phase of a job. The phase is
+    mapped onto start..end percent and the status file is only rewritten when the
+    percentage changes, so callers can report after every file or chunk.
+    """
+    last = [None]
+
+    def progress(done, total):
+        percent = start + (end - start) * done // total if total else end
+        if percent != last[0]:
+            last[0] = percent
+            report_progress(job_id, percent, 100)
+    return progress
+
+
+def request_cancel(job_id):
+    # Raises the cancel flag; a running job stops at its next report_progress call
+    job = get_job(job_id)
+    if job is None or job['status'] in FINISHED:
+        return job
+    try:
+        open(job_file(job_id, CANCEL_FLAG), 'a').close()
+    except FileNotFoundError:
+        return None  # Deleted in the meantime
+    return get_job(job_id)
+
+
+def run_job(job_id, func, *args, cleanup=None, **kwargs):
+    """
+    func(job_id, *args) returns the job's result (e.g. an output filename).
+    cleanup() runs once the job is over, whatever its outcome, including when it was
+    cancelled (or deleted) before it started and func never ran.
+    """
+    try:
+        job = get_job(job_id)
+        if job is None:
+            return
+        if job['status'] == CANCELLED:
+            update_job(job_id, status=CANCELLED, cancel_requested=True)
+            return
+        update_job(job_id, status=RUNNING)
+        result = func(job_id, *args, **kwargs)
+        update_job(job_id, status=COMPLETED, progress=100, result=result)
+    except JobCancelled:
+        update_job(job_id, status=CANCELLED, cancel_requested=True)
+    except Exception as e:
+        logger.exception("Job %s failed", job_id)
+        update_job(job_id, status=FAILED, error=str(e))
+    finally:
+        connection.close()  # Each thread has its own DB connection; don't leak it
+        if cleanup is not None:
+            cleanup()
+
+
+def start_job(job_id, func, *args, **kwargs):
+    thread = threading.Thread(target=run_job, args=(job_id, func, *args), kwargs=kwargs, daemon=True, name=f"job-{job_id}")
+    thread.start()
+    return thread
@@ -0,0 +1,69 @@
+from auditlog.models import LogEntry
+from django.db import transaction
+from . import audit
+from .models import Loans
+from .summaries import refresh_loan_summaries
+from .utils import generate_amortization_schedules, invalidate_dashboard_summary, invalidate_portfolio_analytics
+from .conditional import bump_table_versions
+
+# Batch status transitions (e.g. releasing a month's salary loans at once).
+#
+# The loans are locked and read with one query, every allowed change is applied with a
+# single UPDATE, and the audit entries are written with one INSERT. Optionally the
+# schedules of the newly released loans are generated in the same transaction. Caches
+# are only dropped once it commits, so no request can cache the old state in between.
+
+UPDATED = 'updated'
+UNCHANGED = 'unchanged'
+NOT_FOUND = 'not_found'
+NOT_ALLOWED = 'not_allowed'
+
+
+def transition_loans(loan_ids, new_status, actor=None, generate_schedules=False):
+    """
+    Moves the loans in `loan_ids` to `new_status` where Loans.STATUS_TRANSITIONS allows it.
+    Returns one result per distinct id, in request order:
+    {'id', 'result' (updated / unchanged / not_found / not_allowed), 'status', and with
+    generate_schedules, 'installments' created for each released loan}.
+    """
+    loan_ids = list(dict.fromkeys(loan_ids))
+    with transaction.atomic():
+        loans = Loans.objects.select_for_update().in_bulk(loan_ids)
+        results = {}
+        changed = []
+        for loan_id in loan_ids:
+            loan = loans.get(loan_id)
+            if loan is None:
+                results[loan_id] = {'id': loan_id, 'result': NOT_FOUND}
+            elif loan.status == new_status:
+                results[loan_id] = {'id': loan_id, 'result': UNCHANGED, 'status': loan.status}
+            elif new_status not in Loans.STATUS_TRANSITIONS.get(loan.status, ()):
+                results[loan_id] = {'id': loan_id, 'result': NOT_ALLOWED, 'status': loan.status}
+            else:
+                results[loan_id] = {'id': loan_id, 'result': UPDATED, 'status': new_status}
+                changed.append(loan)
+
+        if changed:
+            Loans.objects.filter(pk__in=[loan.pk for loan in changed]).update(status=new_status)
+            changes = {loan.pk: {'status': [loan.status, new_status]} for loan in changed}
+            for loan in changed:
+                loan.status = new_status
+            audit.bulk_log(changed, LogEntry.Action.UPDATE, actor, changes)
+            # update() sends no signals: refresh what post_save would have
+            refresh_loan_summaries([loan.pk for loan in changed])
+            transaction.on_commit(loans_changed)
+
+        if generate_schedules and new_status == 'released':
+            # Level-payment schedules; loans that already have one are left as they are
+            created = generate_amortization_schedules(changed)
+            for loan in changed:
+                results[loan.pk]['installments'] = created.get(loan.pk, 0)
+
+    return [results[loan_id] for loan_id in loan_ids]
+
+
+def loans_changed():
+    # The caches post_save would have dropped, once the transition is committed
+    invalidate_dashboard_summary()
+    invalidate_portfolio_analytics()
+    bump_table_versions('loans')
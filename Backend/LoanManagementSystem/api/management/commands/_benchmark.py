@@ -0,0 +1,137 @@
+import contextlib
+import datetime
+import random
+import time
+from decimal import Decimal
+from auditlog.models import LogEntry
+from django.db import connections, transaction
+from api import audit, search
+from api.conditional import bump_table_versions
+from api.models import Member, Loans, SearchToken
+from api.utils import generate_amortization_schedules
+
+# Shared helpers for the benchmark_* commands (Django skips modules starting with "_")
+
+FIRSTNAMES = ['Jose', 'Maria', 'Juan', 'Ana', 'Pedro', 'Rosa', 'Miguel', 'Elena', 'Carlos', 'Luz', 'Andres', 'Teresa',
+              'Ramon', 'Liza', 'Antonio', 'Carmen', 'Rogelio', 'Josefina', 'Danilo', 'Marites', 'Eduardo', 'Cristina']
+# Surnames are built from stems and endings to get a realistic spread (~600 distinct names)
+SURNAME_STEMS = ['Cruz', 'Sant', 'Rey', 'Garc', 'Mend', 'Baut', 'Villan', 'Ram', 'Aquin', 'Castill', 'Peñafl', 'Navarr',
+                 'Torr', 'Flor', 'Gonzal', 'Lop', 'Marqu', 'Domingu', 'Salaz', 'Aguil', 'Pascu', 'Ocamp', 'Tolent', 'Manal']
+SURNAME_ENDINGS = ['', 'o', 'os', 'es', 'ez', 'ado', 'ida', 'ino', 'uela', 'era', 'illo', 'an', 'on', 'ar', 'ista', 'ueva',
+                   'ia', 'iz', 'ero', 'ano', 'ente', 'ilo', 'ua', 'amo', 'ona']
+UNITS = ['1st Infantry Division', '2nd Infantry Division', 'Naval Forces West', 'Coast Guard District NCR', 'BFP Region 3']
+# Loan terms (months), rates (%/year) and statuses in roughly the proportions of the live data
+TERMS = [6, 12, 12, 24, 24, 36]
+RATES = [Decimal('6.00'), Decimal('9.00'), Decimal('12.00'), Decimal('15.00')]
+STATUSES = ['released'] * 7 + ['pending'] * 2 + ['reject']
+SCHEDULE_BATCH = 5000  # Rows per schedule/audit batch; each batch's installments and entries are held in memory
+
+
+class Rollback(Exception):
+    pass
+
+
+@contextlib.contextmanager
+def rolled_back():
+    # Everything written inside the block is undone, so benchmarks never touch real data
+    try:
+        with transaction.atomic():
+            yield
+            raise Rollback()
+    except Rollback:
+        pass
+
+
+def timed(func, *args, repeat=1, **kwargs):
+    # Best wall time over `repeat` runs, and the last result
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(*args, **kwargs)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def synthetic_members(count, prefix='BENCH', seed=0):
+    # Unsaved Member rows with realistic-looking names and unique service numbers
+    rng = random.Random(seed)
+    surnames = [stem + ending for stem in SURNAME_STEMS for ending in SURNAME_ENDINGS]
+    branches = [key for key, _ in Member.BRANCH_OF_SERVICE_CHOICES]
+    return [
+        Member(
+            lastname=rng.choice(surnames), firstname=rng.choice(FIRSTNAMES), middlename=rng.choice(surnames),
+            nationality='Filipino', sex=rng.choice('MF'), branch_of_service=rng.choice(branches),
+            service_no=f'{prefix}-{n:07d}', office_business_address='Camp Aguinaldo, Quezon City',
+            unit_assignment=rng.choice(UNITS), occupation_designation='Sergeant', source_of_income='Salary',
+        )
+        for n in range(count)
+    ]
+
+
+def synthetic_loans(members, seed=0):
+    # Unsaved loans for saved members: 0-2 each (1.2 on average), cycling through every loan type
+    rng = random.Random(seed)
+    types = [key for key, _ in Loans.LOAN_TYPE_CHOICES]
+    first_start = datetime.date(2023, 1, 1)
+    loans = []
+    for member in members:
+        for _ in range(rng.choice([0, 1, 1, 1, 2])):
+            term = rng.choice(TERMS)
+            start = first_start + datetime.timedelta(days=rng.randrange(1095))
+            loans.append(Loans(
+                member=member, loan_type=types[len(loans) % len(types)], loan_amount=Decimal(rng.randrange(50, 5000) * 100),
+                interest=rng.choice(RATES), term=term, grace=rng.choice([0, 0, 0, 1, 2]), payment_start_date=start,
+                maturity_date=start + datetime.timedelta(days=30 * term), status=rng.choice(STATUSES),
+            ))
+    return loans
+
+
+def synthetic_history(members, loans, actor=None, seed=0):
+    """
+    Audit entries for freshly bulk-created rows: a CREATE for every member and loan, and
+    a status UPDATE for decided loans, spread over the loans' start dates. Written with
+    api.audit.bulk_log, as bulk writes do.
+    """
+    rng = random.Random(seed)
+    entries = audit.log_entries(members, audit.ACTIONS['create'], actor) + audit.log_entries(loans, audit.ACTIONS['create'], actor)
+    decided = [loan for loan in loans if loan.status != 'pending']
+    entries += audit.log_entries(decided, audit.ACTIONS['update'], actor,
+                                 changes={loan.pk: {'status': ['pending', loan.status]} for loan in decided})
+    for entry in entries:
+        entry.timestamp -= datetime.timedelta(days=rng.randrange(730), seconds=rng.randrange(86400))
+    return LogEntry.objects.bulk_create(entries, batch_size=2000)
+
+
+def generate_dataset(member_count, prefix='SYN', seed=0, history=True, actor=None):
+    """
+    Writes a realistic data set: `member_count` members across every branch of service,
+    their loans of every type and status, schedules for the released ones, search tokens,
+    loan summaries and audit history. Returns row counts by table.
+    """
+    Member.objects.bulk_create(synthetic_members(member_count, prefix=prefix, seed=seed), batch_size=2000)
+    members = list(Member.objects.filter(service_no__startswith=f'{prefix}-').order_by('pk'))  # With ids on MySQL too
+    Loans.objects.bulk_create(synthetic_loans(members, seed=seed), batch_size=2000)
+    loans = list(Loans.objects.filter(member__service_no__startswith=f'{prefix}-').order_by('pk'))
+
+    schedules = 0
+    for start in range(0, len(loans), SCHEDULE_BATCH):  # Also writes the loans' summaries
+        schedules += sum(generate_amortization_schedules(loans[start:start + SCHEDULE_BATCH]).values())
+    search.rebuild(SearchToken.MEMBER, Member.objects.all())  # bulk_create skips the reindexing signal
+    entries = 0
+    for start in range(0, max(len(members), len(loans)) if history else 0, SCHEDULE_BATCH):
+        batch = slice(start, start + SCHEDULE_BATCH)
+        entries += len(synthetic_history(members[batch], loans[batch], actor, seed + start))
+    bump_table_versions()
+    return {'members': len(members), 'loans': len(loans), 'amortization': schedules, 'audit_entries': entries}
+
+
+def use_sqlite(path):
+    # Points the default connection (in every thread) at a fresh SQLite file
+    initialized = connections.all(initialized_only=True)
+    for connection in initialized:
+        connection.close()
+    connections.settings['default'].update({'ENGINE': 'django.db.backends.sqlite3', 'NAME': path, 'HOST': '', 'PORT': '',
+                                            'USER': '', 'PASSWORD': '', 'OPTIONS': {}})
+    if any(connection.alias == 'default' for connection in initialized):
+        del connections['default']  # This thread's connection; other threads connect afresh
@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from api import audit_archive
+
+
+class Command(BaseCommand):
+    help = ("Moves audit log entries older than the retention window into compressed monthly archive "
+            "files (AUDIT_ARCHIVE_ROOT), which /api/auditlogs/archive/ can still query.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.AUDIT_LOG_RETENTION_DAYS,
+                            help='Keep this many days of entries in the table (default: AUDIT_LOG_RETENTION_DAYS).')
+        parser.add_argument('--batch-size', type=int, default=audit_archive.BATCH_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help='Only count the entries that would be archived.')
+
+    def handle(self, *args, **options):
+        if options['days'] < 0:
+            raise CommandError("--days can't be negative.")
+        cutoff = audit_archive.cutoff_for(options['days'])
+        counts = audit_archive.archive_before(cutoff, options['batch_size'], options['dry_run'])
+
+        for month, count in sorted(counts.items()):
+            self.stdout.write(f"{month}: {count}")
+        verb = 'Would archive' if options['dry_run'] else 'Archived'
+        self.stdout.write(self.style.SUCCESS(f"{verb} {sum(counts.values())} entries older than {cutoff:%Y-%m-%d %H:%M}."))
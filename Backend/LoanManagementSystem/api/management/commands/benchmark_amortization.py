@@ -0,0 +1,47 @@
+import datetime
+from django.core.management.base import BaseCommand
+from api.amortization import build_loan_schedule
+from api.models import Loans, Amortization
+from api.utils import generate_amortization_schedules, schedule_to_models
+from ._benchmark import rolled_back, synthetic_members, timed
+
+
+class Command(BaseCommand):
+    help = "Compares per-row saves with the bulk amortization engine (runs in a rolled-back transaction)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loans', type=int, default=1000, help='Number of synthetic released loans.')
+        parser.add_argument('--term', type=int, default=60, help='Installments per loan.')
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            self.run(options['loans'], options['term'])
+
+    def run(self, loan_count, term):
+        member = synthetic_members(1, prefix='BENCH-AMORTIZATION')[0]
+        member.save()
+        start = datetime.date(2025, 1, 1)
+        Loans.objects.bulk_create([
+            Loans(member=member, loan_type='salary', loan_amount='50000.00', interest='12.00', term=term, grace=0,
+                  payment_start_date=start, maturity_date=start + datetime.timedelta(days=30 * term), status='released')
+            for _ in range(loan_count)
+        ])
+        loans = list(Loans.objects.filter(member=member))
+
+        # Old path: compute and save() one installment at a time
+        def per_row_save():
+            for loan in loans:
+                for record in schedule_to_models(loan, build_loan_schedule(loan)):
+                    record.save()
+
+        per_row, _ = timed(per_row_save)
+        rows = Amortization.objects.filter(loan__member=member).count()
+        Amortization.objects.filter(loan__member=member).delete()
+
+        # New path: one pass, bulk INSERTs
+        bulk, _ = timed(generate_amortization_schedules, loans)
+
+        self.stdout.write(f"{loan_count} loans x {term} installments ({rows} rows)")
+        self.stdout.write(f"  per-row save(): {per_row:.2f}s")
+        self.stdout.write(f"  bulk_create:    {bulk:.2f}s")
+        self.stdout.write(self.style.SUCCESS(f"  speedup:        {per_row / bulk:.1f}x"))
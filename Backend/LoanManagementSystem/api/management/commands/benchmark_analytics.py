@@ -0,0 +1,65 @@
+import datetime
+import numpy as np
+from django.core.management.base import BaseCommand
+from api import analytics
+from api.models import Member, Loans
+from api.utils import generate_amortization_schedules
+from ._benchmark import rolled_back, synthetic_members, timed
+
+
+def synthetic_portfolio(loan_count, term, seed=0):
+    # In-memory Portfolio of `loan_count` level-payment loans with `term` installments each
+    rng = np.random.default_rng(seed)
+    types = np.array([key for key, _ in Loans.LOAN_TYPE_CHOICES])
+    branches = np.array(sorted({key for key, _ in Member.BRANCH_OF_SERVICE_CHOICES}))
+    amounts = rng.integers(10_000, 500_000, loan_count) * 100
+    rates = rng.choice([6.0, 9.0, 12.0, 15.0], loan_count)
+    starts = np.datetime64('2024-01-01') + rng.integers(0, 730, loan_count).astype('timedelta64[D]')
+
+    seq = np.tile(np.arange(1, term + 1), loan_count)
+    loan_idx = np.repeat(np.arange(loan_count), term)
+    principal = np.repeat(amounts // term, term)
+    balance = np.repeat(amounts, term) - principal * seq
+    interest = (balance * np.repeat(rates, term) / 1200).astype(np.int64)
+    due = np.repeat(starts, term) + ((seq - 1) * 30).astype('timedelta64[D]')
+    return analytics.Portfolio(
+        loan_ids=np.arange(1, loan_count + 1), loan_types=rng.choice(types, loan_count),
+        branches=rng.choice(branches, loan_count), rates=rates, terms=np.full(loan_count, term), amounts=amounts,
+        loan_idx=loan_idx, due=due, principal=principal, interest=interest, balance=balance,
+    )
+
+
+class Command(BaseCommand):
+    help = "Times the vectorized portfolio analytics on synthetic schedules, and loading them from the database."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000, help='Installments in the in-memory portfolio.')
+        parser.add_argument('--term', type=int, default=60, help='Installments per loan.')
+        parser.add_argument('--db-loans', type=int, default=1000,
+                            help='Released loans written (in a rolled-back transaction) to time the database load; 0 skips it.')
+
+    def handle(self, *args, **options):
+        term = options['term']
+        portfolio = synthetic_portfolio(max(options['rows'] // term, 1), term)
+        as_of = datetime.date(2025, 6, 15)
+        elapsed, _ = timed(analytics.analyze, portfolio, as_of, 12, repeat=5)
+        self.stdout.write(f"analyze(): {len(portfolio)} installments in {elapsed * 1000:.1f}ms")
+
+        if options['db_loans']:
+            with rolled_back():
+                self.time_database_load(options['db_loans'], term)
+
+    def time_database_load(self, loan_count, term):
+        member = synthetic_members(1, prefix='BENCH-ANALYTICS')[0]
+        member.save()
+        start = datetime.date(2025, 1, 1)
+        Loans.objects.bulk_create([
+            Loans(member=member, loan_type='salary', loan_amount='50000.00', interest='12.00', term=term, grace=0,
+                  payment_start_date=start, maturity_date=start + datetime.timedelta(days=30 * term), status='released')
+            for _ in range(loan_count)
+        ])
+        generate_amortization_schedules(Loans.objects.filter(member=member))
+
+        elapsed, portfolio = timed(analytics.Portfolio.from_database)
+        self.stdout.write(f"Portfolio.from_database(): {len(portfolio)} installments in {elapsed * 1000:.1f}ms "
+                          f"({len(portfolio) / elapsed:,.0f} rows/s)")
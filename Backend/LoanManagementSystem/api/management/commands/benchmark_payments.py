@@ -0,0 +1,64 @@
+import csv
+import io
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from django.db.models import Sum
+from api import imports, payments
+from api.models import User, Loans, Amortization, LoanLedger
+from api.serializers import PaymentLineSerializer
+from ._benchmark import generate_dataset, rolled_back, timed
+
+
+class Command(BaseCommand):
+    help = ("Posts a payroll deduction file of --lines payments over a synthetic data set, then single payments one "
+            "by one, and checks the ledgers against the schedules (everything rolled back afterwards).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--members', type=int, default=20000, help='Synthetic members (about 0.85 released loans each).')
+        parser.add_argument('--lines', type=int, default=50000, help='Lines in the payroll file.')
+        parser.add_argument('--singles', type=int, default=500, help='Payments posted one request at a time.')
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            self.run(options['members'], options['lines'], options['singles'])
+
+    def run(self, member_count, line_count, single_count):
+        admin = User.objects.create_user('benchmark', None, firstname='Bench', lastname='Mark', usertype=User.ADMIN)
+        generate_dataset(member_count, prefix='BENCH', history=False, actor=admin)
+        loan_ids = list(Loans.objects.filter(status='released').order_by('pk').values_list('pk', flat=True))
+        dues = dict(Amortization.objects.filter(seq=1).values_list('loan_id', 'amortization'))
+
+        # Monthly deduction files: every loan's installment, one period after the other, some rounded up
+        out = io.StringIO()
+        writer = csv.writer(out)
+        writer.writerow(['loan_id', 'amount', 'reference'])
+        for n in range(line_count):
+            loan_id = loan_ids[n % len(loan_ids)]
+            amount = dues[loan_id] + (Decimal(n % 7 * 50) if n % 3 == 0 else 0)
+            writer.writerow([loan_id, amount, f'PAYROLL-{n // len(loan_ids) + 1:02d}'])
+        data = out.getvalue().encode()
+        self.stdout.write(f"{len(loan_ids)} released loans; payroll file of {line_count} lines ({len(data) / 1024:.0f} KB)")
+
+        def post_file():
+            rows = imports.read_rows(io.BytesIO(data), 'payroll.csv', PaymentLineSerializer)
+            return payments.post_payroll(rows, actor=admin)
+
+        seconds, report = timed(post_file)
+        self.stdout.write(f"  payroll   {report['posted']} posted, {len(report['errors'])} rejected in {seconds:.2f}s "
+                          f"({report['posted'] / seconds:,.0f} lines/s)")
+
+        def post_singles():
+            for n in range(single_count):
+                loan_id = loan_ids[n % len(loan_ids)]
+                payments.post_payment(loan_id, Decimal('100.00'), reference=f'OR-{n}', actor=admin)
+
+        if single_count:
+            seconds, _ = timed(post_singles)
+            self.stdout.write(f"  single    {single_count} payments in {seconds:.2f}s ({seconds / single_count * 1000:.2f}ms each)")
+
+        # The running totals must match what the installments record
+        paid = Amortization.objects.aggregate(interest=Sum('interest_paid'), principal=Sum('principal_paid'))
+        ledgers = LoanLedger.objects.aggregate(interest=Sum('interest_paid'), principal=Sum('principal_paid'))
+        paid, ledgers = ({key: round(value, 2) for key, value in sums.items()} for sums in (paid, ledgers))  # SQLite sums floats
+        check = self.style.SUCCESS('match') if paid == ledgers else self.style.ERROR(f'differ: {paid} != {ledgers}')
+        self.stdout.write(f"  ledgers and installments {check}")
@@ -0,0 +1,152 @@
+import datetime
+import os
+import tracemalloc
+from io import BytesIO
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from openpyxl import load_workbook
+from api import reports
+from api.amortization import level_payment
+from api.models import Loans, Amortization
+from api.utils import generate_amortization_schedule
+from ._benchmark import rolled_back, synthetic_members, timed
+
+
+def replace_first_occurrence(ws, target_text, replacement, occurrence=1):
+    """
+    Searches the worksheet for cells whose value exactly equals target_text.
+    When the nth occurrence (n = occurrence) is found, that cell’s value is replaced.
+    """
+    count = 0
+    # Iterate over all cells in the worksheet row by row
+    for row in ws.iter_rows():
+        for cell in row:
+            # Check if cell value matches the target text exactly (case sensitive, trimmed)
+            if cell.value and str(cell.value).strip() == target_text:
+                count += 1
+                # When the target occurrence is reached, replace the cell value and return True
+                if count == occurrence:
+                    cell.value = replacement
+                    return True
+    # If the target occurrence is not found, return False
+    return False
+
+
+def set_merged_cell_value(ws, cell_coordinate, value):
+    """
+    Writes a value into the cell specified by cell_coordinate.
+    If that cell belongs to a merged range, the value is written into the top-left cell of that range.
+    """
+    # Loop through all merged cell ranges in the worksheet
+    for merged_range in ws.merged_cells.ranges:
+        # Check if the target cell coordinate belongs to this merged range
+        if cell_coordinate in merged_range:
+            # Get the boundaries of the merged range (top-left corner)
+            min_row, min_col, _, _ = merged_range.bounds
+            # Set the value to the top-left cell of the merged range
+            ws.cell(row=min_row, column=min_col, value=value)
+            return
+    # If the cell is not merged, set the value directly
+    ws[cell_coordinate].value = value
+
+
+def legacy_report(loan):
+    """
+    The body of generate_loan_report before template caching, unchanged apart from
+    taking the loan instead of a request and returning the buffer instead of a response:
+    loads the template from disk and scans the sheet for every placeholder.
+    """
+    # Get today's date formatted as string dd-mm-yyyy for header replacement
+    today = datetime.date.today().strftime("%d-%m-%Y")
+
+    # Load the Excel template workbook
+    template_path = os.path.join(settings.BASE_DIR, "template", "excel", "Report Format.xlsx")
+    wb = load_workbook(template_path)
+    ws = wb.active
+
+    # Replace placeholders in the template's header cells
+    replace_first_occurrence(ws, "loan_id", f"Loan: {loan.id}", occurrence=1)
+    replace_first_occurrence(ws, "date of download", today, occurrence=1)
+    replace_first_occurrence(ws, "Interest", loan.interest, occurrence=2)
+
+    # Set specific cells with loan data; handle merged cells properly
+    set_merged_cell_value(ws, "P11", loan.loan_amount)  # Loan amount for formulas
+    ws["R33"].value = loan.loan_amount  # Loan amount repeated
+    set_merged_cell_value(ws, "R16", loan.term)  # Loan term in months
+    set_merged_cell_value(ws, "O24", loan.loan_type)  # Loan type
+    set_merged_cell_value(ws, "O26", "")  # Clear this cell
+
+    # Set actual date objects for payment start and maturity dates with formatting
+    ws["R27"].value = loan.payment_start_date
+    ws["R27"].number_format = "DD-MM-YYYY"
+
+    ws["R28"].value = loan.maturity_date
+    ws["R28"].number_format = "DD-MM-YYYY"
+
+    # Fetch amortization records related to the loan, ordered by sequence number
+    amortizations = Amortization.objects.filter(loan=loan).order_by("seq")
+
+    current_row = 34  # Starting row for amortization table in the sheet
+    for record in amortizations:
+        # Write amortization schedule data to the correct columns and rows
+        ws.cell(row=current_row, column=1, value=record.seq)  # Sequence number
+        ws.cell(row=current_row, column=3, value=record.due_date)  # Due date
+        ws.cell(row=current_row, column=3).number_format = "DD-MM-YYYY"  # Date format
+        ws.cell(row=current_row, column=15, value=record.principal)  # Principal amount
+        ws.cell(row=current_row, column=16, value=record.interest)  # Interest amount
+        ws.cell(row=current_row, column=17, value=record.amortization)  # Amortization payment
+        ws.cell(row=current_row, column=18, value=record.remaining_balance)  # Remaining balance
+        current_row += 1  # Move to next row for next record
+
+    # Save the workbook to an in-memory bytes buffer
+    output = BytesIO()
+    wb.save(output)
+    output.seek(0)
+    return output
+
+
+def streamed_report(loan):
+    # What generate_loan_report does now
+    amortizations = Amortization.objects.filter(loan=loan).order_by("seq")
+    output = reports.render_loan_report(loan, amortizations)
+    # Drain it the way FileResponse does, in fixed-size chunks
+    while output.read(8192):
+        pass
+    output.close()
+
+
+def peak_memory(func, *args):
+    tracemalloc.start()
+    func(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+class Command(BaseCommand):
+    help = "Measures loan report latency and peak memory for a long schedule (rolled back afterwards)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=360, help='Installments in the schedule.')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per measurement (best is reported).')
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            self.run(options['rows'], options['repeat'])
+
+    def run(self, rows, repeat):
+        member = synthetic_members(1, prefix='BENCH-REPORT')[0]
+        member.save()
+        start = datetime.date(2025, 1, 1)
+        loan = Loans.objects.create(
+            member=member, loan_type='multipurpose', loan_amount='500000.00', interest='10.00', term=rows, grace=0,
+            payment_start_date=start, maturity_date=start + datetime.timedelta(days=30 * rows), status='released',
+        )
+        generate_amortization_schedule(loan, level_payment(loan.loan_amount, loan.interest, rows))
+        rows = Amortization.objects.filter(loan=loan).count()
+        reports.get_template()  # Warm the cache, as a running server would be
+
+        for label, func in (('legacy (load + scan + BytesIO)', legacy_report), ('cached template, streamed', streamed_report)):
+            elapsed, _ = timed(func, loan, repeat=repeat)
+            peak = peak_memory(func, loan)
+            self.stdout.write(f"{label:32} {elapsed * 1000:8.1f}ms   peak {peak / 1024 / 1024:6.2f} MiB   ({rows} rows)")
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from api import search
+from api.models import Member, SearchToken
+from ._benchmark import rolled_back, synthetic_members, timed
+
+QUERIES = ['cruzado', 'santos maria', 'bench-0012345', 'infantry jose', 'pe']
+
+
+class Command(BaseCommand):
+    help = "Times the token index against the old icontains search over synthetic members (rolled back afterwards)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--members', type=int, default=100000, help='Number of synthetic members.')
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            self.run(options['members'])
+
+    def run(self, count):
+        Member.objects.bulk_create(synthetic_members(count), batch_size=2000)  # bulk_create skips signals...
+        index_time, tokens = timed(search.rebuild, SearchToken.MEMBER, Member.objects.all())  # ...so index in bulk
+        self.stdout.write(f"{count} members, {tokens} tokens indexed in {index_time:.2f}s")
+
+        for query in QUERIES:
+            # Old behaviour: substring match on first/last name, every row returned
+            def old_search():
+                return list(Member.objects.filter(Q(firstname__icontains=query) | Q(lastname__icontains=query)))
+
+            old_time, old_rows = timed(old_search, repeat=3)
+            new_time, new_rows = timed(search.search, Member.objects.all(), query, repeat=3)
+            self.stdout.write(
+                f"  {query!r:18} icontains {old_time * 1000:8.1f}ms ({len(old_rows)} rows)   "
+                f"index {new_time * 1000:7.1f}ms ({len(new_rows)} ranked)"
+            )
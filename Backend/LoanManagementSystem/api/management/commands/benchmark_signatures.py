@@ -0,0 +1,92 @@
+import base64
+import io
+import random
+from django.core.management.base import BaseCommand
+from PIL import Image, ImageDraw
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from api import signatures
+from api.models import Member, MemberSignature, Loans
+from api.serializers import MemberSerializer, LoanSerializer
+from ._benchmark import rolled_back, synthetic_members, timed
+
+PAGE_SIZES = [50, 500]  # The default page and ListCursorPagination.max_page_size
+
+
+def synthetic_signature(rng):
+    # A data URL of a PNG with a few pen strokes, like the signature pad produces
+    image = Image.new('L', (400, 150), 255)
+    draw = ImageDraw.Draw(image)
+    for _ in range(rng.randint(2, 4)):
+        points = [(rng.randint(10, 390), rng.randint(20, 130)) for _ in range(rng.randint(8, 16))]
+        draw.line(points, fill=0, width=3, joint='curve')
+    out = io.BytesIO()
+    image.save(out, 'PNG')
+    return f"data:image/png;base64,{base64.b64encode(out.getvalue()).decode()}"
+
+
+# The representation before signatures moved out of tblMember: the data URL inline in every member
+class InlineSignatureMemberSerializer(MemberSerializer):
+    member_signature = serializers.SerializerMethodField()
+
+    def get_member_signature(self, obj):
+        signature = getattr(obj, 'signature', None) if obj.has_signature else None
+        return signatures.as_text(signature) if signature else None
+
+
+class InlineSignatureLoanSerializer(LoanSerializer):
+    member_details = InlineSignatureMemberSerializer(source='member', read_only=True)
+
+
+class Command(BaseCommand):
+    help = ("Compares member and loan list pages with signatures inline (as before) and behind signature_url, "
+            "over synthetic members with signatures (rolled back afterwards).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--members', type=int, default=2000, help='Number of synthetic members, each with one loan.')
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            self.run(options['members'])
+
+    def run(self, count):
+        rng = random.Random(0)
+        Member.objects.bulk_create(synthetic_members(count), batch_size=2000)
+        members = list(Member.objects.order_by('pk'))  # With their ids, which bulk_create doesn't return on MySQL
+        data_urls = [synthetic_signature(rng) for _ in range(50)]  # Reused; drawing thousands adds nothing
+        MemberSignature.objects.bulk_create(
+            [MemberSignature(member=member, **signatures.encode(data_urls[n % len(data_urls)]))
+             for n, member in enumerate(members)],
+            batch_size=500,
+        )
+        Member.objects.update(has_signature=True)
+        Loans.objects.bulk_create(
+            [Loans(member=member, loan_type='salary', loan_amount='10000.00', interest='12.00', term=12, grace=0,
+                   payment_start_date='2025-01-01', maturity_date='2026-01-01', status='released') for member in members],
+            batch_size=2000,
+        )
+
+        text_bytes = sum(len(data_urls[n % len(data_urls)]) for n in range(count))
+        stored_bytes = sum(len(data) for data in MemberSignature.objects.values_list('data', flat=True))
+        self.stdout.write(f"{count} members with signatures: {text_bytes / 1024:.0f} KB as data URLs in tblMember, "
+                          f"{stored_bytes / 1024:.0f} KB compressed in tblMemberSignature")
+
+        lists = [
+            ('members', Member.objects.order_by('pk'), Member.objects.select_related('signature').order_by('pk'),
+             MemberSerializer, InlineSignatureMemberSerializer),
+            ('loans', Loans.objects.select_related('member').order_by('pk'),
+             Loans.objects.select_related('member__signature').order_by('pk'),
+             LoanSerializer, InlineSignatureLoanSerializer),
+        ]
+        for page_size in PAGE_SIZES:
+            for name, queryset, inline_queryset, serializer_class, inline_serializer_class in lists:
+                def page(queryset, serializer_class):
+                    # One list page as the endpoint builds it: query, serialize, render JSON
+                    return JSONRenderer().render(serializer_class(queryset[:page_size], many=True).data)
+
+                old_time, old_body = timed(page, inline_queryset, inline_serializer_class, repeat=3)
+                new_time, new_body = timed(page, queryset, serializer_class, repeat=3)
+                self.stdout.write(
+                    f"  {name:8} page of {page_size:3}   inline {len(old_body) / 1024:8.1f} KB {old_time * 1000:7.1f}ms   "
+                    f"signature_url {len(new_body) / 1024:7.1f} KB {new_time * 1000:7.1f}ms"
+                )
@@ -0,0 +1,214 @@
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import django
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from api import backup_restore
+from api.models import User, Loans, Amortization
+from ._benchmark import generate_dataset, use_sqlite
+
+# Benchmark suite.
+#
+# Every scale gets a fresh SQLite database filled by generate_dataset (the same data for
+# the same --seed), so runs differ only in the code. Typical use:
+#
+#   manage.py benchmark_suite --scales 1000,10000 --baseline baseline.json --save-baseline   # On main
+#   manage.py benchmark_suite --scales 1000,10000 --baseline baseline.json                   # On a branch
+#
+# The second run exits with an error listing every benchmark whose median got slower than
+# the baseline's by more than --tolerance (and --min-delta-ms). Baselines are only
+# comparable on the machine that wrote them; "environment" in the results records it.
+
+# Timed operations: name -> (method, path). {member}, {loan} and {unscheduled} are filled
+# from the data set; "backup" is the full backup itself, not an HTTP request.
+BENCHMARKS = {
+    'members_list': ('get', '/api/members/'),
+    'members_list_500': ('get', '/api/members/?page_size=500'),
+    'loans_list': ('get', '/api/loans/'),
+    'loans_list_500': ('get', '/api/loans/?page_size=500'),
+    'loan_summaries': ('get', '/api/loans/summaries/'),
+    'member_search': ('get', '/api/members/search/{member.lastname} {member.firstname}/'),
+    'loan_detail': ('get', '/api/loans/search/{loan.id}/'),
+    'amortization_list': ('get', '/api/loans/{loan.id}/amortization/'),
+    'amortization_create': ('post', '/api/loans/{unscheduled.id}/amortization/create/'),
+    'loan_report': ('get', '/api/loans/{loan.id}/report/'),
+    'dashboard_summary': ('get', '/api/dashboard/summary/'),  # Cache cleared first: the aggregates themselves
+    'audit_logs': ('get', '/api/auditlogs/'),
+    'audit_logs_by_object': ('get', '/api/auditlogs/?model=loans&object_id={loan.id}'),
+    'backup': (None, None),
+}
+DEFAULT_SCALES = '1000,10000,100000'
+
+
+class Command(BaseCommand):
+    help = ("Times the main endpoints on synthetic data sets of each scale (fresh SQLite databases), writes the "
+            "results as JSON and, with --baseline, fails when any is slower than the baseline beyond --tolerance.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scales', default=DEFAULT_SCALES, help='Comma-separated member counts.')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per benchmark (the median is compared).')
+        parser.add_argument('--only', help='Comma-separated benchmark names to run (default: all).')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed of the data sets.')
+        parser.add_argument('--output', default='benchmark_results.json', help='Where to write the results.')
+        parser.add_argument('--baseline', help='Results file to compare against.')
+        parser.add_argument('--save-baseline', action='store_true', help='Also write the results to --baseline.')
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help='Allowed slowdown against the baseline median, as a fraction (0.25 = 25%%).')
+        parser.add_argument('--min-delta-ms', type=float, default=2.0,
+                            help='Slowdowns smaller than this many ms are noise, whatever the ratio.')
+
+    def handle(self, *args, **options):
+        names = list(BENCHMARKS)
+        if options['only']:
+            names = [name.strip() for name in options['only'].split(',')]
+            unknown = [name for name in names if name not in BENCHMARKS]
+            if unknown:
+                raise CommandError(f"Unknown benchmark(s): {', '.join(unknown)}. Available: {', '.join(BENCHMARKS)}")
+        try:
+            scales = [int(scale) for scale in options['scales'].split(',')]
+        except ValueError:
+            raise CommandError("--scales must be comma-separated member counts, e.g. 1000,10000.")
+        baseline = None
+        if options['baseline'] and not options['save_baseline']:
+            try:
+                with open(options['baseline'], encoding='utf-8') as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as exc:
+                raise CommandError(f"Cannot read baseline {options['baseline']}: {exc}")
+
+        results = {
+            'created_at': timezone.now().isoformat(),
+            'environment': environment(),
+            'repeat': options['repeat'],
+            'seed': options['seed'],
+            'scales': {},
+        }
+        for scale in scales:
+            with tempfile.TemporaryDirectory() as directory, override_settings(
+                MEDIA_ROOT=os.path.join(directory, 'media'), ALLOWED_HOSTS=['testserver'], PROFILING_SAMPLE_RATE=0,
+            ):
+                use_sqlite(os.path.join(directory, 'benchmark.sqlite3'))
+                call_command('migrate', verbosity=0)
+                results['scales'][str(scale)] = self.run_scale(scale, names, options, directory)
+                connections.close_all()
+
+        self.write(options['output'], results)
+        if options['save_baseline']:
+            self.write(options['baseline'], results)
+        if baseline is not None:
+            self.compare(baseline, results, options['tolerance'], options['min_delta_ms'])
+
+    def run_scale(self, scale, names, options, directory):
+        started = time.perf_counter()
+        admin = User.objects.create_user('benchmark', None, firstname='Bench', lastname='Mark', usertype=User.ADMIN)
+        rows = generate_dataset(scale, prefix='BENCH', seed=options['seed'], actor=admin)
+        setup_seconds = time.perf_counter() - started
+        self.stdout.write(f"\n{scale} members: {', '.join(f'{count} {table}' for table, count in rows.items())} "
+                          f"generated in {setup_seconds:.1f}s")
+
+        client = APIClient()
+        client.force_authenticate(admin)
+        loans = Loans.objects.filter(status='released')
+        loan = loans.order_by('pk')[loans.count() // 2]  # A schedule from the middle of the table
+        unscheduled = loans.order_by('-pk').first()  # Its schedule is dropped and recreated by amortization_create
+        context = {'member': loan.member, 'loan': loan, 'unscheduled': unscheduled}
+
+        benchmarks = {}
+        for name in names:
+            method, path = BENCHMARKS[name]
+            if name == 'backup':
+                def call():
+                    with override_settings(BASE_DIR=directory):  # The archive goes to <BASE_DIR>/backups
+                        return backup_restore.full_backup()
+                before = None
+            else:
+                call = self.request(client, method, path.format(**context), name)
+                before = None
+                if name == 'amortization_create':
+                    before = lambda: Amortization.objects.filter(loan=unscheduled).delete()
+                elif name == 'dashboard_summary':
+                    before = cache.clear
+            runs = measure(call, options['repeat'], before)
+            benchmarks[name] = {
+                'median_ms': round(statistics.median(runs), 3),
+                'min_ms': round(min(runs), 3),
+                'max_ms': round(max(runs), 3),
+                'runs_ms': [round(run, 3) for run in runs],
+            }
+            self.stdout.write(f"  {name:24} median {benchmarks[name]['median_ms']:9.2f}ms   "
+                              f"min {benchmarks[name]['min_ms']:9.2f}ms")
+        return {'rows': rows, 'setup_seconds': round(setup_seconds, 2), 'benchmarks': benchmarks}
+
+    def request(self, client, method, path, name):
+        data = {'amortization': '1500.00'} if method == 'post' else None
+
+        def call():
+            response = getattr(client, method)(path, data, format='json') if data else getattr(client, method)(path)
+            if response.status_code >= 400:
+                raise CommandError(f"{name}: {method.upper()} {path} returned {response.status_code}.")
+            b''.join(response) if response.streaming else response.content  # Reports stream; read them fully
+            return response
+        return call
+
+    def write(self, path, results):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        self.stdout.write(f"\nResults written to {path}")
+
+    def compare(self, baseline, results, tolerance, min_delta_ms):
+        # Medians against the baseline's; only benchmarks present in both are compared
+        regressions = []
+        self.stdout.write(f"\nAgainst the baseline of {baseline.get('created_at', '?')} (tolerance {tolerance:.0%}):")
+        for scale, current in results['scales'].items():
+            previous = baseline.get('scales', {}).get(scale, {}).get('benchmarks', {})
+            for name, numbers in current['benchmarks'].items():
+                if name not in previous:
+                    continue
+                old, new = previous[name]['median_ms'], numbers['median_ms']
+                change = (new - old) / old if old else 0.0
+                regressed = new > old * (1 + tolerance) and new - old >= min_delta_ms
+                if regressed:
+                    regressions.append(f"{name} at {scale}: {old:.2f}ms -> {new:.2f}ms ({change:+.0%})")
+                line = f"  {scale:>7} {name:24} {old:9.2f}ms -> {new:9.2f}ms  {change:+6.0%}"
+                self.stdout.write(self.style.ERROR(line) if regressed else line)
+        if regressions:
+            raise CommandError(f"{len(regressions)} regression(s):\n  " + "\n  ".join(regressions))
+        self.stdout.write(self.style.SUCCESS("No regressions."))
+
+
+def measure(call, repeat, before=None):
+    # Wall times in ms of `repeat` calls after one untimed warm-up; `before` runs untimed ahead of each
+    if before:
+        before()
+    call()
+    runs = []
+    for _ in range(repeat):
+        if before:
+            before()
+        started = time.perf_counter()
+        call()
+        runs.append((time.perf_counter() - started) * 1000)
+    return runs
+
+
+def environment():
+    # What results depend on besides the code; compare runs from the same machine
+    return {
+        'python': sys.version.split()[0],
+        'django': django.get_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpus': os.cpu_count(),
+    }
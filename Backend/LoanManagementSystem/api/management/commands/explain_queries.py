@@ -0,0 +1,191 @@
+import datetime
+import re
+from decimal import Decimal
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+from api import payments, reports
+from api.models import User, Loans
+from api.utils import generate_amortization_schedules
+from ._benchmark import rolled_back, synthetic_members
+
+# Requests whose SELECTs are explained. Unpaginated lists (?paginate=false) and the cached
+# dashboard aggregates read whole tables by design and are left out.
+ENDPOINTS = [
+    ('users list', '/api/users/'),
+    ('members list', '/api/members/'),
+    ('loans list', '/api/loans/'),
+    ('loan summaries', '/api/loans/summaries/'),
+    ('audit log list', '/api/auditlogs/'),
+    ('audit log by actor', '/api/auditlogs/?actor={user.username}'),
+    ('audit log by object', '/api/auditlogs/?model=member&object_id={member.id}'),
+    ('audit log by action', '/api/auditlogs/?action=update&date_from=2025-01-01'),
+    ('audit log latest', '/api/auditlogs/?latest=20'),
+    ('object history', '/api/history/member/{member.id}/'),
+    ('object state', '/api/history/member/{member.id}/state/'),
+    ('user search', '/api/users/search/{user.username}/'),
+    ('member search', '/api/members/search/{member.lastname} {member.firstname}/'),
+    ('loan detail', '/api/loans/search/{loan.id}/'),
+    ('amortization list', '/api/loans/{loan.id}/amortization/'),
+    ('loan report', '/api/loans/{loan.id}/report/'),
+    ('loan payments', '/api/loans/{loan.id}/payments/'),
+    ('loan ledger', '/api/loans/{loan.id}/ledger/'),
+]
+
+# Bulk export selections (api.reports.filter_loans)
+EXPORT_FILTERS = [
+    {'status': 'released'},
+    {'status': 'released', 'loan_type': 'salary'},
+    {'member': None, 'status': 'released'},
+    {'date_from': datetime.date(2025, 1, 1), 'date_to': datetime.date(2025, 12, 31)},
+]
+
+LIMIT = re.compile(r'\bLIMIT\b', re.IGNORECASE)
+# Condition part of the statement (the outermost WHERE, up to GROUP BY/ORDER BY/LIMIT)
+PRIMARY_KEY = 'primary key'  # SQLite's "SCAN t": walks the rowid b-tree, which is the primary key's order
+WHERE = re.compile(r'\bWHERE\b(.*?)(?:\bGROUP BY\b|\bORDER BY\b|\bLIMIT\b|$)', re.IGNORECASE | re.DOTALL)
+
+
+def explain(sql, params):
+    """
+    Plan of one query as (scans, sorts without an index), read from the backend's
+    EXPLAIN output: SQLite "SCAN t [USING (COVERING) INDEX i]", PostgreSQL
+    "Seq Scan on t", MySQL access type ALL/index. Each scan is (table, index),
+    index being None when the table is read without any order.
+    """
+    vendor = connection.vendor
+    scans, sorts = [], []
+    with connection.cursor() as cursor:
+        if vendor == 'sqlite':
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            for row in cursor.fetchall():
+                detail = row[-1]
+                if match := re.match(r'SCAN (\w+)(?: USING (?:COVERING )?INDEX (\w+))?', detail):
+                    table, index = match.groups()
+                    scans.append((table, index or PRIMARY_KEY))
+                elif 'TEMP B-TREE' in detail:
+                    sorts.append(detail)
+        elif vendor == 'postgresql':
+            cursor.execute(f'EXPLAIN {sql}', params)
+            for (line,) in cursor.fetchall():
+                if match := re.search(r'Seq Scan on (\w+)', line):
+                    scans.append((match.group(1), None))
+                elif re.search(r'\bSort\b', line):
+                    sorts.append(line.strip())
+        elif vendor == 'mysql':
+            cursor.execute(f'EXPLAIN {sql}', params)
+            columns = [col[0].lower() for col in cursor.description]
+            for values in cursor.fetchall():
+                row = dict(zip(columns, values))
+                if row['type'] in ('ALL', 'index'):
+                    scans.append((row['table'], row.get('key') if row['type'] == 'index' else None))
+                if 'filesort' in (row.get('extra') or ''):
+                    sorts.append(f"{row['table']}: {row['extra']}")
+        else:
+            raise CommandError(f"EXPLAIN is not supported for {vendor}.")
+    return scans, sorts
+
+
+def index_columns(table, index):
+    with connection.cursor() as cursor:
+        if index == PRIMARY_KEY:
+            return {connection.introspection.get_primary_key_column(cursor, table)}
+        constraints = connection.introspection.get_constraints(cursor, table)
+    return set(constraints.get(index, {}).get('columns') or [])
+
+
+def is_bounded(sql, table, index):
+    """
+    Whether a scan stops after LIMIT rows: it walks an index in the requested order
+    (nothing sorted afterwards, checked by the caller) and every condition on the
+    table is on that index's columns. A filter on any other column could read the
+    whole table before LIMIT matching rows are found.
+    """
+    if index is None or not LIMIT.search(sql):
+        return False
+    match = WHERE.search(sql)
+    filtered = set(re.findall(rf'"{table}"\."(\w+)"', match.group(1))) if match else set()
+    return filtered <= index_columns(table, index)
+
+
+class Command(BaseCommand):
+    help = ("Runs EXPLAIN on the SELECTs issued by the list, search and report endpoints and the "
+            "bulk export filters, and fails if any of them scans a whole table (runs in a rolled-back transaction).")
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        with rolled_back():
+            flagged = self.run()
+        if flagged:
+            raise CommandError(f"{flagged} quer{'y' if flagged == 1 else 'ies'} scan a whole table.")
+        self.stdout.write(self.style.SUCCESS("No full table scans."))
+
+    def run(self):
+        user, member, loan = self.sample_data()
+
+        client = APIClient()
+        client.force_authenticate(user)
+        workloads = [
+            (name, lambda url=url: client.get(url.format(user=user, member=member, loan=loan)))
+            for name, url in ENDPOINTS
+        ]
+        for params in EXPORT_FILTERS:
+            params = {**params, 'member': member.pk} if 'member' in params else params
+            workloads.append((f"export filter {sorted(params)}", lambda params=params: list(reports.filter_loans(params))))
+        for n in (1, 2):  # Opening the ledger, then posting against it
+            workloads.append((f"payment posting {n}", lambda n=n: payments.post_payment(loan.pk, Decimal('1000.00'), reference=f'EXPLAIN-{n}')))
+
+        flagged = 0
+        # The test client's host must be allowed for the views that build absolute URLs
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            for name, workload in workloads:
+                flagged += self.explain_workload(name, workload)
+        return flagged
+
+    def sample_data(self):
+        # A few rows of each kind so every endpoint issues its real queries
+        user = User.objects.create_user('explain-queries', None, firstname='Explain', lastname='Queries', usertype=User.ADMIN)
+        members = synthetic_members(3, prefix='EXPLAIN')
+        for member in members:
+            member.save()  # save() so audit log entries and search tokens exist too
+        start = datetime.date(2025, 1, 1)
+        loans = []
+        for member, loan_type in zip(members, ('salary', 'quick', 'emergency')):
+            loan = Loans.objects.create(member=member, loan_type=loan_type, loan_amount='10000.00', interest='12.00', term=6,
+                                        grace=0, payment_start_date=start, maturity_date=start + datetime.timedelta(days=180),
+                                        status='released')
+            loans.append(loan)
+        generate_amortization_schedules(loans)
+        return user, members[0], loans[0]
+
+    def explain_workload(self, name, workload):
+        # Run the workload, then EXPLAIN every SELECT it issued
+        statements = []
+
+        def record(execute, sql, params, many, context):
+            statements.append((sql, params))
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(record):
+            response = workload()
+        if getattr(response, 'status_code', 200) >= 400:
+            raise CommandError(f"{name} returned HTTP {response.status_code}.")
+
+        flagged = 0
+        for sql, params in statements:
+            if not sql.lstrip().upper().startswith('SELECT'):
+                continue
+            scans, sorts = explain(sql, params)
+            if not sorts:
+                scans = [(table, index) for table, index in scans if not is_bounded(sql, table, index)]
+            scans = [table for table, index in scans]
+            status = self.style.ERROR('FULL SCAN') if scans else 'ok'
+            self.stdout.write(f"{name}: {status} {', '.join(scans)}")
+            if scans:
+                self.stdout.write(f"    {sql}")
+                flagged += 1
+            elif sorts and self.verbosity > 1:
+                self.stdout.write(f"    sort: {'; '.join(sorts)}")
+        return flagged
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F, Q
+from api import pictures
+from api.models import Member
+
+
+class Command(BaseCommand):
+    help = "Generates the thumbnail and preview of member pictures that don't have them yet (or all, with --force)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Regenerate derivatives even when they exist.')
+
+    def handle(self, *args, **options):
+        members = Member.objects.exclude(member_picture='').exclude(member_picture__isnull=True)
+        if not options['force']:
+            members = members.filter(~Q(picture_source=F('member_picture')))
+
+        done = failed = 0
+        for member in members.order_by('pk').iterator(chunk_size=500):
+            try:
+                pictures.generate(member, force=options['force'])
+                done += 1
+            except (ValueError, FileNotFoundError) as exc:
+                failed += 1
+                self.stderr.write(f"Member {member.pk}: {exc}")
+        self.stdout.write(self.style.SUCCESS(f"Generated derivatives for {done} member picture(s); {failed} failed."))
@@ -0,0 +1,28 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from api.models import Member
+from ._benchmark import generate_dataset
+
+
+class Command(BaseCommand):
+    help = ("Fills the database with realistic synthetic members, loans of every type, their schedules and audit "
+            "history, for development and load testing.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--members', type=int, default=1000, help='Number of members (loans: about 1.2 each).')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed; the same seed gives the same data.')
+        parser.add_argument('--prefix', default='SYN', help='Service number prefix of the generated members.')
+        parser.add_argument('--no-history', action='store_true', help='Skip the audit log entries.')
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        if Member.objects.filter(service_no__startswith=f'{prefix}-').exists():
+            raise CommandError(f"Members with service numbers {prefix}-... already exist; pick another --prefix.")
+
+        started = time.perf_counter()
+        with transaction.atomic():
+            counts = generate_dataset(options['members'], prefix=prefix, seed=options['seed'],
+                                      history=not options['no_history'])
+        summary = ', '.join(f"{count} {table}" for table, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(f"Generated {summary} in {time.perf_counter() - started:.1f}s."))
@@ -0,0 +1,34 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from api import imports
+from api.models import User
+
+
+class Command(BaseCommand):
+    help = "Imports members from a .csv or .xlsx file whose header row names the member fields."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--actor', help='Username recorded as the actor of the audit log entries.')
+        parser.add_argument('--chunk-size', type=int, default=imports.CHUNK_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help='Validate the file without saving anything.')
+
+    def handle(self, *args, **options):
+        actor = None
+        if options['actor']:
+            actor = User.objects.filter(username=options['actor']).first()
+            if actor is None:
+                raise CommandError(f"User {options['actor']} does not exist.")
+
+        try:
+            with open(options['path'], 'rb') as f:
+                report = imports.import_members(imports.read_rows(f, options['path']), actor=actor,
+                                                chunk_size=options['chunk_size'], dry_run=options['dry_run'])
+        except (OSError, ValueError) as exc:
+            raise CommandError(str(exc))
+
+        for error in report['errors']:
+            self.stdout.write(f"Row {error['row']}: {json.dumps(error['errors'])}")
+        verb = 'Validated' if options['dry_run'] else 'Imported'
+        count = report['rows'] - len(report['errors']) if options['dry_run'] else report['created']
+        self.stdout.write(self.style.SUCCESS(f"{verb} {count} of {report['rows']} rows; {len(report['errors'])} rejected."))
@@ -0,0 +1,195 @@
+import asyncio
+import io
+import os
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from wsgiref.util import setup_testing_defaults
+from django.conf import settings
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.backends.signals import connection_created
+from rest_framework_simplejwt.tokens import AccessToken
+from api import search
+from api.models import User, Member, Loans, SearchToken
+from api.utils import generate_amortization_schedules
+from ._benchmark import synthetic_members, use_sqlite
+
+# (sync path, async path) pairs; {loan} is replaced with a loan that has a schedule
+ENDPOINTS = [
+    ('/api/dashboard/summary/', '/api/async/dashboard/summary/'),
+    ('/api/members/', '/api/async/members/'),
+    ('/api/loans/', '/api/async/loans/'),
+    ('/api/loans/{loan}/amortization/', '/api/async/loans/{loan}/amortization/'),
+    ('/api/auditlogs/?latest=50', '/api/async/auditlogs/?latest=50'),
+]
+HOST = 'localhost'
+
+
+class Command(BaseCommand):
+    help = ("Load-tests the sync endpoints under WSGI against their async versions under ASGI, in process, "
+            "with many concurrent clients on a throwaway SQLite database.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=200, help='Concurrent clients.')
+        parser.add_argument('--requests', type=int, default=10, help='Requests per client, cycling through the endpoints.')
+        parser.add_argument('--threads', type=int, default=8,
+                            help='Worker threads of the WSGI server (e.g. gunicorn --threads).')
+        parser.add_argument('--members', type=int, default=2000, help='Synthetic members, each with one released loan.')
+        parser.add_argument('--latency-ms', type=float, default=0,
+                            help='Simulated network round trip added to every query (SQLite has none; MySQL does).')
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as directory:
+            use_sqlite(os.path.join(directory, 'load_test.sqlite3'))
+            call_command('migrate', verbosity=0)
+            cookie, loan_id = self.seed(options['members'])
+            if options['latency_ms']:
+                connection_created.connect(delayed_queries(options['latency_ms'] / 1000), weak=False)
+            self.stdout.write(f"{options['clients']} clients x {options['requests']} requests, "
+                              f"{options['members']} members/loans, {options['latency_ms']}ms per query, "
+                              f"WSGI with {options['threads']} threads\n")
+
+            for name, paths, run in (
+                ('sync  (WSGI)', [sync for sync, _ in ENDPOINTS], self.run_wsgi),
+                ('async (ASGI)', [asynchronous for _, asynchronous in ENDPOINTS], self.run_asgi),
+            ):
+                paths = [path.format(loan=loan_id) for path in paths]
+                cache.clear()  # Both setups start with a cold dashboard cache
+                elapsed, results = run(paths, cookie, options)
+                self.report(name, elapsed, results)
+            connections.close_all()
+
+    def seed(self, count):
+        # Members with one released loan and schedule each; bulk writes, so search tokens are built here
+        admin = User.objects.create_user('loadtest', None, firstname='Load', lastname='Test', usertype='Admin')
+        Member.objects.bulk_create(synthetic_members(count, prefix='LOAD'), batch_size=2000)
+        members = list(Member.objects.all())  # With their ids, which bulk_create doesn't return on MySQL
+        search.rebuild(SearchToken.MEMBER, Member.objects.all())
+        Loans.objects.bulk_create(
+            [Loans(member=member, loan_type='salary', loan_amount='10000.00', interest='12.00', term=12, grace=0,
+                   payment_start_date='2025-01-01', maturity_date='2026-01-01', status='released') for member in members],
+            batch_size=2000,
+        )
+        loans = list(Loans.objects.all())
+        generate_amortization_schedules(loans)
+        cookie = f"{settings.SIMPLE_JWT.get('AUTH_COOKIE', 'access_token')}={AccessToken.for_user(admin)}"
+        return cookie, loans[0].pk
+
+    def client_paths(self, paths, client, count):
+        # Each client starts at a different endpoint so the mix is even at any moment
+        return [paths[(client + n) % len(paths)] for n in range(count)]
+
+    def run_wsgi(self, paths, cookie, options):
+        # Client threads queue requests for a fixed pool of server threads, as a threaded WSGI server does
+        handler = WSGIHandler()
+        results = []
+        lock = threading.Lock()
+
+        def call(path):
+            environ = {'REQUEST_METHOD': 'GET', 'PATH_INFO': path.split('?')[0], 'QUERY_STRING': path.partition('?')[2],
+                       'HTTP_HOST': HOST, 'SERVER_NAME': HOST, 'HTTP_COOKIE': cookie, 'wsgi.input': io.BytesIO()}
+            setup_testing_defaults(environ)
+            status = []
+            response = handler(environ, lambda status_line, headers, exc_info=None: status.append(status_line))
+            try:
+                b''.join(response)
+            finally:
+                response.close()  # Sends request_finished, which releases the thread's connection
+            return int(status[0].split()[0])
+
+        def client(number):
+            for path in self.client_paths(paths, number, options['requests']):
+                started = time.perf_counter()
+                code = server.submit(call, path).result()
+                with lock:
+                    results.append((path, code, time.perf_counter() - started))
+
+        with ThreadPoolExecutor(options['threads']) as server:
+            started = time.perf_counter()
+            clients = [threading.Thread(target=client, args=(n,)) for n in range(options['clients'])]
+            for thread in clients:
+                thread.start()
+            for thread in clients:
+                thread.join()
+            return time.perf_counter() - started, results
+
+    def run_asgi(self, paths, cookie, options):
+        # One event loop serves every client, as a single uvicorn/daphne worker does
+        handler = ASGIHandler()
+        results = []
+
+        async def call(path):
+            route, _, query = path.partition('?')
+            scope = {
+                'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+                'path': route, 'raw_path': route.encode(), 'query_string': query.encode(), 'root_path': '',
+                'headers': [(b'host', HOST.encode()), (b'cookie', cookie.encode())],
+                'client': ('127.0.0.1', 0), 'server': (HOST, 80),
+            }
+            body_sent = False
+            done = asyncio.Event()
+            status = []
+
+            async def receive():
+                nonlocal body_sent
+                if not body_sent:
+                    body_sent = True
+                    return {'type': 'http.request', 'body': b'', 'more_body': False}
+                await done.wait()  # Django listens for a disconnect until the response is sent
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    status.append(message['status'])
+                elif message['type'] == 'http.response.body' and not message.get('more_body'):
+                    done.set()
+
+            await handler(scope, receive, send)
+            return status[0]
+
+        async def client(number):
+            for path in self.client_paths(paths, number, options['requests']):
+                started = time.perf_counter()
+                code = await call(path)
+                results.append((path, code, time.perf_counter() - started))
+
+        async def main():
+            started = time.perf_counter()
+            await asyncio.gather(*(client(n) for n in range(options['clients'])))
+            return time.perf_counter() - started
+
+        return asyncio.run(main()), results
+
+    def report(self, name, elapsed, results):
+        latencies = sorted(seconds * 1000 for _, _, seconds in results)
+        errors = sum(1 for _, code, _ in results if code != 200)
+        percentiles = statistics.quantiles(latencies, n=100)
+        self.stdout.write(
+            f"{name}: {len(results)} requests in {elapsed:.2f}s = {len(results) / elapsed:7.1f} req/s   "
+            f"p50 {percentiles[49]:7.1f}ms  p95 {percentiles[94]:7.1f}ms  p99 {percentiles[98]:7.1f}ms  "
+            f"errors {errors}"
+        )
+        by_path = {}
+        for path, _, seconds in results:
+            by_path.setdefault(path, []).append(seconds * 1000)
+        for path, values in by_path.items():
+            self.stdout.write(f"    {path:45} mean {statistics.mean(values):7.1f}ms  max {max(values):7.1f}ms")
+
+
+def delayed_queries(seconds):
+    # connection_created receiver making every query wait `seconds` first
+    def wrapper(execute, sql, params, many, context):
+        time.sleep(seconds)
+        return execute(sql, params, many, context)
+
+    def install(sender, connection, **kwargs):
+        if wrapper not in connection.execute_wrappers:  # Sent again each time a closed connection reconnects
+            connection.execute_wrappers.append(wrapper)
+    return install
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+from api import summaries
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the materialized loan summaries, or with --check verifies them against the schedules."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help='Only compare stored summaries with recomputed ones.')
+        parser.add_argument('--batch-size', type=int, default=summaries.BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        if options['check']:
+            problems = summaries.check(options['batch_size'])
+            for loan_id, problem in problems:
+                self.stdout.write(f"Loan {loan_id}: {problem}")
+            if problems:
+                raise CommandError(f"{len(problems)} loan summary problem(s); run rebuild_loan_summaries to fix them.")
+            self.stdout.write(self.style.SUCCESS("Loan summaries are consistent."))
+            return
+
+        count = summaries.rebuild(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} loan summaries."))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from api import search
+from api.models import Member, SearchToken, User
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the member/user search token index from scratch."
+
+    def handle(self, *args, **options):
+        members = search.rebuild(SearchToken.MEMBER, Member.objects.all())
+        users = search.rebuild(SearchToken.USER, User.objects.all())
+        self.stdout.write(self.style.SUCCESS(f"Indexed {members} member tokens and {users} user tokens."))
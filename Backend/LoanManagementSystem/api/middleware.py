@@ -0,0 +1,81 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from auditlog.cid import set_cid
+from auditlog.context import set_actor
+from auditlog.middleware import AuditlogMiddleware as BaseAuditlogMiddleware
+from . import profiling
+
+
+class AuditlogMiddleware(BaseAuditlogMiddleware):
+    """
+    django-auditlog's middleware, usable under ASGI without a thread switch.
+
+    The stock one is sync-only, so Django runs it (and every view below it) in the single
+    thread it keeps for sync code, which serializes all requests of an ASGI worker.
+    The actor context is a ContextVar, so it carries over into async views unchanged.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None):
+        super().__init__(get_response)
+        self.async_mode = iscoroutinefunction(self.get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        remote_addr = self._get_remote_addr(request)
+        remote_port = self._get_remote_port(request)
+        user = await request.auser() if hasattr(request, 'auser') else None  # request.user would query synchronously
+        user = user if user is not None and user.is_authenticated else None
+
+        set_cid(request)
+
+        with set_actor(actor=user, remote_addr=remote_addr, remote_port=remote_port):
+            return await self.get_response(request)
+
+
+class ProfilingMiddleware:
+    """
+    Measures a sample of requests (api.profiling): wall time, queries and their time,
+    serializer time and response size, per endpoint. Slow ones go to the slow request log.
+    Listed first, so the time includes the other middleware as well as the view.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(self.get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        profile = profiling.start(request)
+        if profile is None:
+            return self.get_response(request)
+        token = profiling.current_profile.set(profile)
+        try:
+            response = self.get_response(request)
+        finally:
+            profiling.current_profile.reset(token)
+        profiling.finish(request, response, profile)
+        return response
+
+    async def __acall__(self, request):
+        profile = profiling.start(request)
+        if profile is None:
+            return await self.get_response(request)
+        token = profiling.current_profile.set(profile)
+        try:
+            response = await self.get_response(request)
+        finally:
+            profiling.current_profile.reset(token)
+        profiling.finish(request, response, profile)
+        return response
@@ -0,0 +1,71 @@
+# Generated by Django 5.1.7 on 2026-10-18 01:31
+
+import re
+import unicodedata
+from django.db import migrations, models
+
+# A frozen copy of api.search's tokenizer as of this migration, so later changes to that
+# module can't change what this migration writes (rebuild_search_index re-tokenizes).
+MAX_TOKEN_LENGTH = 100
+BATCH_SIZE = 2000
+FIELDS = {
+    'member': ['service_no', 'lastname', 'firstname', 'middlename', 'unit_assignment'],
+    'user': ['username', 'lastname', 'firstname'],
+}
+TOKEN_SPLIT = re.compile(r'[^0-9a-z]+')
+
+
+def tokenize(text):
+    # Lowercased, accent-folded tokens
+    decomposed = unicodedata.normalize('NFKD', str(text or ''))
+    normalized = ''.join(ch for ch in decomposed if not unicodedata.combining(ch)).lower()
+    return [token[:MAX_TOKEN_LENGTH] for token in TOKEN_SPLIT.split(normalized) if token]
+
+
+def tokens_for(kind, obj):
+    # Set of (field, token) pairs describing one member or user
+    pairs = {('id', str(obj.pk))}
+    for field in FIELDS[kind]:
+        tokens = tokenize(getattr(obj, field))
+        pairs.update((field, token) for token in tokens)
+        if field == 'service_no' and tokens:
+            pairs.add((field, ''.join(tokens)[:MAX_TOKEN_LENGTH]))  # "O-12345" also as "o12345"
+    return pairs
+
+
+def build_search_index(apps, schema_editor):
+    # Index the members and users that already exist
+    SearchToken = apps.get_model('api', 'SearchToken')
+    for kind, model in (('member', 'Member'), ('user', 'User')):
+        batch = []
+        for obj in apps.get_model('api', model).objects.only('pk', *FIELDS[kind]).iterator(chunk_size=BATCH_SIZE):
+            batch.extend(SearchToken(kind=kind, object_id=obj.pk, field=field, token=token) for field, token in tokens_for(kind, obj))
+            if len(batch) >= BATCH_SIZE:
+                SearchToken.objects.bulk_create(batch)
+                batch = []
+        SearchToken.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_restorelog'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('member', 'Member'), ('user', 'User')], max_length=10)),
+                ('object_id', models.BigIntegerField()),
+                ('field', models.CharField(max_length=30)),
+                ('token', models.CharField(max_length=100)),
+            ],
+            options={
+                'db_table': 'tblSearchToken',
+                'indexes': [models.Index(fields=['kind', 'token'], name='searchtoken_kind_token_idx'), models.Index(fields=['kind', 'object_id'], name='searchtoken_kind_object_idx')],
+            },
+        ),
+        migrations.RunPython(build_search_index, migrations.RunPython.noop),
+    ]
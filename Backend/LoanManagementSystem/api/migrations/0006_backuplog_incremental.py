@@ -0,0 +1,28 @@
+# Generated by Django 5.1.7 on 2026-10-18 01:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_searchtoken'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='backuplog',
+            name='bytes_deduplicated',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='backuplog',
+            name='bytes_written',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='backuplog',
+            name='mode',
+            field=models.CharField(choices=[('full', 'Full'), ('incremental', 'Incremental')], default='full', max_length=20),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.1.7 on 2026-10-18 01:50
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicate_installments(apps, schema_editor):
+    # Keep the first row of any (loan, seq) saved twice so the unique constraint can be added
+    Amortization = apps.get_model('api', 'Amortization')
+    duplicates = Amortization.objects.values('loan_id', 'seq').annotate(first=Min('id'), rows=Count('id')).filter(rows__gt=1)
+    for row in duplicates:
+        Amortization.objects.filter(loan_id=row['loan_id'], seq=row['seq']).exclude(id=row['first']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_backuplog_incremental'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='loans',
+            index=models.Index(fields=['status', 'loan_type'], name='loans_status_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loans',
+            index=models.Index(fields=['member', 'status'], name='loans_member_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loans',
+            index=models.Index(fields=['payment_start_date'], name='loans_start_date_idx'),
+        ),
+        migrations.RunPython(remove_duplicate_installments, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='amortization',
+            constraint=models.UniqueConstraint(fields=('loan', 'seq'), name='amortization_loan_seq_uniq'),
+        ),
+    ]
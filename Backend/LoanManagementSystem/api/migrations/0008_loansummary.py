@@ -0,0 +1,76 @@
+# Generated by Django 5.1.7 on 2026-10-18 01:56
+
+from decimal import Decimal
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Min, OuterRef, Q, Subquery, Sum
+from django.utils import timezone
+
+# A frozen copy of api.summaries' computation as of this migration, so later changes to
+# that module can't change what this migration writes.
+BATCH_SIZE = 500
+CENT = Decimal('0.01')
+ZERO = Decimal('0.00')
+
+
+def build_loan_summaries(apps, schema_editor):
+    # Summaries for the loans that already exist, BATCH_SIZE loans at a time
+    Loans = apps.get_model('api', 'Loans')
+    Amortization = apps.get_model('api', 'Amortization')
+    LoanSummary = apps.get_model('api', 'LoanSummary')
+    as_of = timezone.localdate()
+    last_balance = Amortization.objects.filter(loan=OuterRef('pk'), due_date__lte=as_of).order_by('-seq').values('remaining_balance')[:1]
+    ids = list(Loans.objects.order_by('pk').values_list('pk', flat=True))
+    for start in range(0, len(ids), BATCH_SIZE):
+        chunk = ids[start:start + BATCH_SIZE]
+        totals = {
+            row['loan_id']: row
+            for row in Amortization.objects.filter(loan_id__in=chunk).order_by().values('loan_id').annotate(
+                total_principal=Sum('principal'),
+                total_interest=Sum('interest'),
+                installments_remaining=Count('id', filter=Q(due_date__gt=as_of)),
+                next_due_date=Min('due_date', filter=Q(due_date__gt=as_of)),
+            )
+        }
+        summaries = []
+        for loan in Loans.objects.filter(pk__in=chunk).annotate(balance=Subquery(last_balance)).values('pk', 'status', 'loan_amount', 'balance'):
+            schedule = totals.get(loan['pk'], {})
+            balance = loan['balance'] if loan['balance'] is not None else loan['loan_amount']  # No schedule: the full amount
+            summaries.append(LoanSummary(
+                loan_id=loan['pk'],
+                status=loan['status'],
+                next_due_date=schedule.get('next_due_date'),
+                installments_remaining=schedule.get('installments_remaining', 0),
+                remaining_balance=Decimal(balance).quantize(CENT),
+                total_principal=Decimal(schedule.get('total_principal') or ZERO).quantize(CENT),
+                total_interest=Decimal(schedule.get('total_interest') or ZERO).quantize(CENT),
+            ))
+        LoanSummary.objects.bulk_create(summaries)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoanSummary',
+            fields=[
+                ('loan', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='summary', serialize=False, to='api.loans')),
+                ('status', models.CharField(max_length=20)),
+                ('next_due_date', models.DateField(blank=True, null=True)),
+                ('installments_remaining', models.PositiveIntegerField(default=0)),
+                ('remaining_balance', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('total_principal', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('total_interest', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'tblLoanSummary',
+                'indexes': [models.Index(fields=['next_due_date'], name='loansummary_next_due_idx')],
+            },
+        ),
+        migrations.RunPython(build_loan_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.1.7 on 2026-10-18 02:20
+
+from django.db import migrations, models
+
+# The audit log filters (api.audit.filter_entries) each pair with newest-first paging, so
+# every filtered column gets a (column, timestamp) index. LogEntry belongs to auditlog,
+# hence schema_editor here instead of AddIndex.
+AUDITLOG_INDEXES = [
+    models.Index(fields=['actor', 'timestamp'], name='auditlog_actor_ts_idx'),
+    models.Index(fields=['content_type', 'object_id', 'timestamp'], name='auditlog_object_ts_idx'),
+    models.Index(fields=['action', 'timestamp'], name='auditlog_action_ts_idx'),
+]
+
+
+def add_indexes(apps, schema_editor):
+    LogEntry = apps.get_model('auditlog', 'LogEntry')
+    for index in AUDITLOG_INDEXES:
+        schema_editor.add_index(LogEntry, index)
+
+
+def remove_indexes(apps, schema_editor):
+    LogEntry = apps.get_model('auditlog', 'LogEntry')
+    for index in AUDITLOG_INDEXES:
+        schema_editor.remove_index(LogEntry, index)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_loansummary'),
+        ('auditlog', '0017_add_actor_email'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_indexes, remove_indexes),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.7 on 2026-10-18 02:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_auditlog_filter_indexes'),
+        ('contenttypes', '0002_remove_content_type_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_id', models.BigIntegerField()),
+                ('entry_id', models.BigIntegerField()),
+                ('timestamp', models.DateTimeField()),
+                ('state', models.JSONField(null=True)),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='contenttypes.contenttype')),
+            ],
+            options={
+                'db_table': 'tblAuditSnapshot',
+                'constraints': [models.UniqueConstraint(fields=('content_type', 'object_id', 'entry_id'), name='auditsnapshot_entry_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-18 02:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_auditsnapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='member',
+            name='picture_digest',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='member',
+            name='picture_source',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+    ]
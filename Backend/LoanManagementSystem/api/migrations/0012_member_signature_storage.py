@@ -0,0 +1,98 @@
+# Generated by Django 5.1.7 on 2026-10-18 02:23
+
+import base64
+import binascii
+import re
+import zlib
+import django.db.models.deletion
+from django.db import migrations, models
+
+BATCH_SIZE = 500
+
+# A frozen copy of api.signatures as of this migration (non-strict conversion only), so
+# later changes to that module can't change what this migration writes.
+DATA_URL = re.compile(r'^data:(?P<mime>[\w.+-]+/[\w.+-]+)?(?:;[^;,]*)*;base64,(?P<data>.*)$', re.DOTALL)
+TEXT = 'text/plain'
+IMAGE_TYPES = {  # MIME type -> magic number
+    'image/png': b'\x89PNG\r\n\x1a\n',
+    'image/jpeg': b'\xff\xd8\xff',
+}
+COMPRESSION_LEVEL = 9
+
+
+def encode(value):
+    # {'mime_type', 'data', 'size'} from a stored value; anything but a PNG or JPEG data URL is kept as text
+    match = DATA_URL.match(value.strip())
+    raw = mime_type = None
+    if match:
+        try:
+            raw = base64.b64decode(re.sub(r'\s+', '', match['data']), validate=True)
+        except binascii.Error:
+            pass
+        mime_type = match['mime']
+    magic = IMAGE_TYPES.get(mime_type)
+    if raw is None or magic is None or not raw.startswith(magic):
+        raw, mime_type = value.encode(), TEXT
+    return {'mime_type': mime_type, 'data': zlib.compress(raw, COMPRESSION_LEVEL), 'size': len(raw)}
+
+
+def as_text(signature):
+    # The value as the frontend sent it: a data URL, or the original text
+    raw = zlib.decompress(bytes(signature.data))
+    if signature.mime_type == TEXT:
+        return raw.decode()
+    return f"data:{signature.mime_type};base64,{base64.b64encode(raw).decode()}"
+
+
+def move_signatures(apps, schema_editor):
+    # member_signature text -> compressed MemberSignature rows, BATCH_SIZE members at a time
+    Member = apps.get_model('api', 'Member')
+    MemberSignature = apps.get_model('api', 'MemberSignature')
+    members = Member.objects.exclude(member_signature__isnull=True).exclude(member_signature='').order_by('pk')
+    last_pk = 0
+    while batch := list(members.filter(pk__gt=last_pk).values_list('pk', 'member_signature')[:BATCH_SIZE]):
+        last_pk = batch[-1][0]
+        MemberSignature.objects.bulk_create(
+            MemberSignature(member_id=pk, **encode(value)) for pk, value in batch
+        )
+        Member.objects.filter(pk__in=[pk for pk, _ in batch]).update(has_signature=True)
+
+
+def restore_signatures(apps, schema_editor):
+    Member = apps.get_model('api', 'Member')
+    MemberSignature = apps.get_model('api', 'MemberSignature')
+    for signature in MemberSignature.objects.iterator(chunk_size=BATCH_SIZE):
+        Member.objects.filter(pk=signature.member_id).update(member_signature=as_text(signature))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_member_picture_derivatives'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MemberSignature',
+            fields=[
+                ('member', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='signature', serialize=False, to='api.member')),
+                ('mime_type', models.CharField(max_length=100)),
+                ('data', models.BinaryField()),
+                ('size', models.PositiveIntegerField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'tblMemberSignature',
+            },
+        ),
+        migrations.AddField(
+            model_name='member',
+            name='has_signature',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.RunPython(move_signatures, restore_signatures),
+        migrations.RemoveField(
+            model_name='member',
+            name='member_signature',
+        ),
+    ]
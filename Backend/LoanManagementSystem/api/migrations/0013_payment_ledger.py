@@ -0,0 +1,67 @@
+# Generated by Django 5.1.7 on 2026-10-18 02:49
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_member_signature_storage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoanLedger',
+            fields=[
+                ('loan', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='ledger', serialize=False, to='api.loans')),
+                ('installments', models.PositiveIntegerField()),
+                ('next_seq', models.PositiveIntegerField(default=1)),
+                ('principal_balance', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('principal_paid', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('interest_paid', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('credit', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('payment_count', models.PositiveIntegerField(default=0)),
+                ('last_payment_date', models.DateField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'tblLoanLedger',
+            },
+        ),
+        migrations.AddField(
+            model_name='amortization',
+            name='interest_paid',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='amortization',
+            name='principal_paid',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.CreateModel(
+            name='Payment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('paid_on', models.DateField()),
+                ('reference', models.CharField(blank=True, max_length=100, null=True)),
+                ('source', models.CharField(choices=[('manual', 'Manual'), ('payroll', 'Payroll deduction')], default='manual', max_length=20)),
+                ('interest_paid', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('principal_paid', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('credit', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('first_seq', models.PositiveIntegerField(null=True)),
+                ('last_seq', models.PositiveIntegerField(null=True)),
+                ('principal_balance', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('posted_at', models.DateTimeField(auto_now_add=True)),
+                ('loan', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='payments', to='api.loans')),
+                ('posted_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'tblPayment',
+                'indexes': [models.Index(fields=['paid_on'], name='payment_paid_on_idx')],
+                'constraints': [models.UniqueConstraint(fields=('loan', 'reference'), name='payment_loan_reference_uniq')],
+            },
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
+from django.contrib.contenttypes.models import ContentType
 from django.db import models
 from django.utils import timezone
 from auditlog.registry import auditlog
@@ -101,8 +102,13 @@ class Member(models.Model):
     unit_office_telephone_no = models.CharField(max_length=20, blank=True)
     occupation_designation = models.CharField(max_length=100)
     source_of_income = models.CharField(max_length=100)
-    member_signature = models.TextField(blank=True, null=True)
+    # Signatures live in MemberSignature (compressed, fetched on their own); this flag saves the join in lists
+    has_signature = models.BooleanField(default=False, editable=False)
     member_picture = models.ImageField(upload_to='member_pictures/', null=True, blank=True)
+    # Thumbnail and preview of the picture (api.pictures): content hash of the original they were
+    # made from, and its file name then. Set by the background worker, never by API clients.
+    picture_digest = models.CharField(max_length=64, blank=True, default='', editable=False)
+    picture_source = models.CharField(max_length=255, blank=True, default='', editable=False)
     # Auditlog history to track changes
     history = AuditlogHistoryField()
 
@@ -114,6 +120,19 @@ class Member(models.Model):
         return f"{self.lastname}, {self.firstname}"
 
 
+# A member's drawn signature (api.signatures), kept out of tblMember so member rows, list
+# queries and nested loan payloads don't carry it. Served by /api/members/<id>/signature/.
+class MemberSignature(models.Model):
+    member = models.OneToOneField(Member, on_delete=models.CASCADE, primary_key=True, related_name='signature')
+    mime_type = models.CharField(max_length=100)  # Of the decoded image, e.g. image/png
+    data = models.BinaryField()  # zlib-compressed image bytes
+    size = models.PositiveIntegerField()  # Bytes before compression
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'tblMemberSignature'
+
+
 # Loans model for storing loan records linked to a Member
 class Loans(models.Model):
     # Loan status choices
@@ -122,6 +141,10 @@ class Loans(models.Model):
         ('released', 'Released'),
         ('reject', 'Reject'),
     ]
+    # Statuses a loan may move to from each status; released and rejected loans are final
+    STATUS_TRANSITIONS = {
+        'pending': ('released', 'reject'),
+    }
 
     # Loan type choices
     LOAN_TYPE_CHOICES = [
@@ -146,6 +169,11 @@ class Loans(models.Model):
 
     class Meta:
         db_table = "tblLoans"  # Custom table name
+        indexes = [
+            models.Index(fields=['status', 'loan_type'], name='loans_status_type_idx'),  # Report/admin filters, dashboard grouping
+            models.Index(fields=['member', 'status'], name='loans_member_status_idx'),  # A member's loans by status
+            models.Index(fields=['payment_start_date'], name='loans_start_date_idx'),  # Date-range exports, admin ordering
+        ]
 
 
 # Amortization model to store payment schedule details for loans
@@ -157,6 +185,9 @@ class Amortization(models.Model):
     principal = models.DecimalField(max_digits=12, decimal_places=2)
     interest = models.DecimalField(max_digits=12, decimal_places=2)
     remaining_balance = models.DecimalField(max_digits=12, decimal_places=2)
+    # Paid so far by posted payments (api.payments), interest before principal
+    interest_paid = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    principal_paid = models.DecimalField(max_digits=12, decimal_places=2, default=0)
 
     def __str__(self):
         # String representation includes sequence and loan ID
@@ -164,12 +195,107 @@ class Amortization(models.Model):
 
     class Meta:
         db_table = 'tblAmortization'  # Custom table name
+        constraints = [
+            # One row per installment; also serves "WHERE loan_id = ? ORDER BY seq" without a sort
+            models.UniqueConstraint(fields=['loan', 'seq'], name='amortization_loan_seq_uniq'),
+        ]
+
+
+# Per-loan balance snapshot maintained by api.summaries, so listing balances needs no schedule scans
+class LoanSummary(models.Model):
+    loan = models.OneToOneField('Loans', on_delete=models.CASCADE, primary_key=True, related_name='summary')
+    status = models.CharField(max_length=20)  # Copy of the loan's status, for filtering summaries
+    next_due_date = models.DateField(null=True, blank=True)  # None once every installment has come due
+    installments_remaining = models.PositiveIntegerField(default=0)
+    remaining_balance = models.DecimalField(max_digits=12, decimal_places=2)  # After the last installment due so far
+    total_principal = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total_interest = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Summary for Loan {self.loan_id}"
+
+    class Meta:
+        db_table = 'tblLoanSummary'  # Custom table name
+        indexes = [
+            models.Index(fields=['next_due_date'], name='loansummary_next_due_idx'),  # Finding rows a passed due date made stale
+        ]
+
+
+# Running payment balances of a loan, updated in place by every posting (api.payments)
+class LoanLedger(models.Model):
+    loan = models.OneToOneField('Loans', on_delete=models.CASCADE, primary_key=True, related_name='ledger')
+    installments = models.PositiveIntegerField()  # Length of the schedule
+    next_seq = models.PositiveIntegerField(default=1)  # First installment not fully paid; installments + 1 once all are
+    principal_balance = models.DecimalField(max_digits=12, decimal_places=2)  # Scheduled principal not yet paid
+    principal_paid = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    interest_paid = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    credit = models.DecimalField(max_digits=12, decimal_places=2, default=0)  # Paid beyond the whole schedule
+    payment_count = models.PositiveIntegerField(default=0)
+    last_payment_date = models.DateField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Ledger for Loan {self.loan_id}"
+
+    class Meta:
+        db_table = 'tblLoanLedger'  # Custom table name
+
+
+# A payment received for a loan and how it was applied; never changed once posted
+class Payment(models.Model):
+    MANUAL = 'manual'
+    PAYROLL = 'payroll'
+
+    SOURCE_CHOICES = [
+        (MANUAL, 'Manual'),
+        (PAYROLL, 'Payroll deduction'),
+    ]
+
+    loan = models.ForeignKey('Loans', on_delete=models.PROTECT, related_name='payments')  # Keep the money trail
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    paid_on = models.DateField()
+    reference = models.CharField(max_length=100, null=True, blank=True)  # OR number or payroll period; NULL when none
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES, default=MANUAL)
+    # Allocation: interest + principal + credit == amount
+    interest_paid = models.DecimalField(max_digits=12, decimal_places=2)
+    principal_paid = models.DecimalField(max_digits=12, decimal_places=2)
+    credit = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    first_seq = models.PositiveIntegerField(null=True)  # Installments the payment went to; None if all credit
+    last_seq = models.PositiveIntegerField(null=True)
+    principal_balance = models.DecimalField(max_digits=12, decimal_places=2)  # The loan's, right after this payment
+    posted_by = models.ForeignKey('User', null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+    posted_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Payment of {self.amount} for Loan {self.loan_id}"
+
+    class Meta:
+        db_table = 'tblPayment'  # Custom table name
+        indexes = [
+            models.Index(fields=['paid_on'], name='payment_paid_on_idx'),  # Collections by period
+        ]
+        constraints = [
+            # One posting per reference and loan, even for concurrent requests; NULLs (no reference) never clash
+            models.UniqueConstraint(fields=['loan', 'reference'], name='payment_loan_reference_uniq'),
+        ]
 
 
 # Model to log backup events
 class BackupLog(models.Model):
+    FULL = 'full'
+    INCREMENTAL = 'incremental'
+
+    MODE_CHOICES = [
+        (FULL, 'Full'),
+        (INCREMENTAL, 'Incremental'),
+    ]
+
     backup_time = models.DateTimeField(auto_now_add=True)  # Timestamp auto-set on creation
-    filename = models.CharField(max_length=255)  # Backup filename
+    filename = models.CharField(max_length=255)  # Backup filename (archive or incremental manifest)
+    mode = models.CharField(max_length=20, choices=MODE_CHOICES, default=FULL)
+    bytes_written = models.BigIntegerField(default=0)  # Bytes this backup added to disk
+    bytes_deduplicated = models.BigIntegerField(default=0)  # Bytes skipped because they were already stored
 
     def __str__(self):
         # Display timestamp for backup log entries
@@ -185,6 +311,52 @@ class RestoreLog(models.Model):
         return f"Restore at {self.timestamp.strftime('%Y-%m-%d %H:%M:%S')}"
     
 
+# Normalized search tokens for members and users, maintained by api.search on save
+class SearchToken(models.Model):
+    MEMBER = 'member'
+    USER = 'user'
+
+    KIND_CHOICES = [
+        (MEMBER, 'Member'),
+        (USER, 'User'),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)  # Which table object_id points to
+    object_id = models.BigIntegerField()
+    field = models.CharField(max_length=30)  # Source field, used for ranking
+    token = models.CharField(max_length=100)  # Lowercased, accent-folded token
+
+    class Meta:
+        db_table = 'tblSearchToken'  # Custom table name
+        indexes = [
+            models.Index(fields=['kind', 'token'], name='searchtoken_kind_token_idx'),  # Prefix range lookups
+            models.Index(fields=['kind', 'object_id'], name='searchtoken_kind_object_idx'),  # Reindexing one object
+        ]
+
+    def __str__(self):
+        return f"{self.kind}:{self.object_id} {self.field}={self.token}"
+
+
+# Reconstructed state of an audited object right after one of its LogEntry rows.
+# Checkpoints taken every few entries bound how many diffs api.history replays.
+class AuditSnapshot(models.Model):
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE, related_name='+')
+    object_id = models.BigIntegerField()
+    entry_id = models.BigIntegerField()  # Last LogEntry folded into `state`; not a FK so archived entries keep their snapshots
+    timestamp = models.DateTimeField()  # That entry's timestamp
+    state = models.JSONField(null=True)  # Field -> value as recorded by auditlog; None once the object was deleted
+
+    class Meta:
+        db_table = 'tblAuditSnapshot'  # Custom table name
+        constraints = [
+            # Also the index for "latest checkpoint of this object before ..."
+            models.UniqueConstraint(fields=['content_type', 'object_id', 'entry_id'], name='auditsnapshot_entry_uniq'),
+        ]
+
+    def __str__(self):
+        return f"Snapshot of {self.content_type_id}:{self.object_id} at entry {self.entry_id}"
+
+
 # Register models with auditlog to automatically track changes
 auditlog.register(User)
 auditlog.register(Member)
@@ -0,0 +1,79 @@
+from rest_framework import status
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+
+
+# Keyset (cursor) pagination shared by the list endpoints
+class ListCursorPagination(CursorPagination):
+    page_size = 50  # Default number of rows per page
+    page_size_query_param = 'page_size'  # ?page_size=N lets the client choose...
+    max_page_size = 500  # ...up to this cap
+    ordering = 'id'  # Primary key: indexed and unique, so pages are stable
+
+
+# Query parameter that opts back into the old "return every row" behaviour
+UNPAGINATED_PARAM = 'paginate'
+FALSE_VALUES = ('0', 'false', 'no', 'off')
+
+
+def parse_fields_param(request, serializer_class):
+    """
+    Reads ?fields=a,b,c and checks every name against the serializer's fields.
+    Returns (fields, error) where fields is None when no projection was requested.
+    """
+    raw = request.query_params.get('fields')
+    if not raw:
+        return None, None
+
+    fields = [name.strip() for name in raw.split(',') if name.strip()]
+    available = serializer_class().fields
+    unknown = [name for name in fields if name not in available]
+    if unknown:
+        return None, f"Unknown field(s): {', '.join(unknown)}"
+    return fields, None
+
+
+def projection_columns(serializer_class, fields):
+    # Model columns needed to render the requested serializer fields
+    sources = getattr(serializer_class, 'projection_sources', {})
+    columns = []
+    for name in fields:
+        for column in sources.get(name, (name,)):
+            if column not in columns:
+                columns.append(column)
+    return columns
+
+
+def paginated_list_response(request, queryset, serializer_class, ordering=None):
+    """
+    Serializes a list endpoint with cursor pagination and optional ?fields= projection.
+
+    • ?fields=id,lastname limits both the SELECT (through .only()) and the JSON keys.
+    • ?page_size=N sets the page size (capped at ListCursorPagination.max_page_size).
+    • ?paginate=false returns the full, unpaginated list for older clients.
+    """
+    fields, error = parse_fields_param(request, serializer_class)
+    if error:
+        return Response({'fields': [error]}, status=status.HTTP_400_BAD_REQUEST)
+
+    paginator = ListCursorPagination()
+    if ordering:
+        paginator.ordering = ordering
+    order_by = (paginator.ordering,) if isinstance(paginator.ordering, str) else tuple(paginator.ordering)
+
+    if fields is not None:
+        # Always load the ordering columns so the cursor can be built from each row
+        columns = projection_columns(serializer_class, fields)
+        columns += [name.lstrip('-') for name in order_by if name.lstrip('-') not in columns]
+        queryset = queryset.only(*columns)
+
+    # Load the relations the serializer reads in the same query instead of once per row
+    queryset = serializer_class.setup_eager_loading(queryset, fields)
+
+    if request.query_params.get(UNPAGINATED_PARAM, '').lower() in FALSE_VALUES:
+        serializer = serializer_class(queryset.order_by(*order_by), many=True, fields=fields)
+        return Response(serializer.data)
+
+    page = paginator.paginate_queryset(queryset, request)
+    serializer = serializer_class(page, many=True, fields=fields)
+    return paginator.get_paginated_response(serializer.data)
@@ -0,0 +1,297 @@
+from decimal import Decimal
+from itertools import islice
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+from rest_framework.serializers import ValidationError, as_serializer_error
+from .conditional import bump_table_versions
+from .models import Loans, Amortization, LoanLedger, Payment
+from .serializers import PaymentLineSerializer
+
+# Payment posting.
+#
+# A payment is applied to the loan's installments in order, each installment's interest
+# before its principal, and anything left after the last installment is kept as credit.
+# Every loan has a LoanLedger row with its running totals and next_seq, the first
+# installment not yet paid in full. Posting reads the ledger and the few installments from
+# next_seq on, and updates them in place in the same transaction, so its cost depends on
+# the payment, never on how many payments came before.
+#
+# post_lines handles any number of lines per transaction with a fixed number of queries:
+# the ledgers are locked with one SELECT, the installments after each cursor are read
+# with one more, and payments, installments and ledgers are written in bulk (updates as
+# one executemany: bulk_update's CASE expressions cost more than the posting itself).
+# Payroll deduction files (post_payroll) go through it CHUNK_SIZE lines at a time.
+
+CHUNK_SIZE = 2000
+WINDOW = 3  # Installments read past each loan's cursor up front; longer payments read more
+ZERO = Decimal('0.00')
+DUPLICATE = 'A payment with this reference was already posted for the loan.'
+CONFLICT = 'A payment with the same reference was posted at the same time; nothing in this batch was posted.'
+LEDGER_FIELDS = ['next_seq', 'principal_balance', 'principal_paid', 'interest_paid', 'credit', 'payment_count',
+                 'last_payment_date', 'updated_at']
+
+
+class Rollback(Exception):
+    pass
+
+
+def update_rows(model, fields, rows):
+    """
+    UPDATE ... SET fields WHERE pk = %s for rows of (values..., pk), sent as one
+    executemany. Decimals go to the driver as they are (every backend takes Decimal);
+    formatting each one through the field costs more than the write.
+    """
+    if not rows:
+        return
+    opts = model._meta
+    columns = [opts.get_field(name) for name in fields]
+    prepare = [None if field.get_internal_type() == 'DecimalField' else field.get_db_prep_save for field in columns]
+    quote = connection.ops.quote_name
+    sql = (f"UPDATE {quote(opts.db_table)} SET {', '.join(f'{quote(field.column)} = %s' for field in columns)} "
+           f"WHERE {quote(opts.pk.column)} = %s")
+    if any(prepare):
+        rows = [[value if prep is None else prep(value, connection) for prep, value in zip(prepare, row)] + [row[-1]] for row in rows]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+
+
+def new_ledgers(loan_ids):
+    # Unsaved ledgers for loans that have a schedule, from the schedule's totals (one GROUP BY)
+    schedules = Amortization.objects.filter(loan_id__in=loan_ids).order_by().values('loan_id').annotate(
+        installments=Count('id'), principal=Sum('principal'),
+    )
+    return [
+        LoanLedger(loan_id=row['loan_id'], installments=row['installments'], principal_balance=row['principal'])
+        for row in schedules
+    ]
+
+
+def ledger_for(loan_id):
+    # The loan's ledger, or an unsaved one as it would start out; None without a schedule
+    ledger = LoanLedger.objects.filter(loan_id=loan_id).first()
+    if ledger is None:
+        ledger = next(iter(new_ledgers([loan_id])), None)
+    return ledger
+
+
+def lock_ledgers(loan_ids):
+    # {loan_id: ledger} locked for this transaction, creating the missing ones
+    ledgers = LoanLedger.objects.select_for_update().in_bulk(loan_ids)
+    missing = [loan_id for loan_id in loan_ids if loan_id not in ledgers]
+    if missing:
+        LoanLedger.objects.bulk_create(new_ledgers(missing), ignore_conflicts=True)  # A concurrent posting may win
+        ledgers.update(LoanLedger.objects.select_for_update().in_bulk(missing))
+    return ledgers
+
+
+class Installment:
+    # The columns of an installment that posting reads and writes; model instances cost twice as much to load
+    __slots__ = ('id', 'seq', 'interest', 'principal', 'interest_paid', 'principal_paid')
+    FIELDS = ('id', 'loan_id', 'seq', 'interest', 'principal', 'interest_paid', 'principal_paid')
+
+    def __init__(self, id, seq, interest, principal, interest_paid, principal_paid):
+        self.id, self.seq = id, seq
+        self.interest, self.principal = interest, principal
+        self.interest_paid, self.principal_paid = interest_paid, principal_paid
+
+
+class Installments:
+    # The installments at and after each ledger's cursor, read in bulk and extended on demand
+    def __init__(self, loan_ids):
+        self.rows = {}
+        self.changed = {}
+        # The (loan, seq) index serves each loan's range; the ledger join supplies its start
+        window = Amortization.objects.filter(
+            loan_id__in=loan_ids, seq__gte=F('loan__ledger__next_seq'), seq__lt=F('loan__ledger__next_seq') + WINDOW,
+        )
+        self.add(window)
+
+    def add(self, installments):
+        for id, loan_id, seq, *amounts in installments.values_list(*Installment.FIELDS):
+            self.rows[loan_id, seq] = Installment(id, seq, *amounts)
+
+    def get(self, loan_id, seq):
+        if (loan_id, seq) not in self.rows:
+            self.add(Amortization.objects.filter(loan_id=loan_id, seq__gte=seq).order_by('seq')[:WINDOW * 4])
+        return self.rows.get((loan_id, seq))
+
+    def updates(self):
+        # (interest_paid, principal_paid, id) of the installments payments went to
+        return [(row.interest_paid, row.principal_paid, row.id) for row in self.changed.values()]
+
+
+def allocate(ledger, amount, installments):
+    """
+    Applies `amount` to the ledger's installments from next_seq on, interest first, and
+    updates the ledger. Returns (interest, principal, credit, first_seq, last_seq).
+    """
+    remaining = amount
+    interest = principal = ZERO
+    first_seq = last_seq = None
+    while remaining and ledger.next_seq <= ledger.installments:
+        installment = installments.get(ledger.loan_id, ledger.next_seq)
+        if installment is None:  # Schedule shorter than when the ledger was opened
+            break
+        paid_interest = min(remaining, installment.interest - installment.interest_paid)
+        remaining -= paid_interest
+        paid_principal = min(remaining, installment.principal - installment.principal_paid)
+        remaining -= paid_principal
+        if paid_interest or paid_principal:
+            installment.interest_paid += paid_interest
+            installment.principal_paid += paid_principal
+            installments.changed[installment.id] = installment
+            interest += paid_interest
+            principal += paid_principal
+            first_seq = first_seq or installment.seq
+            last_seq = installment.seq
+        if installment.interest_paid >= installment.interest and installment.principal_paid >= installment.principal:
+            ledger.next_seq += 1
+
+    ledger.interest_paid += interest
+    ledger.principal_paid += principal
+    ledger.principal_balance -= principal
+    ledger.credit += remaining
+    ledger.payment_count += 1
+    return interest, principal, remaining, first_seq, last_seq
+
+
+def check_lines(lines, seen, errors):
+    """
+    The lines (validated PaymentLineSerializer data with their 'row') that can be posted.
+    Problems are appended to `errors`; `seen` maps (loan, reference) pairs of earlier
+    lines of the same file to their row.
+    """
+    loan_ids = {line['loan_id'] for line in lines}
+    statuses = dict(Loans.objects.filter(pk__in=loan_ids).values_list('pk', 'status'))
+    references = {line['reference'] for line in lines if line['reference']}
+    posted = set(Payment.objects.filter(loan_id__in=loan_ids, reference__in=references).values_list('loan_id', 'reference'))
+
+    accepted = []
+    for line in lines:
+        key = (line['loan_id'], line['reference'])
+        status = statuses.get(line['loan_id'])
+        if status is None:
+            errors.append({'row': line['row'], 'errors': {'loan_id': ['Loan not found.']}})
+        elif status != 'released':
+            errors.append({'row': line['row'], 'errors': {'loan_id': [f'Loan is {status}, not released.']}})
+        elif line['reference'] and key in posted:
+            errors.append({'row': line['row'], 'errors': {'reference': [DUPLICATE]}})
+        elif line['reference'] and key in seen:
+            errors.append({'row': line['row'], 'errors': {'reference': [f'duplicate of row {seen[key]}.']}})
+        else:
+            if line['reference']:
+                seen[key] = line['row']
+            accepted.append(line)
+    return accepted
+
+
+def post_lines(lines, actor=None, source=Payment.MANUAL, seen=None, errors=None):
+    """
+    Posts validated lines ({'loan_id', 'amount', 'paid_on', 'reference', 'row'}) in one
+    transaction, in order. Returns the saved payments; lines that can't be posted are
+    reported in `errors` as {'row': ..., 'errors': {field: [messages]}}.
+    """
+    errors = [] if errors is None else errors
+    seen = {} if seen is None else seen
+    seen_before = dict(seen)
+    posting = []  # The lines behind `payments`
+    try:
+        with transaction.atomic():
+            # Locked before the duplicate check, so it sees every posting to these loans committed before it
+            ledgers = lock_ledgers(list({line['loan_id'] for line in lines}))
+            accepted = check_lines(lines, seen, errors)
+            installments = Installments(list(ledgers))
+            payments = []
+            for line in accepted:
+                ledger = ledgers.get(line['loan_id'])
+                if ledger is None:
+                    errors.append({'row': line['row'], 'errors': {'loan_id': ['Loan has no amortization schedule.']}})
+                    continue
+                interest, principal, credit, first_seq, last_seq = allocate(ledger, line['amount'], installments)
+                if ledger.last_payment_date is None or line['paid_on'] > ledger.last_payment_date:
+                    ledger.last_payment_date = line['paid_on']
+                payments.append(Payment(
+                    loan_id=line['loan_id'], amount=line['amount'], paid_on=line['paid_on'], reference=line['reference'] or None,
+                    source=source, interest_paid=interest, principal_paid=principal, credit=credit, first_seq=first_seq,
+                    last_seq=last_seq, principal_balance=ledger.principal_balance, posted_by=actor,
+                ))
+                posting.append(line)
+
+            Payment.objects.bulk_create(payments, batch_size=CHUNK_SIZE)
+            update_rows(Amortization, ['interest_paid', 'principal_paid'], installments.updates())
+            now = timezone.now()
+            touched = [ledgers[loan_id] for loan_id in {payment.loan_id for payment in payments}]
+            for ledger in touched:
+                ledger.updated_at = now  # Not a save(): auto_now doesn't apply
+            update_rows(LoanLedger, LEDGER_FIELDS, [[getattr(ledger, name) for name in LEDGER_FIELDS] + [ledger.pk] for ledger in touched])
+    except IntegrityError:
+        # The (loan, reference) constraint caught a posting the lock didn't order (SQLite has no row locks).
+        # Nothing was posted, so later chunks of the file may use these references again
+        seen.clear()
+        seen.update(seen_before)
+        errors.extend({'row': line['row'], 'errors': {'reference': [CONFLICT]}} for line in posting)
+        return []
+    return payments
+
+
+def bump_versions(payments):
+    # After the payments are committed: bulk writes send no signals. Each schedule's own
+    # version is its ledger's updated_at, which posting already moved
+    if payments:
+        bump_table_versions('payment', 'amortization')
+
+
+def post_payment(loan_id, amount, paid_on=None, reference='', actor=None):
+    # One payment; raises ValueError with the reason when it can't be posted
+    errors = []
+    line = {'row': 1, 'loan_id': loan_id, 'amount': amount, 'paid_on': paid_on or timezone.localdate(), 'reference': reference}
+    payments = post_lines([line], actor, Payment.MANUAL, errors=errors)
+    bump_versions(payments)
+    if errors:
+        raise ValueError(next(iter(errors[0]['errors'].values()))[0])
+    return payments[0]
+
+
+def validate_rows(chunk, defaults, errors):
+    # Validated lines of (row number, {field: text}) pairs; file columns override `defaults`
+    serializer = PaymentLineSerializer()
+    lines = []
+    for number, row in chunk:
+        try:
+            data = serializer.run_validation({**defaults, **{field: value for field, value in row.items() if value}})
+        except ValidationError as exc:
+            errors.append({'row': number, 'errors': as_serializer_error(exc)})
+            continue
+        data.setdefault('paid_on', timezone.localdate())
+        data.setdefault('reference', '')
+        lines.append({**data, 'row': number})
+    return lines
+
+
+def post_payroll(rows, paid_on=None, reference='', actor=None, chunk_size=CHUNK_SIZE, dry_run=False):
+    """
+    Posts a payroll deduction file given as (row number, row) pairs with loan_id and
+    amount columns (paid_on and reference optional, defaulting to the arguments). Each
+    chunk is posted in its own transaction; with dry_run every chunk is posted and rolled
+    back, and nothing else changes. Returns {'rows', 'posted', 'amount', 'errors'}.
+    """
+    report = {'rows': 0, 'posted': 0, 'amount': ZERO, 'errors': []}
+    defaults = {key: value for key, value in (('paid_on', paid_on), ('reference', reference)) if value}
+    seen = {}
+    rows = iter(rows)
+    while chunk := list(islice(rows, chunk_size)):
+        report['rows'] += len(chunk)
+        lines = validate_rows(chunk, defaults, report['errors'])
+        try:
+            with transaction.atomic():
+                payments = post_lines(lines, actor, Payment.PAYROLL, seen, report['errors'])
+                if dry_run:
+                    raise Rollback()
+            bump_versions(payments)
+        except Rollback:
+            pass
+        report['posted'] += len(payments)
+        report['amount'] += sum((payment.amount for payment in payments), ZERO)
+    report['errors'].sort(key=lambda error: error['row'])
+    return report
@@ -0,0 +1,145 @@
+import hashlib
+import io
+import logging
+import queue
+import threading
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps, UnidentifiedImageError
+from .conditional import bump_table_versions
+from .models import Member
+
+# Derived images (thumbnail, preview) of member pictures.
+#
+# Originals are uploaded at full size; lists only need a small thumbnail and the detail
+# view a preview. Both are made once per picture, after the upload commits, by a worker
+# thread of the web process, and stored under the SHA-256 of the original plus the
+# derivative's size: derived/ab/abcd...-thumb-128x128.jpg. A path therefore always holds
+# the same bytes and is served with immutable cache headers; a new picture (or new sizes)
+# means new paths. Identical uploads share their derivatives.
+#
+# Until the worker is done the member's thumbnail_url is null and clients show the
+# original or a placeholder. generate_picture_derivatives backfills existing pictures.
+
+logger = logging.getLogger(__name__)
+
+DERIVED_DIR = 'derived'
+SIZES = {
+    'thumb': (128, 128),  # Member cards in lists
+    'preview': (640, 640),  # Member details
+}
+JPEG_QUALITY = 85
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60  # Seconds; derived paths never change content
+
+
+def derived_name(digest, kind):
+    width, height = SIZES[kind]
+    return f'{DERIVED_DIR}/{digest[:2]}/{digest}-{kind}-{width}x{height}.jpg'
+
+
+def derived_url(member, kind):
+    # URL of a member's derivative, or None while it doesn't match the current picture
+    if not member.member_picture or not member.picture_digest or member.picture_source != member.member_picture.name:
+        return None
+    return default_storage.url(derived_name(member.picture_digest, kind))
+
+
+def file_digest(field_file):
+    sha = hashlib.sha256()
+    with field_file.open('rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def render(image, size):
+    # JPEG bytes of `image` scaled to fit `size`, never enlarged
+    image = image.copy()
+    image.thumbnail(size, Image.Resampling.LANCZOS)
+    out = io.BytesIO()
+    image.save(out, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+    return out.getvalue()
+
+
+def generate(member, force=False):
+    """
+    Writes the missing derivatives of the member's current picture and records them on
+    the member. Returns the digest, or None when there is no picture. Raises ValueError
+    for files that aren't readable images.
+    """
+    picture = member.member_picture
+    if not picture:
+        return None
+    digest = file_digest(picture)
+    names = {kind: derived_name(digest, kind) for kind in SIZES}
+    missing = [kind for kind, name in names.items() if force or not default_storage.exists(name)]
+    if missing:
+        try:
+            with picture.open('rb') as f, Image.open(f) as original:
+                image = ImageOps.exif_transpose(original).convert('RGB')  # Phone photos are often rotated by EXIF
+        except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as exc:
+            raise ValueError(f"{picture.name} is not a readable image.") from exc
+        for kind in missing:
+            if force and default_storage.exists(names[kind]):
+                default_storage.delete(names[kind])
+            default_storage.save(names[kind], ContentFile(render(image, SIZES[kind])))
+
+    # update() skips signals: no audit entry or reindex for bookkeeping. A picture replaced
+    # meanwhile keeps its own (pending) derivatives.
+    updated = Member.objects.filter(pk=member.pk, member_picture=picture.name).update(
+        picture_digest=digest, picture_source=picture.name
+    )
+    if updated:
+        bump_table_versions('member')  # Lists now carry the thumbnail URL
+    return digest
+
+
+def generate_for(member_id):
+    member = Member.objects.filter(pk=member_id).first()
+    if member is not None:
+        generate(member)
+
+
+#---Worker--------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+_queue = queue.Queue()
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def work():
+    while True:
+        member_id = _queue.get()
+        try:
+            generate_for(member_id)
+        except Exception:
+            logger.exception("Picture derivatives for member %s failed", member_id)
+        finally:
+            close_old_connections()  # This thread's connection, as after a request
+            _queue.task_done()
+
+
+def enqueue(member_id):
+    # Queues the member for the worker thread, starting it on first use
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=work, daemon=True, name='picture-derivatives')
+            _worker.start()
+    _queue.put(member_id)
+
+
+def wait():
+    # Blocks until every queued member has been processed (tests, shutdown)
+    _queue.join()
+
+
+def needs_derivatives(member):
+    return bool(member.member_picture) and member.picture_source != member.member_picture.name
+
+
+def schedule(member):
+    # After the upload commits, so the worker sees the new picture
+    if needs_derivatives(member):
+        transaction.on_commit(lambda: enqueue(member.pk))
@@ -0,0 +1,253 @@
+import contextvars
+import json
+import logging
+import os
+import random
+import statistics
+import threading
+import time
+from collections import deque
+from logging.handlers import RotatingFileHandler
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.utils import timezone
+from rest_framework.serializers import BaseSerializer
+
+# Request profiling (ProfilingMiddleware).
+#
+# A sample of requests (PROFILING_SAMPLE_RATE) is measured: wall time, number and time of
+# database queries, time spent producing serializer data, and response size. Each sample
+# goes into a per-endpoint window of this process (PROFILING_WINDOW most recent), which
+# the admin-only /api/profiling/summary/ reports as p50/p95/p99. Sampled requests slower
+# than PROFILING_SLOW_REQUEST_MS are also written to a rotating JSON-lines log with the
+# SQL they ran (statements only; parameters hold member data and stay out of the log).
+#
+# The current request's Profile lives in a ContextVar, so queries that async views run in
+# pool threads (api.async_views.in_thread) are counted for the request that issued them.
+
+current_profile = contextvars.ContextVar('current_profile', default=None)
+_serializer_depth = contextvars.ContextVar('serializer_depth', default=0)
+
+
+def sample_rate():
+    return getattr(settings, 'PROFILING_SAMPLE_RATE', 0)
+
+
+def slow_request_ms():
+    return getattr(settings, 'PROFILING_SLOW_REQUEST_MS', 500)
+
+
+class Profile:
+    # Costs of one sampled request; concurrent queries of one async request share it
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.serializer_seconds = 0.0
+        self.sql = []  # (statement, ms), up to PROFILING_MAX_SQL
+        self.sql_dropped = 0
+        self._lock = threading.Lock()
+
+    def add_query(self, sql, seconds):
+        with self._lock:
+            self.queries += 1
+            self.db_seconds += seconds
+            if len(self.sql) < getattr(settings, 'PROFILING_MAX_SQL', 200):
+                self.sql.append((sql, round(seconds * 1000, 3)))
+            else:
+                self.sql_dropped += 1
+
+    def add_serializer_time(self, seconds):
+        with self._lock:
+            self.serializer_seconds += seconds
+
+
+#---Instrumentation--------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def record_query(execute, sql, params, many, context):
+    # Execute wrapper installed on every connection; costs one ContextVar read when not sampling
+    profile = current_profile.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.add_query(sql, time.perf_counter() - started)
+
+
+def instrument(connection):
+    if record_query not in connection.execute_wrappers:  # Kept across reconnects of the same wrapper object
+        connection.execute_wrappers.append(record_query)
+
+
+def instrument_new_connection(sender, connection, **kwargs):
+    instrument(connection)
+
+
+def instrument_thread_connections():
+    # Connections this thread opened before profiling was installed (the first request, tests)
+    for connection in connections.all(initialized_only=True):
+        instrument(connection)
+
+
+_base_serializer_data = BaseSerializer.data
+
+
+def profiled_data(self):
+    # BaseSerializer.data, timed for the current profile; nested .data calls count once
+    profile = current_profile.get()
+    if profile is None or _serializer_depth.get():
+        return _base_serializer_data.fget(self)
+    token = _serializer_depth.set(1)
+    started = time.perf_counter()
+    try:
+        return _base_serializer_data.fget(self)
+    finally:
+        profile.add_serializer_time(time.perf_counter() - started)
+        _serializer_depth.reset(token)
+
+
+def install():
+    # Called once from ApiConfig.ready()
+    connection_created.connect(instrument_new_connection, dispatch_uid='api.profiling')
+    BaseSerializer.data = property(profiled_data)
+
+#---Samples--------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+class EndpointStats:
+    """
+    The most recent samples of every endpoint of this process. Like the user cache
+    statistics, these are per process: each worker reports its own traffic.
+    """
+    def __init__(self):
+        self._samples = {}  # endpoint -> deque of sample dicts
+        self._counts = {}  # endpoint -> samples ever recorded (the window keeps the latest)
+        self._lock = threading.Lock()
+        self.since = timezone.now()
+
+    def record(self, endpoint, sample):
+        window = getattr(settings, 'PROFILING_WINDOW', 1000)
+        with self._lock:
+            samples = self._samples.get(endpoint)
+            if samples is None or samples.maxlen != window:
+                samples = self._samples[endpoint] = deque(samples or (), maxlen=window)
+            samples.append(sample)
+            self._counts[endpoint] = self._counts.get(endpoint, 0) + 1
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._counts.clear()
+            self.since = timezone.now()
+
+    def summary(self):
+        # Per endpoint percentiles, busiest (most total time) first
+        with self._lock:
+            windows = {endpoint: list(samples) for endpoint, samples in self._samples.items()}
+            counts = dict(self._counts)
+        endpoints = []
+        for endpoint, samples in windows.items():
+            wall = [sample['wall_ms'] for sample in samples]
+            endpoints.append({
+                'endpoint': endpoint,
+                'samples': counts[endpoint],
+                'window': len(samples),
+                'wall_ms': percentiles(wall),
+                'db_ms': percentiles([sample['db_ms'] for sample in samples]),
+                'serializer_ms': percentiles([sample['serializer_ms'] for sample in samples]),
+                'queries': percentiles([sample['queries'] for sample in samples]),
+                'avg_bytes': round(statistics.mean(sample['bytes'] or 0 for sample in samples)),
+                'slow': sum(1 for sample in samples if sample['wall_ms'] >= slow_request_ms()),
+                'total_ms': round(sum(wall), 2),
+            })
+        endpoints.sort(key=lambda row: row['total_ms'], reverse=True)
+        return {
+            'since': self.since,
+            'sample_rate': sample_rate(),
+            'slow_request_ms': slow_request_ms(),
+            'endpoints': endpoints,
+        }
+
+
+def percentiles(values):
+    if len(values) == 1:
+        return {'p50': values[0], 'p95': values[0], 'p99': values[0], 'max': values[0]}
+    cuts = statistics.quantiles(values, n=100, method='inclusive')
+    return {'p50': round(cuts[49], 2), 'p95': round(cuts[94], 2), 'p99': round(cuts[98], 2), 'max': max(values)}
+
+
+endpoint_stats = EndpointStats()
+
+#---Slow request log--------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+slow_logger = logging.getLogger('api.profiling.slow_requests')
+slow_logger.propagate = False  # Its own file only; SQL doesn't belong in the console log
+_slow_log_lock = threading.Lock()
+
+
+def slow_log():
+    # The rotating log handler, set up on the first slow request (again if PROFILING_LOG_ROOT changes)
+    root = getattr(settings, 'PROFILING_LOG_ROOT', os.path.join(settings.BASE_DIR, 'logs'))
+    path = os.path.abspath(os.path.join(root, 'slow_requests.log'))
+    with _slow_log_lock:
+        if not slow_logger.handlers or slow_logger.handlers[0].baseFilename != path:
+            for handler in slow_logger.handlers[:]:
+                slow_logger.removeHandler(handler)
+                handler.close()
+            os.makedirs(root, exist_ok=True)
+            handler = RotatingFileHandler(
+                path,
+                maxBytes=getattr(settings, 'PROFILING_LOG_MAX_BYTES', 10 * 1024 * 1024),
+                backupCount=getattr(settings, 'PROFILING_LOG_BACKUPS', 5),
+                encoding='utf-8',
+            )
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            slow_logger.addHandler(handler)
+            slow_logger.setLevel(logging.INFO)
+    return slow_logger
+
+#---Requests--------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def start(request):
+    # A Profile for the request if it is sampled, else None
+    rate = sample_rate()
+    if rate <= 0 or (rate < 1 and random.random() >= rate):
+        return None
+    instrument_thread_connections()
+    return Profile()
+
+
+def endpoint_of(request):
+    # "GET api/loans/<int:pk>/report/": the URL pattern, so every loan's report is one endpoint
+    match = getattr(request, 'resolver_match', None)
+    route = match.route if match is not None else 'unresolved'
+    return f'{request.method} {route}'
+
+
+def finish(request, response, profile):
+    wall_ms = round((time.perf_counter() - profile.started) * 1000, 2)
+    size = None if response.streaming else len(response.content)
+    endpoint = endpoint_of(request)
+    sample = {
+        'wall_ms': wall_ms,
+        'db_ms': round(profile.db_seconds * 1000, 2),
+        'serializer_ms': round(profile.serializer_seconds * 1000, 2),
+        'queries': profile.queries,
+        'bytes': size,
+    }
+    endpoint_stats.record(endpoint, sample)
+
+    if wall_ms >= slow_request_ms():
+        user = getattr(request, 'user', None)
+        slow_log().info(json.dumps({
+            'time': timezone.now().isoformat(),
+            'endpoint': endpoint,
+            'path': request.get_full_path(),
+            'status': response.status_code,
+            'user': user.get_username() if user is not None and user.is_authenticated else None,
+            **sample,
+            'sql': [{'sql': sql, 'ms': ms} for sql, ms in profile.sql],
+            'sql_dropped': profile.sql_dropped,
+        }, default=str))
@@ -0,0 +1,217 @@
+import datetime
+import os
+import shutil
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from tempfile import SpooledTemporaryFile
+from zipfile import ZipFile, ZIP_STORED
+from django.conf import settings
+from openpyxl import load_workbook
+from . import jobs
+from .models import Loans, Amortization
+
+# Loan report rendering on top of "Report Format.xlsx".
+# The template is parsed once per thread; the cells each placeholder maps to
+# are resolved at load time so rendering a report never re-walks the sheet.
+# Each render fills the cached workbook, saves it, then puts the template back.
+
+TEMPLATE_PATH = os.path.join(settings.BASE_DIR, "template", "excel", "Report Format.xlsx")
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+DATE_FORMAT = "DD-MM-YYYY"
+SPOOL_MAX_SIZE = 1024 * 1024  # Reports larger than this spill to a temp file instead of RAM
+EXPORT_WORKERS = 4  # Threads rendering workbooks for a bulk export
+EXPORT_CHUNK_SIZE = 50  # Loans loaded, rendered and archived per round; bounds memory
+
+FIRST_SCHEDULE_ROW = 34  # Amortization table starts here
+# Schedule columns: A seq, C due date, O principal, P interest, Q amortization, R balance
+SCHEDULE_COLUMNS = (
+    (1, 'seq'),
+    (3, 'due_date'),
+    (15, 'principal'),
+    (16, 'interest'),
+    (17, 'amortization'),
+    (18, 'remaining_balance'),
+)
+
+# Placeholder text -> which occurrence of it gets replaced
+PLACEHOLDERS = {
+    'loan_id': 1,
+    'date of download': 1,
+    'Interest': 2,
+}
+# Cells written through set_merged_cell_value (top-left of their merged range)
+MERGED_TARGETS = ('P11', 'R16', 'O24', 'O26')
+
+
+def find_occurrence(ws, target_text, occurrence=1):
+    """
+    Searches the worksheet for cells whose value exactly equals target_text
+    and returns the coordinate of the nth occurrence (n = occurrence), or None.
+    """
+    count = 0
+    for row in ws.iter_rows():
+        for cell in row:
+            # Check if cell value matches the target text exactly (case sensitive, trimmed)
+            if cell.value and str(cell.value).strip() == target_text:
+                count += 1
+                if count == occurrence:
+                    return cell.coordinate
+    return None
+
+
+def merged_anchor(ws, cell_coordinate):
+    """
+    Returns the cell a value for cell_coordinate should be written to:
+    the top-left cell of its merged range, or the cell itself if it is not merged.
+    """
+    for merged_range in ws.merged_cells.ranges:
+        if cell_coordinate in merged_range:
+            min_row, min_col, _, _ = merged_range.bounds
+            return ws.cell(row=min_row, column=min_col).coordinate
+    return cell_coordinate
+
+
+class ReportTemplate:
+    def __init__(self, path=TEMPLATE_PATH):
+        self.path = path
+        self.mtime = os.path.getmtime(path)
+        self.workbook = load_workbook(path)
+        ws = self.workbook.active
+        # Lookup table built once: placeholder / target cell -> coordinate to write
+        self.placeholders = {text: find_occurrence(ws, text, occurrence) for text, occurrence in PLACEHOLDERS.items()}
+        self.merged = {coordinate: merged_anchor(ws, coordinate) for coordinate in MERGED_TARGETS}
+
+    def is_stale(self):
+        # Pick up edits to the template file without restarting the server
+        return os.path.getmtime(self.path) != self.mtime
+
+    def render(self, loan, amortizations, output, today=None):
+        """
+        Fills the template for `loan` and writes the .xlsx to `output`.
+
+        Header: "Loan: {id}", today's date, the loan's interest (2nd "Interest" cell),
+        loan amount (P11, R33), term (R16), loan type (O24), O26 cleared, and the
+        payment start / maturity dates in R27 / R28. Schedule rows start at row 34.
+        All date cells display as DD-MM-YYYY.
+        """
+        ws = self.workbook.active
+        today = (today or datetime.date.today()).strftime("%d-%m-%Y")
+
+        # Header cells (coordinates resolved when the template was loaded)
+        header = [
+            (self.placeholders['loan_id'], f"Loan: {loan.id}", None),
+            (self.placeholders['date of download'], today, None),
+            (self.placeholders['Interest'], loan.interest, None),
+            (self.merged['P11'], loan.loan_amount, None),  # Loan amount for formulas
+            ("R33", loan.loan_amount, None),  # Loan amount repeated
+            (self.merged['R16'], loan.term, None),  # Loan term in months
+            (self.merged['O24'], loan.loan_type, None),  # Loan type
+            (self.merged['O26'], "", None),  # Clear this cell
+            ("R27", loan.payment_start_date, DATE_FORMAT),
+            ("R28", loan.maturity_date, DATE_FORMAT),
+        ]
+        original = {}
+        rows_written = 0
+        try:
+            for coordinate, value, number_format in header:
+                if not coordinate:
+                    continue
+                cell = ws[coordinate]
+                original.setdefault(coordinate, (cell.value, cell.number_format))
+                cell.value = value
+                if number_format:
+                    cell.number_format = number_format
+
+            # Amortization table, one row per installment
+            for record in amortizations:
+                row = FIRST_SCHEDULE_ROW + rows_written
+                for column, attr in SCHEDULE_COLUMNS:
+                    ws.cell(row=row, column=column, value=getattr(record, attr))
+                ws.cell(row=row, column=3).number_format = DATE_FORMAT
+                rows_written += 1
+
+            self.workbook.save(output)
+        finally:
+            # Put the template back exactly as loaded for the next report
+            for coordinate, (value, number_format) in original.items():
+                ws[coordinate].value = value
+                ws[coordinate].number_format = number_format
+            if rows_written:
+                ws.delete_rows(FIRST_SCHEDULE_ROW, rows_written)
+        return output
+
+
+_templates = threading.local()
+
+
+def get_template():
+    # Per-thread cached template (rendering mutates it), reloaded only when the file changes
+    template = getattr(_templates, 'template', None)
+    if template is None or template.is_stale():
+        template = _templates.template = ReportTemplate()
+    return template
+
+
+def render_loan_report(loan, amortizations):
+    """
+    Renders the report into a spooled temp file (RAM up to SPOOL_MAX_SIZE, disk beyond)
+    and returns it rewound, ready to be streamed.
+    """
+    output = SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    get_template().render(loan, amortizations, output)
+    output.seek(0)
+    return output
+
+
+def filter_loans(params):
+    # Loans selected by a bulk export (validated by ReportExportSerializer)
+    loans = Loans.objects.all()
+    if params.get('status'):
+        loans = loans.filter(status=params['status'])
+    if params.get('loan_type'):
+        loans = loans.filter(loan_type=params['loan_type'])
+    if params.get('member'):
+        loans = loans.filter(member_id=params['member'])
+    if params.get('date_from'):
+        loans = loans.filter(payment_start_date__gte=params['date_from'])
+    if params.get('date_to'):
+        loans = loans.filter(payment_start_date__lte=params['date_to'])
+    return loans.order_by('id')
+
+
+def export_loan_reports(job_id, params):
+    """
+    Background job: renders one report per selected loan into a single zip archive.
+
+    Loans are processed in chunks; each chunk's schedules are loaded with one query,
+    rendered in a thread pool, and copied into the archive as they finish, so at most
+    one chunk of workbooks exists at a time. Returns the archive's filename.
+    """
+    loans = filter_loans(params)
+    total = loans.count()
+    path = jobs.job_file(job_id, 'loan_reports.zip')
+    done = 0
+    jobs.report_progress(job_id, done, total)
+
+    try:
+        # .xlsx files are already deflated, so they're stored rather than compressed again
+        with ZipFile(path, 'w', ZIP_STORED) as archive, ThreadPoolExecutor(EXPORT_WORKERS) as pool:
+            iterator = loans.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+            while chunk := list(islice(iterator, EXPORT_CHUNK_SIZE)):
+                schedules = defaultdict(list)
+                for record in Amortization.objects.filter(loan__in=chunk).order_by('loan_id', 'seq'):
+                    schedules[record.loan_id].append(record)
+
+                futures = [pool.submit(render_loan_report, loan, schedules[loan.id]) for loan in chunk]
+                for loan, future in zip(chunk, futures):
+                    with future.result() as output, archive.open(f'Loan_Report_{loan.id}.xlsx', 'w') as entry:
+                        shutil.copyfileobj(output, entry)
+                    done += 1
+                jobs.report_progress(job_id, done, total)
+    except jobs.JobCancelled:
+        os.remove(path)  # Don't leave a partial archive behind
+        raise
+
+    return os.path.basename(path)
@@ -0,0 +1,182 @@
+import re
+import unicodedata
+from django.db.models import Case, IntegerField, Max, Q, Sum, Value, When
+from .models import SearchToken
+
+# Token index behind search_members and search_users.
+# Each indexed field is split into lowercased, accent-folded tokens stored in
+# tblSearchToken, so a query becomes indexed prefix range lookups instead
+# of LIKE '%q%' scans over the whole member/user table.
+
+MAX_TOKEN_LENGTH = 100
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+EXACT_BONUS = 2  # Exact token matches score this many times a prefix match
+
+# Indexed fields and their ranking weight
+MEMBER_FIELDS = {
+    'service_no': 5,
+    'lastname': 3,
+    'firstname': 3,
+    'middlename': 1,
+    'unit_assignment': 1,
+}
+USER_FIELDS = {
+    'username': 4,
+    'lastname': 3,
+    'firstname': 3,
+}
+ID_WEIGHT = 5  # Numeric queries still match the primary key, as before
+
+TOKEN_SPLIT = re.compile(r'[^0-9a-z]+')
+
+
+def normalize(text):
+    # Lowercase and strip accents: "Peñafrancia" -> "penafrancia"
+    decomposed = unicodedata.normalize('NFKD', str(text or ''))
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch)).lower()
+
+
+def tokenize(text):
+    return [token[:MAX_TOKEN_LENGTH] for token in TOKEN_SPLIT.split(normalize(text)) if token]
+
+
+def field_tokens(value, field):
+    tokens = set(tokenize(value))
+    if field == 'service_no':
+        # Also index the service number without separators so "O-12345" matches "o12345"
+        compact = ''.join(tokenize(value))
+        if compact:
+            tokens.add(compact[:MAX_TOKEN_LENGTH])
+    return tokens
+
+
+def fields_for(kind):
+    return MEMBER_FIELDS if kind == SearchToken.MEMBER else USER_FIELDS
+
+
+def tokens_for(kind, obj):
+    # Set of (field, token) pairs describing one member or user
+    fields = fields_for(kind)
+    pairs = {(field, token) for field in fields for token in field_tokens(getattr(obj, field, ''), field)}
+    pairs.add(('id', str(obj.pk)))
+    return pairs
+
+
+def kind_for(instance):
+    return SearchToken.USER if instance._meta.model_name == 'user' else SearchToken.MEMBER
+
+
+def reindex(instance):
+    # Incremental update: only the tokens that changed are deleted or inserted
+    kind = kind_for(instance)
+    wanted = tokens_for(kind, instance)
+    existing = {
+        (field, token): pk
+        for pk, field, token in SearchToken.objects.filter(kind=kind, object_id=instance.pk).values_list('id', 'field', 'token')
+    }
+    stale = [pk for pair, pk in existing.items() if pair not in wanted]
+    if stale:
+        SearchToken.objects.filter(pk__in=stale).delete()
+    missing = wanted - existing.keys()
+    if missing:
+        SearchToken.objects.bulk_create(
+            SearchToken(kind=kind, object_id=instance.pk, field=field, token=token) for field, token in missing
+        )
+
+
+def remove(instance):
+    SearchToken.objects.filter(kind=kind_for(instance), object_id=instance.pk).delete()
+
+
+def rebuild(kind, queryset, batch_size=2000):
+    # Rebuild the whole index for one kind (rebuild_search_index, benchmarks)
+    fields = fields_for(kind)
+    SearchToken.objects.filter(kind=kind).delete()
+    batch = []
+    total = 0
+    for obj in queryset.only('pk', *fields).iterator(chunk_size=batch_size):
+        batch.extend(SearchToken(kind=kind, object_id=obj.pk, field=field, token=token) for field, token in tokens_for(kind, obj))
+        if len(batch) >= batch_size:
+            SearchToken.objects.bulk_create(batch)
+            total += len(batch)
+            batch = []
+    SearchToken.objects.bulk_create(batch)
+    return total + len(batch)
+
+
+def prefix_match(term):
+    """
+    Tokens starting with `term`, written as a range (token >= 'cruz' AND token < 'crv')
+    rather than LIKE 'cruz%' so every backend, SQLite included, can walk the index.
+    Tokens only contain [0-9a-z], so the upper bound is the next string of that alphabet.
+    """
+    stem = term.rstrip('z')
+    if not stem:
+        return Q(token__gte=term)
+    last = stem[-1]
+    upper = stem[:-1] + ('a' if last == '9' else chr(ord(last) + 1))
+    return Q(token__gte=term, token__lt=upper)
+
+
+def search_ids(kind, query, limit=DEFAULT_LIMIT):
+    """
+    Ranked object ids for `query`. Every query term must prefix-match some token of
+    the object; the score adds the field weight of each match, doubled for exact matches.
+    Runs as a single GROUP BY over the (kind, token) index.
+    """
+    terms = list(dict.fromkeys(tokenize(query)))
+    if not terms:
+        return []
+
+    weights = {**fields_for(kind), 'id': ID_WEIGHT}
+    weight = Case(*[When(field=field, then=Value(w)) for field, w in weights.items()], default=Value(1), output_field=IntegerField())
+
+    matches = Q()
+    annotations = {}
+    for i, term in enumerate(terms):
+        matches |= prefix_match(term)
+        # 1 when this term matched any of the object's tokens
+        annotations[f'term_{i}'] = Max(Case(When(prefix_match(term), then=Value(1)), default=Value(0), output_field=IntegerField()))
+    score = Sum(
+        Case(
+            *[When(token=term, then=weight * EXACT_BONUS) for term in terms],
+            *[When(prefix_match(term), then=weight) for term in terms],
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+    )
+
+    tokens = SearchToken.objects.filter(matches, kind=kind)
+    if len(terms) > 1:
+        # Narrow to objects matching the most selective term before grouping (index-only counts)
+        rarest = min(terms, key=lambda term: SearchToken.objects.filter(prefix_match(term), kind=kind).count())
+        tokens = tokens.filter(
+            object_id__in=SearchToken.objects.filter(prefix_match(rarest), kind=kind).values('object_id')
+        )
+
+    rows = (
+        tokens
+        .values('object_id')
+        .annotate(score=score, **annotations)
+        .filter(**{name: 1 for name in annotations})
+        .order_by('-score', 'object_id')
+        .values_list('object_id', flat=True)[:limit]
+    )
+    return list(rows)
+
+
+def search(queryset, query, limit=DEFAULT_LIMIT):
+    # Objects from `queryset` matching `query`, best match first
+    kind = SearchToken.USER if queryset.model._meta.model_name == 'user' else SearchToken.MEMBER
+    ids = search_ids(kind, query, limit)
+    objects = queryset.in_bulk(ids)
+    return [objects[pk] for pk in ids if pk in objects]
+
+
+def parse_limit(request):
+    # ?limit=N, capped at MAX_LIMIT
+    try:
+        return max(1, min(int(request.query_params.get('limit', DEFAULT_LIMIT)), MAX_LIMIT))
+    except ValueError:
+        return DEFAULT_LIMIT
@@ -1,8 +1,35 @@
 from rest_framework import serializers
-from .models import User, Member, Loans, Amortization, BackupLog, RestoreLog
+from .models import User, Member, Loans, Amortization, LoanSummary, LoanLedger, Payment, BackupLog, RestoreLog
 from auditlog.models import LogEntry
+from decimal import Decimal
+from django.db import transaction
+from django.urls import reverse
+from . import audit, pictures, signatures
 
-class UserSerializer(serializers.ModelSerializer):
+class DynamicFieldsModelSerializer(serializers.ModelSerializer):
+    # Model columns backing a serializer field, used to build .only() projections.
+    # Fields not listed here map to the model column of the same name.
+    projection_sources = {}
+    # Relations each serializer field reads, loaded in bulk by setup_eager_loading
+    # instead of one query per row. Maps field name -> select_related paths.
+    eager_relations = {}
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, fields=None):
+        # Join the relations needed by the (requested) fields into the list query
+        names = fields if fields is not None else cls.eager_relations.keys()
+        related = [path for name in names for path in cls.eager_relations.get(name, ())]
+        return queryset.select_related(*related) if related else queryset
+
+    def __init__(self, *args, **kwargs):
+        # Optional `fields` argument restricts output to a subset of the declared fields
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+class UserSerializer(DynamicFieldsModelSerializer):
     class Meta:
         model = User
         # Define the fields to be serialized/deserialized
@@ -32,14 +59,76 @@ class UserSerializer(serializers.ModelSerializer):
         representation['is_active'] = 1 if instance.is_active else 0
         return representation
 
-class MemberSerializer(serializers.ModelSerializer):
+class MemberSerializer(DynamicFieldsModelSerializer):
+    # Small derived images of member_picture (api.pictures); null until they are generated
+    thumbnail_url = serializers.SerializerMethodField()
+    preview_url = serializers.SerializerMethodField()
+    # Signatures are written as data URLs but read from their own endpoint (api.signatures)
+    member_signature = serializers.CharField(write_only=True, required=False, allow_blank=True, allow_null=True,
+                                             trim_whitespace=False)
+    signature_url = serializers.SerializerMethodField()
+    projection_sources = {
+        'thumbnail_url': ('member_picture', 'picture_digest', 'picture_source'),
+        'preview_url': ('member_picture', 'picture_digest', 'picture_source'),
+        'signature_url': ('has_signature',),
+    }
+
     class Meta:
         model = Member
-        fields = '__all__'  # Serialize all fields of Member model
+        exclude = ['picture_digest', 'picture_source', 'has_signature']  # Serialize all other fields of Member model
+
+    def get_thumbnail_url(self, obj):
+        return pictures.derived_url(obj, 'thumb')
+
+    def get_preview_url(self, obj):
+        return pictures.derived_url(obj, 'preview')
+
+    def get_signature_url(self, obj):
+        return reverse('member-signature', args=[obj.pk]) if obj.has_signature else None
+
+    def validate_member_signature(self, value):
+        # Encoded once here; create()/update() store the result
+        if not value:
+            return None
+        try:
+            return signatures.encode(value)
+        except ValueError as exc:
+            raise serializers.ValidationError(str(exc))
+
+    def create(self, validated_data):
+        signature = validated_data.pop('member_signature', None)
+        validated_data['has_signature'] = signature is not None
+        with transaction.atomic():
+            member = super().create(validated_data)
+            if signature is not None:
+                signatures.save(member, signature)
+        return member
+
+    def update(self, instance, validated_data):
+        given = 'member_signature' in validated_data  # A blank value removes the signature
+        signature = validated_data.pop('member_signature', None)
+        if given:
+            validated_data['has_signature'] = signature is not None
+        with transaction.atomic():
+            member = super().update(instance, validated_data)
+            if given:
+                signatures.save(member, signature)
+        return member
+
+class MemberImportSerializer(MemberSerializer):
+    # Validates one row of a bulk import. The uniqueness of service_no is checked per chunk
+    # with a single query (api.imports) instead of one query per row; pictures can't be imported.
+    member_signature = None  # Rows are bulk-created without signatures
+
+    class Meta(MemberSerializer.Meta):
+        exclude = ['member_picture', 'picture_digest', 'picture_source', 'has_signature']
+        extra_kwargs = {'service_no': {'validators': []}}
 
-class LoanSerializer(serializers.ModelSerializer):
+class LoanSerializer(DynamicFieldsModelSerializer):
     # Nested read-only member details included in loan representation
     member_details = MemberSerializer(source='member', read_only=True)
+    projection_sources = {'member_details': ('member',)}
+    eager_relations = {'member_details': ('member',)}
 
     class Meta:
         model = Loans
@@ -50,13 +139,115 @@ class AmortizationSerializer(serializers.ModelSerializer):
     class Meta:
         model = Amortization
         # Explicitly list fields to include in serialization
-        fields = ['seq', 'due_date', 'amortization', 'principal', 'interest', 'remaining_balance']
+        fields = ['seq', 'due_date', 'amortization', 'principal', 'interest', 'remaining_balance', 'interest_paid', 'principal_paid']
+
+class LoanSummarySerializer(DynamicFieldsModelSerializer):
+    class Meta:
+        model = LoanSummary
+        fields = '__all__'
+
+class LoanLedgerSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = LoanLedger
+        fields = '__all__'
 
-class AuditLogSerializer(serializers.ModelSerializer):
+class PaymentSerializer(DynamicFieldsModelSerializer):
+    posted_by = serializers.SlugRelatedField(slug_field='username', read_only=True)
+    projection_sources = {'posted_by': ('posted_by',)}
+    eager_relations = {'posted_by': ('posted_by',)}
+
+    class Meta:
+        model = Payment
+        fields = '__all__'
+
+class PaymentLineSerializer(serializers.Serializer):
+    # A payment to post: one request to /api/loans/<id>/payments/ or one line of a payroll file (api.payments)
+    loan_id = serializers.IntegerField(min_value=1)
+    amount = serializers.DecimalField(max_digits=12, decimal_places=2, min_value=Decimal('0.01'))
+    paid_on = serializers.DateField(required=False)
+    reference = serializers.CharField(max_length=100, required=False, allow_blank=True)
+
+class LoanQuoteSerializer(serializers.Serializer):
+    # Inputs for /api/loans/quote/; `terms`/`interests` switch to grid (batch) mode
+    MAX_GRID_SIZE = 200
+
+    loan_amount = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal('0.01'))
+    interest = serializers.DecimalField(max_digits=5, decimal_places=2, min_value=Decimal('0'), required=False)
+    term = serializers.IntegerField(min_value=1, max_value=600, required=False)
+    grace = serializers.IntegerField(min_value=0, max_value=120, default=0)
+    payment_start_date = serializers.DateField(required=False)
+    amortization = serializers.DecimalField(max_digits=12, decimal_places=2, min_value=Decimal('0.01'), required=False)
+    terms = serializers.ListField(child=serializers.IntegerField(min_value=1, max_value=600), required=False, allow_empty=False)
+    interests = serializers.ListField(
+        child=serializers.DecimalField(max_digits=5, decimal_places=2, min_value=Decimal('0')), required=False, allow_empty=False
+    )
+    include_schedule = serializers.BooleanField(required=False)
+
+    def validate(self, data):
+        # A single quote needs term and interest; grid mode may supply the lists instead
+        if 'term' not in data and 'terms' not in data:
+            raise serializers.ValidationError({'term': 'Provide term or terms.'})
+        if 'interest' not in data and 'interests' not in data:
+            raise serializers.ValidationError({'interest': 'Provide interest or interests.'})
+        grid_size = len(data.get('terms', [None])) * len(data.get('interests', [None]))
+        if grid_size > self.MAX_GRID_SIZE:
+            raise serializers.ValidationError(f'At most {self.MAX_GRID_SIZE} term/interest combinations per request.')
+        return data
+
+class ReportExportSerializer(serializers.Serializer):
+    # Filters for a bulk loan report export; all optional
+    status = serializers.ChoiceField(choices=Loans.STATUS_CHOICES, required=False)
+    loan_type = serializers.ChoiceField(choices=Loans.LOAN_TYPE_CHOICES, required=False)
+    member = serializers.PrimaryKeyRelatedField(queryset=Member.objects.all(), required=False)
+    date_from = serializers.DateField(required=False)  # payment_start_date range
+    date_to = serializers.DateField(required=False)
+
+    def validate(self, data):
+        if data.get('date_from') and data.get('date_to') and data['date_from'] > data['date_to']:
+            raise serializers.ValidationError({'date_to': 'Must be on or after date_from.'})
+        if 'member' in data:
+            data['member'] = data['member'].pk  # Job params are stored as JSON
+        return data
+
+class LoanStatusBatchSerializer(serializers.Serializer):
+    # Inputs for /api/loans/status/batch/
+    MAX_BATCH_SIZE = 1000
+
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=MAX_BATCH_SIZE)
+    status = serializers.ChoiceField(choices=Loans.STATUS_CHOICES)
+    generate_schedules = serializers.BooleanField(default=False)  # Level-payment schedules for released loans
+
+class AuditLogFilterSerializer(serializers.Serializer):
+    # Query parameters of /api/auditlogs/ and /api/auditlogs/archive/; all optional
+    MAX_LATEST = 200
+
+    actor = serializers.CharField(required=False)  # Username
+    model = serializers.CharField(required=False)  # user, member or loans
+    object_id = serializers.IntegerField(required=False)
+    action = serializers.ChoiceField(choices=list(audit.ACTIONS), required=False)
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    latest = serializers.IntegerField(min_value=1, max_value=MAX_LATEST, required=False)  # Newest N, unpaginated
+
+    def validate_model(self, value):
+        value = value.lower()
+        models = audit.audited_models()
+        if value not in models:
+            raise serializers.ValidationError(f"Choose one of: {', '.join(sorted(models))}.")
+        return value
+
+    def validate(self, data):
+        if data.get('date_from') and data.get('date_to') and data['date_from'] > data['date_to']:
+            raise serializers.ValidationError({'date_to': 'Must be on or after date_from.'})
+        return data
+
+class AuditLogSerializer(DynamicFieldsModelSerializer):
     # Custom fields to represent actor username, action type, and object details
     actor = serializers.SerializerMethodField()
     action = serializers.SerializerMethodField()
     object = serializers.SerializerMethodField()
+    projection_sources = {'object': ('content_type', 'object_pk', 'object_repr')}
+    eager_relations = {'actor': ('actor',), 'object': ('content_type',)}
 
     class Meta:
         model = LogEntry
@@ -83,11 +274,20 @@ class AuditLogSerializer(serializers.ModelSerializer):
             "representation": obj.object_repr
         }
 
+class AuditLogHistorySerializer(AuditLogSerializer):
+    # One entry of an object's timeline: what changed, by whom and when
+    class Meta(AuditLogSerializer.Meta):
+        fields = ['id', 'action', 'actor', 'timestamp', 'changes']
+
+class HistoryStateSerializer(serializers.Serializer):
+    # Query parameters of /api/history/<model>/<id>/state/
+    at = serializers.DateTimeField(required=False)  # Default: now
+
 class BackupLogSerializer(serializers.ModelSerializer):
     class Meta:
         model = BackupLog
         # Fields included in backup log serialization
-        fields = ['backup_time', 'filename']
+        fields = ['backup_time', 'filename', 'mode', 'bytes_written', 'bytes_deduplicated']
 
 class RestoreLogSerializer(serializers.ModelSerializer):
     class Meta:
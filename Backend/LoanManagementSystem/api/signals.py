@@ -9,3 +9,108 @@
 #     if instance.status == 'released':
 #         print(f"[Signal Triggered] Loan {instance.id} status is released.")
 #         generate_amortization_schedule(instance)
+
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save, post_delete
+from .models import Member, MemberSignature, Loans, Amortization, BackupLog, RestoreLog
+from .utils import invalidate_dashboard_summary, invalidate_portfolio_analytics, touch_ledgers
+
+# Models whose rows feed the dashboard summary; any write makes the cached copy stale
+DASHBOARD_MODELS = (get_user_model(), Member, Loans, Amortization, BackupLog, RestoreLog)
+
+
+def clear_dashboard_summary(sender, **kwargs):
+    invalidate_dashboard_summary()
+
+
+for model in DASHBOARD_MODELS:
+    post_save.connect(clear_dashboard_summary, sender=model, dispatch_uid=f'dashboard_save_{model.__name__}')
+    post_delete.connect(clear_dashboard_summary, sender=model, dispatch_uid=f'dashboard_delete_{model.__name__}')
+
+# Models behind the portfolio analytics snapshot (members for branch_of_service)
+PORTFOLIO_MODELS = (Member, Loans, Amortization)
+
+
+def clear_portfolio_analytics(sender, **kwargs):
+    invalidate_portfolio_analytics()
+
+
+for model in PORTFOLIO_MODELS:
+    post_save.connect(clear_portfolio_analytics, sender=model, dispatch_uid=f'portfolio_save_{model.__name__}')
+    post_delete.connect(clear_portfolio_analytics, sender=model, dispatch_uid=f'portfolio_delete_{model.__name__}')
+
+from . import search
+
+
+def update_search_index(sender, instance, update_fields=None, **kwargs):
+    # Saves that touch no indexed field (e.g. last_login on login) leave the index alone
+    if update_fields is not None and not set(update_fields) & set(search.fields_for(search.kind_for(instance))):
+        return
+    search.reindex(instance)
+
+
+def remove_from_search_index(sender, instance, **kwargs):
+    search.remove(instance)
+
+
+for model in (get_user_model(), Member):
+    post_save.connect(update_search_index, sender=model, dispatch_uid=f'search_save_{model.__name__}')
+    post_delete.connect(remove_from_search_index, sender=model, dispatch_uid=f'search_delete_{model.__name__}')
+
+from . import summaries
+
+
+def refresh_loan_summary(sender, instance, **kwargs):
+    # Loans are their own summary key; installments point at theirs
+    summaries.schedule_refresh(instance.pk if sender is Loans else instance.loan_id)
+
+
+post_save.connect(refresh_loan_summary, sender=Loans, dispatch_uid='summary_save_Loans')
+post_save.connect(refresh_loan_summary, sender=Amortization, dispatch_uid='summary_save_Amortization')
+post_delete.connect(refresh_loan_summary, sender=Amortization, dispatch_uid='summary_delete_Amortization')
+
+from auditlog.models import LogEntry
+from . import history
+
+
+def checkpoint_history(sender, instance, created, **kwargs):
+    if created:
+        history.checkpoint_if_due(instance)
+
+
+post_save.connect(checkpoint_history, sender=LogEntry, dispatch_uid='history_checkpoint_LogEntry')
+
+from .authentication import user_cache
+
+
+def drop_cached_user(sender, instance, **kwargs):
+    # is_active / usertype changes must reach the next request, not wait for the TTL
+    user_cache.invalidate(instance.pk)
+
+
+post_save.connect(drop_cached_user, sender=get_user_model(), dispatch_uid='auth_cache_save_User')
+post_delete.connect(drop_cached_user, sender=get_user_model(), dispatch_uid='auth_cache_delete_User')
+
+from .conditional import bump_table_versions
+
+
+def bump_table_version(sender, instance, **kwargs):
+    # Clients' ETags for lists and details of this table stop matching
+    bump_table_versions(sender._meta.model_name)
+    if sender is Amortization:
+        touch_ledgers([instance.loan_id])
+
+
+for model in (get_user_model(), Member, MemberSignature, Loans, Amortization):
+    post_save.connect(bump_table_version, sender=model, dispatch_uid=f'conditional_save_{model.__name__}')
+    post_delete.connect(bump_table_version, sender=model, dispatch_uid=f'conditional_delete_{model.__name__}')
+
+from . import pictures
+
+
+def schedule_picture_derivatives(sender, instance, **kwargs):
+    # New or replaced pictures get their thumbnail and preview from the worker thread
+    pictures.schedule(instance)
+
+
+post_save.connect(schedule_picture_derivatives, sender=Member, dispatch_uid='pictures_save_Member')
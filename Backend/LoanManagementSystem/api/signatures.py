@@ -0,0 +1,82 @@
+import base64
+import binascii
+import re
+import zlib
+from .models import MemberSignature
+
+# Member signatures.
+#
+# The frontend sends signatures as data URLs ("data:image/png;base64,..."). They are stored
+# decoded and zlib-compressed in MemberSignature, a quarter smaller than the base64 text
+# before compression even starts, and outside tblMember, so listing members or loans no
+# longer reads or sends them. Clients fetch one when they show it, from signature_url.
+#
+# Only PNG and JPEG images are accepted, checked against the decoded bytes' magic numbers:
+# the endpoint serves signatures from the API origin, where an HTML or SVG "signature"
+# would run script as whoever opens it. When converting existing rows (strict=False),
+# anything else is kept verbatim as text/plain, so no data is lost, and served as a
+# download.
+
+DATA_URL = re.compile(r'^data:(?P<mime>[\w.+-]+/[\w.+-]+)?(?:;[^;,]*)*;base64,(?P<data>.*)$', re.DOTALL)
+TEXT = 'text/plain'
+IMAGE_TYPES = {  # MIME type -> magic number
+    'image/png': b'\x89PNG\r\n\x1a\n',
+    'image/jpeg': b'\xff\xd8\xff',
+}
+MAX_SIZE = 1024 * 1024  # Decoded bytes; drawn signatures are a few KB
+COMPRESSION_LEVEL = 9
+
+
+def encode(value, strict=True):
+    """
+    {'mime_type', 'data', 'size'} for a MemberSignature from a PNG or JPEG data URL.
+    Raises ValueError for anything else, malformed base64 or signatures over MAX_SIZE;
+    with strict=False (converting stored values) the value is kept as text instead.
+    """
+    match = DATA_URL.match(value.strip())
+    raw = mime_type = None
+    if match:
+        try:
+            raw = base64.b64decode(re.sub(r'\s+', '', match['data']), validate=True)
+        except binascii.Error as exc:
+            if strict:
+                raise ValueError("The signature is not valid base64 data.") from exc
+        mime_type = match['mime']
+    if raw is not None and not is_image(mime_type, raw):
+        if strict:
+            raise ValueError("The signature must be a PNG or JPEG image.")
+        raw = None
+    if raw is None:
+        if strict:
+            raise ValueError("The signature must be a base64 data URL of a PNG or JPEG image.")
+        raw, mime_type = value.encode(), TEXT
+    if strict and len(raw) > MAX_SIZE:
+        raise ValueError(f"The signature is larger than {MAX_SIZE // 1024} KB.")
+    return {'mime_type': mime_type, 'data': zlib.compress(raw, COMPRESSION_LEVEL), 'size': len(raw)}
+
+
+def is_image(mime_type, raw):
+    # A PNG or JPEG whose bytes are what the MIME type says
+    magic = IMAGE_TYPES.get(mime_type)
+    return magic is not None and raw.startswith(magic)
+
+
+def decode(signature):
+    # The original image bytes of a MemberSignature
+    return zlib.decompress(bytes(signature.data))
+
+
+def as_text(signature):
+    # The value as the frontend sent it: a data URL, or the original text
+    raw = decode(signature)
+    if signature.mime_type == TEXT:
+        return raw.decode()
+    return f"data:{signature.mime_type};base64,{base64.b64encode(raw).decode()}"
+
+
+def save(member, encoded):
+    # Stores (or with None, removes) the member's signature; member.has_signature is set by the caller
+    if encoded is None:
+        MemberSignature.objects.filter(member=member).delete()
+    else:
+        MemberSignature.objects.update_or_create(member=member, defaults=encoded)
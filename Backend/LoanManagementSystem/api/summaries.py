@@ -0,0 +1,130 @@
+import threading
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Count, Min, OuterRef, Q, Subquery, Sum
+from django.utils import timezone
+from .models import Loans, Amortization, LoanSummary
+
+# Materialized per-loan balances (LoanSummary).
+#
+# A summary only changes when the loan or its schedule changes, or when one of its due
+# dates passes. Writes refresh the affected loans (utils and signals); rows whose
+# next_due_date has passed are refreshed in bulk before summaries are read
+# (refresh_stale_summaries), through the next_due_date index.
+
+BATCH_SIZE = 500
+SUMMARY_FIELDS = ('status', 'next_due_date', 'installments_remaining', 'remaining_balance', 'total_principal', 'total_interest')
+CENT = Decimal('0.01')
+ZERO = Decimal('0.00')
+
+
+def compute_summaries(loan_ids, as_of=None):
+    """
+    Unsaved summaries for `loan_ids` as of `as_of` (default today), with two queries:
+    one GROUP BY over the schedules and one over the loans, whose balance subquery
+    seeks the last passed installment through the (loan, seq) index.
+    Loans without a schedule owe their full amount.
+    """
+    as_of = as_of or timezone.localdate()
+    totals = {
+        row['loan_id']: row
+        for row in Amortization.objects.filter(loan_id__in=loan_ids).order_by().values('loan_id').annotate(
+            total_principal=Sum('principal'),
+            total_interest=Sum('interest'),
+            installments_remaining=Count('id', filter=Q(due_date__gt=as_of)),
+            next_due_date=Min('due_date', filter=Q(due_date__gt=as_of)),
+        )
+    }
+    last_balance = Amortization.objects.filter(loan=OuterRef('pk'), due_date__lte=as_of).order_by('-seq').values('remaining_balance')[:1]
+    loans = Loans.objects.filter(pk__in=loan_ids).annotate(balance=Subquery(last_balance)).values('pk', 'status', 'loan_amount', 'balance')
+
+    summaries = []
+    for loan in loans:
+        schedule = totals.get(loan['pk'], {})
+        balance = loan['balance'] if loan['balance'] is not None else loan['loan_amount']
+        summaries.append(LoanSummary(
+            loan_id=loan['pk'],
+            status=loan['status'],
+            next_due_date=schedule.get('next_due_date'),
+            installments_remaining=schedule.get('installments_remaining', 0),
+            remaining_balance=Decimal(balance).quantize(CENT),
+            total_principal=Decimal(schedule.get('total_principal') or ZERO).quantize(CENT),
+            total_interest=Decimal(schedule.get('total_interest') or ZERO).quantize(CENT),
+        ))
+    return summaries
+
+
+def save_summaries(summaries):
+    # Insert or overwrite in one statement per batch
+    LoanSummary.objects.bulk_create(
+        summaries, batch_size=BATCH_SIZE,
+        update_conflicts=True, unique_fields=['loan'], update_fields=[*SUMMARY_FIELDS, 'updated_at'],
+    )
+
+
+def refresh_loan_summaries(loan_ids, as_of=None):
+    # Recompute and store the summaries of the given loans
+    loan_ids = list(loan_ids)
+    for start in range(0, len(loan_ids), BATCH_SIZE):
+        save_summaries(compute_summaries(loan_ids[start:start + BATCH_SIZE], as_of))
+    return len(loan_ids)
+
+
+def refresh_stale_summaries(as_of=None):
+    # Summaries whose next installment has come due since they were computed
+    as_of = as_of or timezone.localdate()
+    stale = LoanSummary.objects.filter(next_due_date__lte=as_of).values_list('loan_id', flat=True)
+    return refresh_loan_summaries(stale, as_of)
+
+
+def rebuild(batch_size=BATCH_SIZE, as_of=None):
+    # Summaries for every loan, in batches; returns how many were written
+    ids = list(Loans.objects.order_by('pk').values_list('pk', flat=True))
+    for start in range(0, len(ids), batch_size):
+        chunk = ids[start:start + batch_size]
+        save_summaries(compute_summaries(chunk, as_of))
+    return len(ids)
+
+
+def check(batch_size=BATCH_SIZE, as_of=None):
+    """
+    Compares stored summaries with freshly computed ones.
+    Returns a list of (loan_id, problem) for missing, orphaned or differing rows.
+    """
+    problems = []
+    ids = list(Loans.objects.order_by('pk').values_list('pk', flat=True))
+    for start in range(0, len(ids), batch_size):
+        chunk = ids[start:start + batch_size]
+        stored = LoanSummary.objects.in_bulk(chunk)
+        for expected in compute_summaries(chunk, as_of):
+            actual = stored.get(expected.loan_id)
+            if actual is None:
+                problems.append((expected.loan_id, 'missing'))
+                continue
+            for field in SUMMARY_FIELDS:
+                if getattr(actual, field) != getattr(expected, field):
+                    problems.append((expected.loan_id, f"{field}: stored {getattr(actual, field)}, expected {getattr(expected, field)}"))
+    # OneToOne cascades make orphans unlikely, but rows can still be written by hand
+    orphans = LoanSummary.objects.exclude(loan_id__in=Loans.objects.values('pk')).values_list('loan_id', flat=True)
+    problems.extend((loan_id, 'orphaned') for loan_id in orphans)
+    return problems
+
+
+_pending = threading.local()
+
+
+def schedule_refresh(loan_id):
+    """
+    Refresh a loan's summary once the current transaction commits. Saves and deletes of
+    many installments inside one transaction collapse into a single refresh per loan.
+    """
+    if not hasattr(_pending, 'ids'):
+        _pending.ids = set()
+    _pending.ids.add(loan_id)
+    transaction.on_commit(flush_pending)
+
+
+def flush_pending():
+    ids, _pending.ids = getattr(_pending, 'ids', set()), set()
+    if ids:
+        refresh_loan_summaries(ids)
@@ -1,3 +1,1399 @@
-from django.test import TestCase
+import base64
+import datetime
+import gzip
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tarfile
+import tempfile
+import zipfile
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+from asgiref.sync import sync_to_async
+from django.core.management import call_command
+from django.conf import settings
+from django.core.management.base import CommandError
+from django.db import connection
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import AsyncClient, RequestFactory, TestCase, TransactionTestCase
+from django.core.cache import cache
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIClient
+import numpy as np
+from openpyxl import load_workbook
+from PIL import Image
+from rest_framework_simplejwt.tokens import AccessToken
+from auditlog.context import set_actor
+from auditlog.models import LogEntry
+from .models import User, BackupLog, RestoreLog, Member, MemberSignature, Loans, Amortization, LoanSummary, AuditSnapshot, LoanLedger, Payment
+from . import (amortization, analytics, audit_archive, backup_restore, backup_store, compression, conditional, history, jobs,
+               loan_batches, payments, pictures, profiling, reports, signatures, summaries, views)
+from .authentication import user_cache
+from .pagination import parse_fields_param
+from .serializers import MemberSerializer
+from .management.commands import benchmark_report, benchmark_suite, explain_queries
+from .utils import (DASHBOARD_SUMMARY_CACHE_KEY, generate_amortization_schedule, generate_amortization_schedules,
+                    invalidate_portfolio_analytics)
 
-# Create your tests here.
+
+def make_member(n):
+    return Member.objects.create(
+        lastname=f'Lastname{n}', firstname=f'Firstname{n}', nationality='Filipino', sex='M',
+        branch_of_service='Philippine Army', service_no=f'SN-{n}', office_business_address='Camp Aguinaldo',
+        unit_assignment='1st Infantry Division', occupation_designation='Sergeant', source_of_income='Salary',
+    )
+
+
+def make_loan(member, status='released'):
+    return Loans.objects.create(
+        member=member, loan_type='salary', loan_amount='10000.00', interest='12.00', term=12, grace=0,
+        payment_start_date=datetime.date(2025, 1, 1), maturity_date=datetime.date(2026, 1, 1), status=status,
+    )
+
+
+class ListQueryCountTests(TestCase):
+    # List endpoints must cost a fixed number of queries no matter how many rows they return
+    LIST_URLS = ['/api/users/', '/api/members/', '/api/loans/', '/api/auditlogs/']
+
+    def setUp(self):
+        self.user = User.objects.create_user('admin', 'secret', firstname='Admin', lastname='User', usertype='Admin')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def add_rows(self, start, count):
+        for n in range(start, start + count):
+            User.objects.create_user(f'user{n}', None, firstname='F', lastname='L', usertype='Personnel')
+            make_loan(make_member(n))
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        urls = self.LIST_URLS + [url + '?paginate=false' for url in self.LIST_URLS]
+        self.add_rows(0, 2)
+        baseline = {url: self.count_queries(url) for url in urls}
+        self.add_rows(2, 10)
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.count_queries(url), baseline[url])
+
+    def test_query_count_with_field_projection(self):
+        self.add_rows(0, 2)
+        url = '/api/loans/?fields=id,status,member_details'
+        baseline = self.count_queries(url)
+        self.add_rows(2, 10)
+        self.assertEqual(self.count_queries(url), baseline)
+
+
+class ListPaginationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('admin', 'secret', firstname='Admin', lastname='User', usertype='Admin')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.members = [make_member(n) for n in range(7)]
+
+    def test_cursor_paging(self):
+        seen = []
+        response = self.client.get('/api/members/?page_size=3').data
+        self.assertIsNone(response['previous'])
+        make_member(7)  # Added while paging: shows up once, on the last page
+        while True:
+            self.assertLessEqual(len(response['results']), 3)
+            seen.extend(member['id'] for member in response['results'])
+            if not response['next']:
+                break
+            response = self.client.get(response['next']).data
+            self.assertIsNotNone(response['previous'])
+        self.assertEqual(seen, list(Member.objects.order_by('id').values_list('id', flat=True)))
+
+        self.assertEqual(len(self.client.get('/api/members/').data['results']), 8)
+        with mock.patch('api.pagination.ListCursorPagination.max_page_size', 5):
+            self.assertEqual(len(self.client.get('/api/members/?page_size=100').data['results']), 5)
+        self.assertEqual(self.client.get('/api/members/?cursor=bogus').status_code, 404)
+
+    def test_field_projection(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/members/?fields=id, lastname,')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([set(member) for member in response.data['results']], [{'id', 'lastname'}] * 7)
+        select = next(query['sql'] for query in queries if 'tblMember' in query['sql'])
+        self.assertNotIn('firstname', select)  # Only the requested columns are loaded
+
+        loan = make_loan(self.members[0])
+        loans = self.client.get('/api/loans/?fields=id,member_details').data['results']
+        self.assertEqual(loans, [{'id': loan.id, 'member_details': mock.ANY}])
+        self.assertEqual(loans[0]['member_details']['id'], self.members[0].id)
+
+        response = self.client.get('/api/members/?fields=id,password,nope')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, {'fields': ['Unknown field(s): password, nope']})
+        self.assertEqual(self.client.get('/api/loans/?fields=nope&paginate=false').status_code, 400)
+
+        request = Request(RequestFactory().get('/api/members/'))
+        self.assertEqual(parse_fields_param(request, MemberSerializer), (None, None))
+
+    def test_unpaginated(self):
+        ids = [member.id for member in self.members]
+        for value in ('false', '0', 'No', 'off'):
+            with self.subTest(paginate=value):
+                response = self.client.get(f'/api/members/?paginate={value}&page_size=2')
+                self.assertEqual([member['id'] for member in response.data], ids)  # Plain list, every row
+        self.assertEqual(self.client.get('/api/members/?paginate=false&fields=id').data, [{'id': pk} for pk in ids])
+        self.assertEqual(len(self.client.get('/api/members/?paginate=true&page_size=2').data['results']), 2)
+
+
+class DashboardSummaryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('admin', 'secret', firstname='Admin', lastname='User', usertype='Admin')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.member = make_member(1)
+        self.scheduled = make_loan(self.member)  # 2025 schedule, all of it due by now
+        generate_amortization_schedules([self.scheduled])
+        Loans.objects.create(member=self.member, loan_type='quick', loan_amount='5000.00', interest='12.00', term=6, grace=0,
+                             payment_start_date=datetime.date(2099, 1, 1), maturity_date=datetime.date(2099, 7, 1), status='released')
+        make_loan(self.member, status='pending')
+        cache.delete(DASHBOARD_SUMMARY_CACHE_KEY)
+
+    def summary(self):
+        response = self.client.get('/api/dashboard/summary/')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_cached_and_uncached(self):
+        with CaptureQueriesContext(connection) as queries:
+            first = self.summary()
+        self.assertFalse(first['cached'])
+        self.assertEqual(len(queries), 6)  # One aggregate per figure
+        self.assertEqual((first['total_users'], first['total_members'], first['total_loans']), (1, 1, 3))
+        self.assertEqual(first['total_loan_amount'], Decimal('25000.00'))
+        self.assertEqual(first['loans_by_status']['released'], {'count': 2, 'total_amount': Decimal('15000.00')})
+        self.assertEqual(first['loans_by_status']['pending'], {'count': 1, 'total_amount': Decimal('10000.00')})
+        self.assertEqual(first['loans_by_type']['quick'], {'count': 1, 'total_amount': Decimal('5000.00')})
+        self.assertEqual(first['outstanding_principal'], Decimal('5000.00'))  # The 2025 schedule is fully due
+        self.assertIsNone(first['last_backup'])
+
+        with self.assertNumQueries(0):
+            second = self.summary()
+        self.assertTrue(second['cached'])
+        timing = ('cached', 'elapsed_ms')
+        self.assertEqual({k: v for k, v in second.items() if k not in timing}, {k: v for k, v in first.items() if k not in timing})
+
+    def test_writes_invalidate(self):
+        def release_pending():
+            loan = Loans.objects.get(status='pending')
+            loan.status = 'released'
+            loan.save()
+
+        writes = {
+            'user': lambda: User.objects.create_user('clerk', 'secret', firstname='C', lastname='U', usertype='Personnel'),
+            'member': lambda: make_member(2),
+            'loan status': release_pending,
+            'installment deleted': lambda: Amortization.objects.filter(loan=self.scheduled).last().delete(),
+            'bulk schedule': lambda: generate_amortization_schedules([make_loan(make_member(3))]),
+            'backup': lambda: BackupLog.objects.create(filename='full_backup.tar.gz'),
+            'restore': lambda: RestoreLog.objects.create(),
+        }
+        for name, write in writes.items():
+            with self.subTest(name):
+                self.summary()
+                self.assertIsNotNone(cache.get(DASHBOARD_SUMMARY_CACHE_KEY))
+                write()
+                self.assertIsNone(cache.get(DASHBOARD_SUMMARY_CACHE_KEY))
+                self.assertFalse(self.summary()['cached'])
+
+        summary = self.summary()
+        self.assertEqual((summary['total_users'], summary['total_members'], summary['total_loans']), (2, 3, 4))
+        self.assertEqual(summary['loans_by_status']['pending']['count'], 0)
+        self.assertIsNotNone(summary['last_backup'])
+        self.assertIsNotNone(summary['last_restore'])
+
+
+class PortfolioAnalyticsTests(TestCase):
+    def portfolio(self):
+        # Two loans; amounts in cents. The salary loan pays 1000.00 a month from January 15,
+        # the quick loan from February 1.
+        dates = lambda *values: np.array(values, dtype='datetime64[D]')
+        return analytics.Portfolio(
+            loan_ids=np.array([1, 2]), loan_types=np.array(['salary', 'quick']),
+            branches=np.array(['Philippine Army', 'Philippine Navy']), rates=np.array([12.0, 6.0]),
+            terms=np.array([3, 2]), amounts=np.array([300000, 200000]), loan_idx=np.array([0, 0, 0, 1, 1]),
+            due=dates('2025-01-15', '2025-02-15', '2025-03-15', '2025-02-01', '2025-03-01'),
+            principal=np.array([100000] * 5), interest=np.array([3000, 2000, 1000, 1000, 500]),
+            balance=np.array([200000, 100000, 0, 100000, 0]),
+        )
+
+    def test_analyze(self):
+        result = analytics.analyze(self.portfolio(), datetime.date(2025, 2, 10), months=3)
+        self.assertEqual((result['loans'], result['installments']), (2, 5))
+        self.assertEqual(
+            [(row['month'], row['principal'], row['interest']) for row in result['collections_by_month']],
+            [('2025-02', Decimal('1000.00'), Decimal('20.00')), ('2025-03', Decimal('2000.00'), Decimal('15.00')),
+             ('2025-04', Decimal('0.00'), Decimal('0.00'))],
+        )
+        self.assertEqual(result['collections_total'], {'principal': Decimal('3000.00'), 'interest': Decimal('35.00')})
+        self.assertEqual(result['interest_income_forecast'][1], {'month': '2025-03', 'quick': Decimal('5.00'), 'salary': Decimal('10.00')})
+        # Both first installments are past due, 26 and 9 days
+        self.assertEqual(result['aging'][0], {'bucket': '1-30', 'installments': 2, 'amount': Decimal('2040.00')})
+        self.assertEqual(sum(row['installments'] for row in result['aging'][1:]), 0)
+        self.assertEqual(result['outstanding_principal'], Decimal('3000.00'))
+        self.assertEqual(
+            [(row['key'], row['outstanding_principal'], row['weighted_average_rate'], row['weighted_average_remaining_term'])
+             for row in result['by_loan_type']],
+            [('quick', Decimal('1000.00'), 6.0, 1.0), ('salary', Decimal('2000.00'), 12.0, 2.0)],
+        )
+
+    def test_before_first_installment(self):
+        result = analytics.analyze(self.portfolio(), datetime.date(2025, 1, 1), months=1)
+        self.assertEqual(result['outstanding_principal'], Decimal('5000.00'))  # The loan amounts
+        self.assertEqual(sum(row['installments'] for row in result['aging']), 0)
+        self.assertEqual(result['collections_by_month'][0]['principal'], Decimal('1000.00'))
+
+    def test_snapshot_reloaded(self):
+        loan = make_loan(make_member(1))
+        generate_amortization_schedules([loan])
+        first = analytics.get_portfolio()
+        self.assertIs(analytics.get_portfolio(), first)
+        self.assertEqual(list(first.loan_ids), [loan.id])
+
+        invalidate_portfolio_analytics()  # A write in any process
+        second = analytics.get_portfolio()
+        self.assertIsNot(second, first)
+
+        cache.delete(analytics.PORTFOLIO_VERSION_KEY)  # Culled or cleared: never matches an older snapshot
+        third = analytics.get_portfolio()
+        self.assertIsNot(third, second)
+
+        with mock.patch.object(analytics, 'SNAPSHOT_MAX_AGE', -1):  # Bounded staleness without any bump
+            self.assertIsNot(analytics.get_portfolio(), third)
+
+
+class SearchIndexTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('admin', 'secret', firstname='Admin', lastname='User', usertype='Admin')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.dela_cruz = make_member(1)
+        self.dela_cruz.lastname, self.dela_cruz.firstname, self.dela_cruz.service_no = 'Dela Cruz', 'José', 'O-14523'
+        self.dela_cruz.save()
+        self.cruzado = make_member(2)
+        self.cruzado.lastname, self.cruzado.firstname = 'Cruzado', 'Maria'
+        self.cruzado.save()
+
+    def search(self, query):
+        response = self.client.get(f'/api/members/search/{query}/')
+        self.assertEqual(response.status_code, 200)
+        return [member['id'] for member in response.data]
+
+    def test_prefix_and_ranking(self):
+        # Both match the prefix "cruz"; the exact token match ranks first
+        self.assertEqual(self.search('cruz'), [self.dela_cruz.id, self.cruzado.id])
+
+    def test_multi_token_accent_folded(self):
+        self.assertEqual(self.search('jose dela'), [self.dela_cruz.id])
+        self.assertEqual(self.search('maria dela'), [])
+
+    def test_service_no_and_id(self):
+        self.assertEqual(self.search('o14523'), [self.dela_cruz.id])
+        self.assertEqual(self.search('O-145'), [self.dela_cruz.id])
+        self.assertIn(self.cruzado.id, self.search(str(self.cruzado.id)))
+
+    def test_index_follows_updates_and_deletes(self):
+        self.cruzado.lastname = 'Santos'
+        self.cruzado.save()
+        self.assertEqual(self.search('cruz'), [self.dela_cruz.id])
+        self.assertEqual(self.search('santos'), [self.cruzado.id])
+        self.dela_cruz.delete()
+        self.assertEqual(self.search('cruz'), [])
+
+    def test_user_search(self):
+        response = self.client.get('/api/users/search/adm/')
+        self.assertEqual([user['username'] for user in response.data], ['admin'])
+
+
+class QueryPlanTests(TestCase):
+    # Fails when a list, search or report query starts scanning a whole table (e.g. a dropped index)
+    def test_no_full_table_scans(self):
+        out = StringIO()
+        call_command('explain_queries', stdout=out)
+        self.assertIn('No full table scans.', out.getvalue())
+
+    def test_limited_scans(self):
+        # Only a page read in index order with conditions on that index's columns stops after LIMIT rows
+        def flagged(sql):
+            scans, sorts = explain_queries.explain(sql, [])
+            return [table for table, index in scans if sorts or not explain_queries.is_bounded(sql, table, index)]
+
+        page = 'SELECT "tblMember"."id" FROM "tblMember" {} ORDER BY "tblMember"."id" ASC LIMIT 51'
+        self.assertEqual(flagged(page.format('')), [])
+        self.assertEqual(flagged(page.format('WHERE "tblMember"."id" > 10')), [])
+        self.assertEqual(flagged(page.format('WHERE "tblMember"."occupation_designation" = \'Sergeant\'')), ['tblMember'])
+        self.assertEqual(flagged('SELECT "tblMember"."id" FROM "tblMember"'), ['tblMember'])
+        self.assertEqual(flagged('SELECT "tblMember"."id" FROM "tblMember" ORDER BY "tblMember"."lastname" LIMIT 5'), ['tblMember'])
+
+
+class AmortizationScheduleTests(TestCase):
+    FIELDS = ('seq', 'due_date', 'amortization', 'principal', 'interest', 'remaining_balance')
+
+    def test_level_payment(self):
+        self.assertEqual(amortization.level_payment('10000.00', '12.00', 12), Decimal('888.49'))  # 888.4879 rounded up
+        self.assertEqual(amortization.level_payment(1000, 0, 3), Decimal('333.34'))
+        self.assertEqual(amortization.level_payment(1200, 0.0, 12), Decimal('100.00'))
+        with self.assertRaises(ValueError):
+            amortization.level_payment(1000, 12, 0)
+
+    def test_rounding_and_final_payment(self):
+        start = datetime.date(2025, 1, 1)
+        schedule = amortization.build_schedule('10000.00', '12.00', 12, start, amortization.level_payment('10000.00', '12.00', 12))
+        self.assertEqual(len(schedule), 12)
+        self.assertEqual(schedule[0], (1, start, Decimal('888.49'), Decimal('788.49'), Decimal('100.00'), Decimal('9211.51')))
+        balance = Decimal('10000.00')
+        for row in schedule:
+            # Interest is on the previous balance, to the cent; every amount has exactly two decimals
+            self.assertEqual(row.interest, (balance * Decimal('0.01')).quantize(Decimal('0.01')))
+            self.assertEqual(row.principal + row.interest, row.amortization)
+            self.assertTrue(all(value.as_tuple().exponent == -2 for value in row[2:]))
+            balance = row.remaining_balance
+        self.assertEqual(schedule[-1].due_date, start + datetime.timedelta(days=30 * 11))
+        # The last installment only pays what is left, so it is never larger than the others
+        self.assertLess(schedule[-1].amortization, Decimal('888.49'))
+        self.assertEqual((schedule[-1].remaining_balance, sum(row.principal for row in schedule)), (0, Decimal('10000.00')))
+
+    def test_early_payoff(self):
+        schedule = amortization.build_schedule(10000, 12, 12, datetime.date(2025, 1, 31), 5000)
+        self.assertEqual([row[1:] for row in schedule], [
+            (datetime.date(2025, 1, 31), Decimal('5000'), Decimal('4900.00'), Decimal('100.00'), Decimal('5100.00')),
+            (datetime.date(2025, 3, 2), Decimal('5000'), Decimal('4949.00'), Decimal('51.00'), Decimal('151.00')),
+            (datetime.date(2025, 4, 1), Decimal('152.51'), Decimal('151.00'), Decimal('1.51'), Decimal('0.00')),
+        ])
+
+    def test_bulk_generation_matches_single(self):
+        terms = [('10000.00', '12.00', 12, 0), ('25000.00', '10.50', 18, 2), ('5000.00', '0.00', 5, 1), ('7500.00', '18.00', 24, 0)]
+
+        def make_loans(n):
+            member = make_member(n)
+            return [Loans.objects.create(member=member, loan_type='salary', loan_amount=amount, interest=rate, term=term,
+                                         grace=grace, payment_start_date=datetime.date(2025, 2, 1),
+                                         maturity_date=datetime.date(2027, 2, 1), status='released')
+                    for amount, rate, term, grace in terms]
+
+        def saved(loan):
+            return list(Amortization.objects.filter(loan=loan).order_by('seq').values_list(*self.FIELDS))
+
+        single, bulk = make_loans(1), make_loans(2)
+        with mock.patch('builtins.print'):
+            for loan in single:
+                loan.refresh_from_db()  # Decimal fields, as the bulk path gets them from a queryset
+                fixed = Decimal('2000.00') if loan.loan_amount == Decimal('7500.00') else None
+                generate_amortization_schedule(loan, fixed or amortization.level_payment(loan.loan_amount, loan.interest, loan.term))
+        pending = make_loan(make_member(3), status='pending')
+        created = generate_amortization_schedules(
+            list(Loans.objects.filter(pk__in=[loan.pk for loan in bulk] + [pending.pk, single[0].pk])),
+            amortizations={bulk[3].pk: Decimal('2000.00')},
+        )
+
+        # Pending loans and loans that already have a schedule are skipped
+        self.assertEqual(created, {loan.pk: len(saved(loan)) for loan in bulk})
+        self.assertEqual(created[bulk[3].pk], 4)  # The fixed 2000.00 pays the 24-month loan off early
+        for one, many in zip(single, bulk):
+            self.assertEqual([row[1:] for row in saved(one)], [row[1:] for row in saved(many)])
+        self.assertFalse(Amortization.objects.filter(loan=pending).exists())
+
+
+class LoanQuoteTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('admin', 'secret', firstname='Admin', lastname='User', usertype='Admin')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.member = make_member(1)
+
+    def test_quote_matches_generated_schedule(self):
+        fields = ('seq', 'due_date', 'amortization', 'principal', 'interest', 'remaining_balance')
+        for grace in (0, 2):
+            with self.subTest(grace=grace):
+                loan = Loans.objects.create(
+                    member=self.member, loan_type='salary', loan_amount='25000.00', interest='10.50', term=18, grace=grace,
+                    payment_start_date=datetime.date(2025, 3, 1), maturity_date=datetime.date(2026, 9, 1), status='released',
+                )
+                quote = self.client.post('/api/loans/quote/', {
+                    'loan_amount': '25000.00', 'interest': '10.50', 'term': 18, 'grace': grace, 'payment_start_date': '2025-03-01',
+                }, format='json').data
+                generate_amortization_schedules([loan])
+                saved = self.client.get(f'/api/loans/{loan.id}/amortization/').data
+                self.assertEqual([{field: row[field] for field in fields} for row in saved],
+                                 [{field: row[field] for field in fields} for row in quote['schedule']])
+                self.assertEqual(saved[0]['due_date'], '2025-03-01')  # The first due date, whatever the grace
+
+    def test_grace_without_start_date(self):
+        quote = self.client.post('/api/loans/quote/', {'loan_amount': '1000.00', 'interest': '12.00', 'term': 3, 'grace': 2},
+                                 format='json').data
+        self.assertEqual(quote['schedule'][0]['due_date'], str(timezone.localdate() + datetime.timedelta(days=60)))
+
+
+class LoanSummaryTests(TestCase):
+    def setUp(self):
+        self.loan = make_loan(make_member(1))
+        generate_amortization_schedules([self.loan])
+
+    def test_summary_follows_schedule(self):
+        as_of = datetime.date(2025, 3, 15)
+        summaries.refresh_loan_summaries([self.loan.pk], as_of)
+        summary = LoanSummary.objects.get(pk=self.loan.pk)
+        passed = Amortization.objects.filter(loan=self.loan, due_date__lte=as_of).order_by('seq')
+        upcoming = Amortization.objects.filter(loan=self.loan, due_date__gt=as_of).order_by('seq')
+        self.assertEqual(summary.remaining_balance, passed.last().remaining_balance)
+        self.assertEqual(summary.next_due_date, upcoming.first().due_date)
+        self.assertEqual(summary.installments_remaining, upcoming.count())
+        self.assertEqual(summaries.check(as_of=as_of), [])
+
+    def test_check_reports_drift(self):
+        LoanSummary.objects.filter(pk=self.loan.pk).update(remaining_balance='1.00')
+        self.assertEqual([loan_id for loan_id, _ in summaries.check()], [self.loan.pk])
+        summaries.rebuild()
+        self.assertEqual(summaries.check(), [])
+
+
+class MemberImportTests(TestCase):
+    HEADER = ('Last Name,First Name,Nationality,Sex,Branch of Service,Service No,Office Business Address,'
+              'Unit Assignment,Occupation Designation,Source of Income')
+
+    def setUp(self):
+        self.user = User.objects.create_user('admin', 'secret', firstname='Admin', lastname='User', usertype='Admin')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        make_member(1)  # Holds service no SN-1
+
+    def upload(self, lines, **data):
+        upload = SimpleUploadedFile('members.csv', '\n'.join([self.HEADER, *lines]).encode(), content_type='text/csv')
+        return self.client.post('/api/members/import/', {'file': upload, **data}, format='multipart')
+
+    def test_import_reports_rejected_rows(self):
+        row = 'Santos,Ana,Filipino,F,Philippine Navy,{},Camp,Unit,Ensign,Salary'
+        response = self.upload([
+            row.format('SN-100'),
+            row.format('SN-1'),  # Already in the database
+            row.format('SN-100'),  # Same file, earlier row
+            row.format('SN-101').replace(',F,', ',X,'),  # Invalid sex
+            row.format('SN-102'),
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['rows'], response.data['created']), (5, 2))
+        self.assertEqual([(error['row'], list(error['errors'])) for error in response.data['errors']],
+                         [(3, ['service_no']), (4, ['service_no']), (5, ['sex'])])
+        created = Member.objects.filter(service_no__in=['SN-100', 'SN-102'])
+        self.assertEqual(created.count(), 2)
+        entries = LogEntry.objects.get_for_objects(created)
+        self.assertEqual(entries.count(), 2)
+        self.assertEqual({entry.actor_id for entry in entries}, {self.user.id})
+        self.assertEqual(self.client.get('/api/members/search/santos/').data[0]['service_no'], 'SN-100')
+
+    def test_dry_run_and_missing_columns(self):
+        response = self.upload(['Santos,Ana,Filipino,F,Philippine Navy,SN-100,Camp,Unit,Ensign,Salary'], dry_run='true')
+        self.assertEqual((response.data['rows'], response.data['created'], response.data['errors']), (1, 0, []))
+        self.assertFalse(Member.objects.filter(service_no='SN-100').exists())
+
+        upload = SimpleUploadedFile('members.csv', b'lastname,firstname\nSantos,Ana\n')
+        response = self.client.post('/api/members/import/', {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('service_no', response.data['detail'])
+
+
+class LoanStatusBatchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('admin', 'secret', firstname='Admin', lastname='User', usertype='Admin')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        member = make_member(1)
+        self.pending = [make_loan(member, status='pending') for _ in range(3)]
+        self.rejected = make_loan(member, status='reject')
+
+    def test_release_batch(self):
+        ids = [loan.id for loan in self.pending] + [self.rejected.id, 999999]
+        response = self.client.post('/api/loans/status/batch/', {'ids': ids, 'status': 'released', 'generate_schedules': True},
+                                    format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['updated'], 3)
+        self.assertEqual([result['result'] for result in response.data['results']],
+                         ['updated'] * 3 + ['not_allowed', 'not_found'])
+        self.assertEqual({result.get('installments') for result in response.data['results'][:3]}, {12})
+
+        released = Loans.objects.filter(status='released')
+        self.assertEqual(released.count(), 3)
+        self.assertEqual(Amortization.objects.filter(loan__in=released).count(), 36)
+        self.assertEqual(LoanSummary.objects.filter(loan__in=released, status='released').count(), 3)
+        entries = LogEntry.objects.get_for_objects(released).filter(action=LogEntry.Action.UPDATE)
+        self.assertEqual([entry.changes for entry in entries], [{'status': ['pending', 'released']}] * 3)
+
+        # Repeating the batch changes nothing
+        response = self.client.post('/api/loans/status/batch/', {'ids': ids[:3], 'status': 'released'}, format='json')
+        self.assertEqual((response.data['updated'], {r['result'] for r in response.data['results']}), (0, {'unchanged'}))
+
+    def test_caches_dropped_on_commit(self):
+        keys = [conditional.TABLE_VERSION_KEY.format(table) for table in ('loans', 'amortization')]
+        versions = conditional.get_versions(keys)
+        cache.set(DASHBOARD_SUMMARY_CACHE_KEY, {'loans': 0})
+        with self.captureOnCommitCallbacks(execute=True):
+            loan_batches.transition_loans([self.pending[0].id], 'released', generate_schedules=True)
+            # Until the transaction commits, other requests still see (and may cache) the old rows
+            self.assertEqual(conditional.get_versions(keys), versions)
+            self.assertIsNotNone(cache.get(DASHBOARD_SUMMARY_CACHE_KEY))
+        self.assertTrue(all(new != old for new, old in zip(conditional.get_versions(keys), versions)))
+        self.assertIsNone(cache.get(DASHBOARD_SUMMARY_CACHE_KEY))
+
+
+class AuditLogQueryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('admin', 'secret', firstname='Admin', lastname='User', usertype='Admin')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        with set_actor(self.user):
+            self.member = make_member(1)
+            self.member.lastname = 'Santos'
+            self.member.save()
+        self.loan = make_loan(self.member)  # No actor
+
+    def results(self, query):
+        response = self.client.get(f'/api/auditlogs/{query}')
+        self.assertEqual(response.status_code, 200)
+        return response.data['results'] if isinstance(response.data, dict) else response.data
+
+    def test_filters_and_latest(self):
+        self.assertEqual(len(self.results(f'?model=member&object_id={self.member.id}')), 2)
+        self.assertEqual([log['action'] for log in self.results('?actor=admin&action=update')], ['UPDATE'])
+        self.assertEqual(len(self.results('?model=loans')), 1)
+        self.assertEqual(self.results('?date_to=2000-01-01'), [])
+        latest = self.results('?latest=1')
+        self.assertEqual(latest[0]['object']['representation'], str(self.loan))
+        self.assertEqual(self.client.get('/api/auditlogs/?model=nothing').status_code, 400)
+
+    def test_archive_keeps_entries_queryable(self):
+        LogEntry.objects.filter(content_type__model='member').update(timestamp=timezone.now() - datetime.timedelta(days=400))
+        with tempfile.TemporaryDirectory() as root, override_settings(AUDIT_ARCHIVE_ROOT=root):
+            call_command('archive_audit_logs', days=365, batch_size=1, stdout=StringIO())
+            self.assertEqual(len(os.listdir(root)), 1)
+            self.assertFalse(LogEntry.objects.filter(content_type__model='member').exists())
+            with gzip.open(os.path.join(root, os.listdir(root)[0]), 'rt') as f:
+                lines = [json.loads(line) for line in f]
+            # Every batch (one entry each here) starts with its header; rows only keep the ids
+            self.assertEqual([audit_archive.HEADER in line for line in lines], [True, False, True, False])
+            self.assertEqual(lines[2][audit_archive.HEADER]['actors'], {str(self.user.id): 'admin'})
+            self.assertNotIn('actor', lines[3])
+            self.assertEqual(len(self.results('?model=member')), 0)
+
+            response = self.client.get('/api/auditlogs/archive/?model=member&page_size=1')
+            self.assertEqual([log['action'] for log in response.data['results']], ['UPDATE'])
+            self.assertEqual(response.data['results'][0]['actor'], 'admin')
+            response = self.client.get(response.data['next'])
+            self.assertEqual([log['action'] for log in response.data['results']], ['CREATE'])
+            self.assertIsNone(response.data['next'])
+            self.assertEqual(self.client.get('/api/auditlogs/archive/?model=loans').data['results'], [])
+
+
+class ObjectHistoryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('admin', 'secret', firstname='Admin', lastname='User', usertype='Admin')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.member = make_member(1)
+        for n in range(history.SNAPSHOT_INTERVAL + 10):
+            self.member.unit_assignment = f'Unit {n}'
+            self.member.save()
+        self.member_id = self.member.id
+        self.entries = list(LogEntry.objects.get_for_object(self.member).order_by('id'))
+
+    def state(self, at):
+        response = self.client.get(f'/api/history/member/{self.member_id}/state/', {'at': at.isoformat()})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_timeline(self):
+        response = self.client.get(f'/api/history/member/{self.member.id}/?page_size=2')
+        self.assertEqual([entry['changes'] for entry in response.data['results']][0]['unit_assignment'],
+                         [f'Unit {history.SNAPSHOT_INTERVAL + 8}', f'Unit {history.SNAPSHOT_INTERVAL + 9}'])
+        self.assertEqual(self.client.get('/api/history/nothing/1/').status_code, 404)
+
+    def test_state_replays_from_checkpoints(self):
+        self.assertTrue(AuditSnapshot.objects.filter(object_id=self.member.id).exists())
+        created = self.state(self.entries[0].timestamp)
+        self.assertEqual((created['state']['unit_assignment'], created['replayed']), ('1st Infantry Division', 1))
+        latest = self.state(self.entries[-1].timestamp)
+        self.assertEqual(latest['state']['unit_assignment'], f'Unit {history.SNAPSHOT_INTERVAL + 9}')
+        self.assertLess(latest['replayed'], history.SNAPSHOT_INTERVAL)
+        self.assertFalse(self.state(self.entries[0].timestamp - datetime.timedelta(seconds=1))['exists'])
+
+        self.member.delete()
+        self.assertFalse(self.state(timezone.now())['exists'])
+
+    def test_state_survives_archiving(self):
+        middle = self.entries[30]
+        LogEntry.objects.filter(id__lte=middle.id).update(timestamp=timezone.now() - datetime.timedelta(days=400))
+        with tempfile.TemporaryDirectory() as root, override_settings(AUDIT_ARCHIVE_ROOT=root):
+            call_command('archive_audit_logs', days=365, stdout=StringIO())
+        latest = self.state(timezone.now())
+        self.assertTrue(latest['complete'])
+        self.assertEqual(latest['state']['unit_assignment'], f'Unit {history.SNAPSHOT_INTERVAL + 9}')
+        self.assertEqual(latest['state']['lastname'], 'Lastname1')  # Only known from the archived CREATE
+        self.assertFalse(self.state(timezone.now() - datetime.timedelta(days=500))['complete'])
+
+
+class AuthUserCacheTests(TestCase):
+    def setUp(self):
+        user_cache.clear()
+        user_cache.reset_stats()
+        self.admin = User.objects.create_user('admin', 'secret', firstname='Admin', lastname='User', usertype='Admin')
+        self.clerk = User.objects.create_user('clerk', 'secret', firstname='Clerk', lastname='User', usertype='Personnel')
+
+    def client_for(self, user):
+        client = APIClient()
+        client.cookies['access_token'] = str(AccessToken.for_user(user))
+        return client
+
+    def test_repeat_requests_skip_user_query(self):
+        client = self.client_for(self.admin)
+        with CaptureQueriesContext(connection) as first:
+            self.assertEqual(client.get('/api/protected/').status_code, 200)
+        with CaptureQueriesContext(connection) as second:
+            self.assertEqual(client.get('/api/protected/').status_code, 200)
+        self.assertEqual(len(second), len(first) - 1)
+
+        stats = client.get('/api/auth/cache-stats/').data
+        self.assertEqual((stats['hits'], stats['misses'], stats['hit_rate']), (2, 1, 0.6667))
+
+    def test_deactivation_locks_out_cached_user(self):
+        clerk = self.client_for(self.clerk)
+        self.assertEqual(clerk.get('/api/protected/').status_code, 200)
+        response = self.client_for(self.admin).patch(f'/api/users/{self.clerk.id}/update/', {'is_active': False}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(clerk.get('/api/protected/').status_code, 401)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('admin', 'secret', firstname='Admin', lastname='User', usertype='Admin')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.member = make_member(1)
+        self.loan = make_loan(self.member)
+
+    def test_versions_shared_between_processes(self):
+        # Another worker must see a bump made here, or it would answer 304 for stale data
+        conditional.bump_table_versions('member')
+        key = conditional.TABLE_VERSION_KEY.format('member')
+        script = ('from django.core.cache.backends.filebased import FileBasedCache; print(FileBasedCache(%r, {}).get(%r))'
+                  % (settings.CACHES['default']['LOCATION'], key))
+        output = subprocess.run([sys.executable, '-c', script], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True)
+        self.assertEqual(int(output.stdout), conditional.get_versions([key])[0])
+
+    def test_unchanged_resource_is_not_read_again(self):
+        for url in ['/api/users/', '/api/members/', '/api/loans/', f'/api/loans/search/{self.loan.id}/',
+                    f'/api/users/{self.user.id}/']:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertIn('no-cache', response['Cache-Control'])
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(len(queries), 0)
+
+    def test_write_changes_etag(self):
+        etag = self.client.get('/api/loans/')['ETag']
+        self.member.occupation_designation = 'Captain'
+        self.member.save()  # Loans embed member details
+        response = self.client.get('/api/loans/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+        etag = self.client.get('/api/loans/')['ETag']
+        self.client.post('/api/loans/status/batch/', {'ids': [make_loan(self.member, 'pending').id], 'status': 'reject'}, format='json')
+        self.assertEqual(self.client.get('/api/loans/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_schedule_validators(self):
+        url = f'/api/loans/{self.loan.id}/amortization/'
+        empty = self.client.get(url)
+        self.assertIn('no-cache', empty['Cache-Control'])  # Not generated yet
+
+        generate_amortization_schedules([self.loan])
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=empty['ETag'])
+        self.assertEqual((response.status_code, len(response.data)), (200, 12))
+        self.assertIn('no-cache', response['Cache-Control'])  # Payments change the paid amounts
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304)
+
+
+class AsyncViewTests(TransactionTestCase):
+    # Async views query from worker threads, which only see committed rows
+    def setUp(self):
+        self.user = User.objects.create_user('admin', 'secret', firstname='Admin', lastname='User', usertype='Admin')
+        self.loan = make_loan(make_member(1))
+        generate_amortization_schedules([self.loan])
+        self.token = str(AccessToken.for_user(self.user))
+        self.client = APIClient()
+        self.client.cookies['access_token'] = self.token
+        self.async_client = AsyncClient()
+        self.async_client.cookies['access_token'] = self.token
+
+    async def get(self, path, **headers):
+        return await self.async_client.get(path, headers=headers)
+
+    async def test_same_responses_as_sync_views(self):
+        timing = ('cached', 'elapsed_ms', 'computed_ms', 'computed_at')
+        for path in ['/api/dashboard/summary/', '/api/members/', '/api/loans/?fields=id,member_details',
+                     f'/api/loans/{self.loan.id}/amortization/', '/api/auditlogs/?latest=10', '/api/auditlogs/']:
+            with self.subTest(path=path):
+                sync = await sync_to_async(self.client.get)(path)
+                response = await self.get(path.replace('/api/', '/api/async/', 1))
+                self.assertEqual(response.status_code, 200)
+                expected, actual = sync.json(), response.json()
+                if 'dashboard' in path:
+                    expected, actual = ({k: v for k, v in d.items() if k not in timing} for d in (expected, actual))
+                self.assertEqual(actual, expected)
+
+    async def test_conditional_get_and_authentication(self):
+        path = f'/api/async/loans/{self.loan.id}/amortization/'
+        response = await self.get(path)
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertEqual((await self.get(path, if_none_match=response['ETag'])).status_code, 304)
+        self.assertEqual((await AsyncClient().get(path)).status_code, 401)
+        self.assertEqual((await self.get('/api/async/members/?fields=nope')).status_code, 400)
+
+
+class PictureDerivativeTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.enterContext(override_settings(MEDIA_ROOT=self.media.name))
+        self.addCleanup(self.media.cleanup)
+        self.user = User.objects.create_user('admin', 'secret', firstname='Admin', lastname='User', usertype='Admin')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.member = make_member(1)
+
+    def upload_picture(self, color='red'):
+        image = io.BytesIO()
+        Image.new('RGB', (2000, 1500), color).save(image, 'PNG')
+        upload = SimpleUploadedFile('photo.png', image.getvalue(), content_type='image/png')
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.patch(f'/api/members/{self.member.id}/update/', {'member_picture': upload}, format='multipart')
+        self.assertEqual((response.status_code, len(callbacks)), (200, 1))  # Queued for the worker
+        pictures.generate_for(self.member.id)  # What the worker does once the upload commits
+
+    def test_list_serves_thumbnail(self):
+        self.assertIsNone(self.client.get('/api/members/').data['results'][0]['thumbnail_url'])
+        self.upload_picture()
+        member = self.client.get('/api/members/?fields=id,thumbnail_url,preview_url').data['results'][0]
+        self.assertRegex(member['thumbnail_url'], r'^/media/derived/[0-9a-f]{2}/[0-9a-f]{64}-thumb-128x128\.jpg$')
+        with Image.open(os.path.join(self.media.name, member['thumbnail_url'][len('/media/'):])) as thumb:
+            self.assertEqual(thumb.size, (128, 96))
+        self.assertIn('-preview-640x640', self.client.get('/api/members/search/lastname1/').data[0]['preview_url'])
+
+        path = member['thumbnail_url'][len('/media/derived/'):]
+        response = views.serve_derived_image(RequestFactory().get(member['thumbnail_url']), path,
+                                             document_root=os.path.join(self.media.name, pictures.DERIVED_DIR))
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_replaced_picture_and_backfill(self):
+        self.upload_picture('red')
+        first = Member.objects.get(pk=self.member.id).picture_digest
+        self.upload_picture('blue')
+        self.assertNotEqual(Member.objects.get(pk=self.member.id).picture_digest, first)
+
+        Member.objects.filter(pk=self.member.id).update(picture_digest='', picture_source='')
+        call_command('generate_picture_derivatives', stdout=StringIO())
+        self.assertIsNotNone(self.client.get('/api/members/').data['results'][0]['thumbnail_url'])
+
+
+class MemberSignatureTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('admin', 'secret', firstname='Admin', lastname='User', usertype='Admin')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.member = make_member(1)
+        image = io.BytesIO()
+        Image.new('L', (300, 100), 255).save(image, 'PNG')
+        self.png = image.getvalue()
+
+    def test_signature_served_separately(self):
+        data_url = f"data:image/png;base64,{base64.b64encode(self.png).decode()}"
+        response = self.client.patch(f'/api/members/{self.member.id}/update/', {'member_signature': data_url}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        listed = self.client.get('/api/members/').data['results'][0]
+        self.assertNotIn('member_signature', listed)
+        self.assertEqual(listed['signature_url'], f'/api/members/{self.member.id}/signature/')
+        self.assertEqual(self.client.get('/api/loans/').status_code, 200)
+        response = self.client.get(listed['signature_url'])
+        self.assertEqual((response['Content-Type'], response.content), ('image/png', self.png))
+        self.assertEqual(signatures.as_text(MemberSignature.objects.get(member=self.member)), data_url)
+
+        self.client.patch(f'/api/members/{self.member.id}/update/', {'occupation_designation': 'Captain'}, format='json')
+        self.assertEqual(self.client.get(listed['signature_url']).content, self.png)  # Left out: kept
+
+        self.client.patch(f'/api/members/{self.member.id}/update/', {'member_signature': ''}, format='json')
+        self.assertIsNone(self.client.get('/api/members/').data['results'][0]['signature_url'])
+        self.assertEqual(self.client.get(listed['signature_url']).status_code, 404)
+
+    def test_invalid_signature_rejected(self):
+        html = base64.b64encode(b'<script>alert(1)</script>').decode()
+        for value in ('data:image/png;base64,@@', f'data:text/html;base64,{html}', f'data:image/svg+xml;base64,{html}',
+                      f'data:image/png;base64,{html}', 'plain text'):  # The last PNG's bytes aren't a PNG
+            response = self.client.patch(f'/api/members/{self.member.id}/update/', {'member_signature': value}, format='json')
+            self.assertEqual(response.status_code, 400, value)
+            self.assertIn('member_signature', response.data)
+        self.assertFalse(MemberSignature.objects.exists())
+
+    def test_legacy_text_served_as_download(self):
+        signatures.save(self.member, signatures.encode('data:text/html;base64,PHNjcmlwdD4=', strict=False))
+        Member.objects.filter(pk=self.member.pk).update(has_signature=True)
+        response = self.client.get(f'/api/members/{self.member.id}/signature/')
+        self.assertEqual(response['Content-Type'], 'text/plain')
+        self.assertTrue(response['Content-Disposition'].startswith('attachment'))
+        self.assertEqual(response['Content-Security-Policy'], 'sandbox')
+        self.assertEqual(response.content, b'data:text/html;base64,PHNjcmlwdD4=')  # Kept verbatim
+
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', 'secret', firstname='Admin', lastname='User', usertype='Admin')
+        self.loan = make_loan(make_member(1))
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.logs = tempfile.TemporaryDirectory()
+        self.addCleanup(self.logs.cleanup)
+        self.enterContext(override_settings(PROFILING_SAMPLE_RATE=1, PROFILING_SLOW_REQUEST_MS=0,
+                                            PROFILING_LOG_ROOT=self.logs.name))
+        profiling.endpoint_stats.reset()
+
+    def test_summary_per_endpoint(self):
+        for _ in range(3):
+            self.assertEqual(self.client.get('/api/loans/').status_code, 200)
+        self.client.get(f'/api/loans/{self.loan.id}/amortization/')
+
+        summary = self.client.get('/api/profiling/summary/?reset=true').data
+        endpoints = {row['endpoint']: row for row in summary['endpoints']}
+        loans = endpoints['GET api/loans/']
+        self.assertEqual(loans['samples'], 3)
+        self.assertGreater(loans['queries']['p50'], 0)
+        self.assertGreater(loans['serializer_ms']['p99'], 0)
+        self.assertGreater(loans['avg_bytes'], 0)
+        self.assertLessEqual(loans['wall_ms']['p50'], loans['wall_ms']['p99'])
+        self.assertIn('GET api/loans/<int:pk>/amortization/', endpoints)
+        self.assertEqual(self.client.get('/api/profiling/summary/').data['endpoints'][0]['samples'], 1)  # Reset
+
+        with open(os.path.join(self.logs.name, 'slow_requests.log'), encoding='utf-8') as log:
+            entry = json.loads(log.readline())
+        self.assertEqual((entry['endpoint'], entry['status'], entry['user']), ('GET api/loans/', 200, 'admin'))
+        self.assertEqual(len(entry['sql']), entry['queries'])
+
+    def test_unsampled_and_admin_only(self):
+        with override_settings(PROFILING_SAMPLE_RATE=0):
+            self.client.get('/api/loans/')
+        self.assertEqual(profiling.endpoint_stats.summary()['endpoints'], [])
+
+        clerk = User.objects.create_user('clerk', 'secret', firstname='Clerk', lastname='User', usertype=User.PERSONNEL)
+        self.client.force_authenticate(clerk)
+        self.assertEqual(self.client.get('/api/profiling/summary/').status_code, 403)
+
+
+class SyntheticDataTests(TestCase):
+    def test_generate_synthetic_data(self):
+        call_command('generate_synthetic_data', members=200, stdout=StringIO())
+        loans = Loans.objects.filter(member__service_no__startswith='SYN-')
+        self.assertEqual(Member.objects.filter(service_no__startswith='SYN-').count(), 200)
+        self.assertEqual(set(loans.values_list('loan_type', flat=True)), {key for key, _ in Loans.LOAN_TYPE_CHOICES})
+        self.assertEqual(set(loans.values_list('status', flat=True)), {key for key, _ in Loans.STATUS_CHOICES})
+        self.assertFalse(loans.filter(status='released', amortization__isnull=True).exists())
+        self.assertFalse(Amortization.objects.exclude(loan__status='released').exists())
+        self.assertEqual(LogEntry.objects.filter(action=LogEntry.Action.CREATE).count(), 200 + loans.count())
+
+        member = Member.objects.filter(service_no__startswith='SYN-').first()
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('admin', 'secret', firstname='A', lastname='U', usertype='Admin'))
+        results = client.get(f'/api/members/search/{member.lastname} {member.firstname}/').data
+        self.assertIn(member.id, [row['id'] for row in results])
+
+        with self.assertRaises(CommandError):  # Same prefix twice
+            call_command('generate_synthetic_data', members=1, stdout=StringIO())
+
+    def test_baseline_comparison(self):
+        def results(median_ms):
+            return {'scales': {'1000': {'benchmarks': {'loans_list': {'median_ms': median_ms}}}}}
+
+        command = benchmark_suite.Command(stdout=StringIO())
+        command.compare(results(10.0), results(12.0), tolerance=0.25, min_delta_ms=2)  # Within tolerance
+        command.compare(results(1.0), results(2.0), tolerance=0.25, min_delta_ms=2)  # Below the noise floor
+        with self.assertRaisesMessage(CommandError, 'loans_list at 1000'):
+            command.compare(results(10.0), results(14.0), tolerance=0.25, min_delta_ms=2)
+
+
+class PaymentLedgerTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('admin', 'secret', firstname='Admin', lastname='User', usertype='Admin')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        member = make_member(1)
+        self.loan = make_loan(member)
+        generate_amortization_schedules([self.loan])
+        self.schedule = list(Amortization.objects.filter(loan=self.loan).order_by('seq'))
+
+    def pay(self, amount, **data):
+        return self.client.post(f'/api/loans/{self.loan.id}/payments/', {'amount': str(amount), **data}, format='json')
+
+    def test_interest_first_allocation(self):
+        first, second = self.schedule[:2]
+        response = self.pay(first.interest + first.principal + second.interest + 10, reference='OR-1')
+        self.assertEqual(response.status_code, 201)
+        payment, ledger = response.data['payment'], response.data['ledger']
+        self.assertEqual((payment['first_seq'], payment['last_seq']), (1, 2))
+        self.assertEqual(Decimal(payment['interest_paid']), first.interest + second.interest)
+        self.assertEqual(Decimal(payment['principal_paid']), first.principal + 10)
+        self.assertEqual(ledger['next_seq'], 2)
+        self.assertEqual(Decimal(ledger['principal_balance']), sum(row.principal for row in self.schedule) - first.principal - 10)
+
+        rows = self.client.get(f'/api/loans/{self.loan.id}/amortization/').data
+        self.assertEqual(Decimal(rows[1]['interest_paid']), second.interest)
+        self.assertEqual(Decimal(rows[1]['principal_paid']), Decimal('10.00'))
+        self.assertEqual(self.client.get(f'/api/loans/{self.loan.id}/payments/').data['results'][0]['posted_by'], 'admin')
+
+    def test_schedule_revalidated_after_posting(self):
+        url = f'/api/loans/{self.loan.id}/amortization/'
+        before = self.client.get(url)
+        self.assertIn('no-cache', before['Cache-Control'])
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=before['ETag']).status_code, 304)
+
+        self.pay(self.schedule[0].interest, reference='OR-1')
+        after = self.client.get(url, HTTP_IF_NONE_MATCH=before['ETag'])
+        self.assertEqual(after.status_code, 200)
+        self.assertEqual(Decimal(after.data[0]['interest_paid']), self.schedule[0].interest)
+
+    def test_overpayment_credit_and_duplicate_reference(self):
+        total = sum(row.interest + row.principal for row in self.schedule)
+        self.assertEqual(self.pay(total + 100, reference='OR-1').status_code, 201)
+        ledger = self.client.get(f'/api/loans/{self.loan.id}/ledger/').data
+        self.assertEqual((ledger['next_seq'], Decimal(ledger['principal_balance'])), (len(self.schedule) + 1, Decimal('0.00')))
+        self.assertEqual(Decimal(ledger['credit']), Decimal('100.00'))
+
+        response = self.pay(50, reference='OR-1')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('reference', response.data['detail'])
+        self.assertEqual(self.pay(0).status_code, 400)
+        self.assertEqual(Payment.objects.count(), 1)
+
+    def test_concurrent_duplicate_reference(self):
+        self.assertEqual(self.pay(100, reference='OR-1').status_code, 201)
+        # A second request whose check ran before the first one committed: the constraint stops it
+        with mock.patch.object(payments, 'check_lines', lambda lines, seen, errors: lines):
+            with self.assertRaisesMessage(ValueError, payments.CONFLICT):
+                payments.post_payment(self.loan.id, Decimal('100.00'), reference='OR-1')
+        self.assertEqual(Payment.objects.count(), 1)
+        self.assertEqual(LoanLedger.objects.get(loan=self.loan).payment_count, 1)
+        self.assertEqual(self.pay(100).status_code, 201)  # Payments without a reference never clash
+        self.assertEqual(self.pay(100).status_code, 201)
+
+    def test_conflict_rolls_back_the_chunk(self):
+        unscheduled = make_loan(self.loan.member)
+        check_lines = payments.check_lines
+
+        def racing_check(lines, seen, errors):
+            # Another request posts OR-1 between this one's duplicate check and its insert
+            accepted = check_lines(lines, seen, errors)
+            Payment.objects.create(loan=self.loan, amount=100, paid_on=timezone.localdate(), reference='OR-1',
+                                   interest_paid=0, principal_paid=0, principal_balance=0)
+            return accepted
+
+        lines = [{'row': row, 'loan_id': loan_id, 'amount': Decimal('100.00'), 'paid_on': timezone.localdate(), 'reference': reference}
+                 for row, loan_id, reference in [(2, self.loan.id, 'OR-1'), (3, self.loan.id, 'OR-2'), (4, unscheduled.id, 'OR-3')]]
+        seen, errors = {(self.loan.id, 'OR-0'): 1}, []
+        with mock.patch.object(payments, 'check_lines', racing_check):
+            self.assertEqual(payments.post_lines(lines, seen=seen, errors=errors), [])
+        self.assertEqual(seen, {(self.loan.id, 'OR-0'): 1})  # The chunk's references weren't used after all
+        self.assertEqual([(error['row'], error['errors']) for error in errors],
+                         [(4, {'loan_id': ['Loan has no amortization schedule.']}),
+                          (2, {'reference': [payments.CONFLICT]}), (3, {'reference': [payments.CONFLICT]})])
+        self.assertFalse(Payment.objects.exists())
+
+    def test_payroll_file(self):
+        pending = make_loan(self.loan.member, status='pending')
+        amount = self.schedule[0].interest + self.schedule[0].principal
+        lines = ['Loan ID,Amount', f'{self.loan.id},{amount}', '999999,100', f'{pending.id},100', f'{self.loan.id},abc',
+                 f'{self.loan.id},{amount}']
+
+        def upload(**data):
+            upload = SimpleUploadedFile('payroll.csv', '\n'.join(lines).encode(), content_type='text/csv')
+            return self.client.post('/api/payments/payroll/', {'file': upload, 'reference': '2025-01', **data}, format='multipart')
+
+        version_keys = [conditional.TABLE_VERSION_KEY.format('payment')]
+        versions = conditional.get_versions(version_keys) + [conditional.schedule_version(self.loan.id)]
+        response = upload(dry_run='true')
+        self.assertEqual((response.data['rows'], response.data['posted']), (5, 1))
+        self.assertFalse(Payment.objects.exists())
+        self.assertEqual(LoanLedger.objects.get(loan=self.loan).payment_count, 0)
+        # Nothing kept, nothing to revalidate
+        self.assertEqual(conditional.get_versions(version_keys) + [conditional.schedule_version(self.loan.id)], versions)
+
+        response = upload()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['posted'], response.data['amount']), (1, amount))
+        self.assertEqual([(error['row'], list(error['errors'])) for error in response.data['errors']],
+                         [(3, ['loan_id']), (4, ['loan_id']), (5, ['amount']), (6, ['reference'])])
+        self.assertEqual(LoanLedger.objects.get(loan=self.loan).next_seq, 2)
+        self.assertEqual(upload().data['errors'][0]['errors']['reference'][0],
+                         'A payment with this reference was already posted for the loan.')
+
+    def test_posting_cost_independent_of_history(self):
+        def queries_to_post(reference):
+            with CaptureQueriesContext(connection) as queries:
+                payments.post_payment(self.loan.id, Decimal('100.00'), reference=reference)
+            return len(queries)
+
+        queries_to_post('first')  # Opens the ledger
+        after_one = queries_to_post('second')
+        for n in range(20):
+            payments.post_payment(self.loan.id, Decimal('100.00'), reference=f'more-{n}')
+        self.assertEqual(queries_to_post('last'), after_one)
+        ledger = LoanLedger.objects.get(loan=self.loan)
+        self.assertEqual(ledger.payment_count, 23)
+        self.assertEqual(ledger.principal_paid + ledger.interest_paid, Decimal('2300.00'))
+
+
+class LoanReportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('admin', 'secret', firstname='Admin', lastname='User', usertype='Admin')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def cells(self, data):
+        ws = load_workbook(io.BytesIO(data)).active
+        return {cell.coordinate: (cell.value, cell.number_format) for row in ws.iter_rows() for cell in row}
+
+    def test_matches_legacy_report(self):
+        # The cached template renders exactly what loading and scanning the template did, report after report
+        long_loan = make_loan(make_member(1))
+        short_loan = Loans.objects.create(
+            member=make_member(2), loan_type='quick', loan_amount='2500.00', interest='5.00', term=3, grace=0,
+            payment_start_date=datetime.date(2025, 3, 1), maturity_date=datetime.date(2025, 6, 1), status='released',
+        )
+        generate_amortization_schedules([long_loan, short_loan])
+        for loan_id in (long_loan.id, short_loan.id, long_loan.id):
+            loan = Loans.objects.get(pk=loan_id)  # As the view loads it (Decimal amounts, date fields)
+            with self.subTest(loan=loan.id):
+                response = self.client.get(f'/api/loans/{loan.id}/report/')
+                self.assertEqual(response.status_code, 200)
+                rendered = self.cells(b''.join(response.streaming_content))
+                legacy = self.cells(benchmark_report.legacy_report(loan).getvalue())
+                self.assertEqual(rendered, legacy)
+                start = datetime.datetime.combine(loan.payment_start_date, datetime.time())
+                self.assertEqual((rendered['R27'], rendered['R33'][0]), ((start, 'DD-MM-YYYY'), float(loan.loan_amount)))
+                self.assertEqual(rendered[f'A{33 + loan.term}'][0], loan.term)
+
+
+class BackgroundJobTests(TestCase):
+    def setUp(self):
+        self.root = tempfile.TemporaryDirectory()
+        self.enterContext(override_settings(JOBS_ROOT=self.root.name))
+        self.addCleanup(self.root.cleanup)
+        self.enterContext(mock.patch.object(jobs, 'connection'))  # run_job closes its thread's connection, here the test's
+        self.user = User.objects.create_user('admin', 'secret', firstname='Admin', lastname='User', usertype='Admin')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def run_inline(self):
+        # Jobs run in the test's thread (and transaction) instead of a background thread
+        return mock.patch.object(jobs, 'start_job', side_effect=jobs.run_job)
+
+    def test_job_store(self):
+        job = jobs.create_job('test', {'a': 1}, self.user)
+        self.assertEqual((job['status'], job['user']), (jobs.QUEUED, 'admin'))
+        jobs.report_progress(job['id'], 3, 4)
+        self.assertEqual(jobs.get_job(job['id'])['progress'], 75)
+        jobs.run_job(job['id'], lambda job_id, value: value * 2, 21)
+        job = jobs.get_job(job['id'])
+        self.assertEqual((job['status'], job['progress'], job['result']), (jobs.COMPLETED, 100, 42))
+
+        failed = jobs.create_job('test')
+        with self.assertLogs('api.jobs', 'ERROR'):
+            jobs.run_job(failed['id'], lambda job_id: 1 / 0)
+        self.assertEqual(jobs.get_job(failed['id'])['status'], jobs.FAILED)
+
+        with self.assertRaises(ValueError):
+            jobs.job_dir('../escape')
+
+    def test_missing_job(self):
+        job = jobs.create_job('test')
+        shutil.rmtree(jobs.job_dir(job['id']))
+        self.assertIsNone(jobs.get_job(job['id']))
+        self.assertIsNone(jobs.update_job(job['id'], progress=50))
+        self.assertIsNone(jobs.request_cancel(job['id']))
+        with self.assertRaises(jobs.JobCancelled):
+            jobs.report_progress(job['id'], 1, 2)
+        jobs.run_job(job['id'], mock.Mock())  # Nothing left to run
+        self.assertFalse(os.path.exists(jobs.job_dir(job['id'])))
+        self.assertEqual(self.client.get(f"/api/jobs/{job['id']}/").status_code, 404)
+        self.assertEqual(self.client.get('/api/jobs/not-a-uuid/').status_code, 404)
+
+    def test_cancel_queued(self):
+        job = jobs.create_job('test', user=self.user)
+        response = self.client.post(f"/api/jobs/{job['id']}/cancel/")
+        self.assertEqual((response.status_code, response.data['status']), (200, jobs.CANCELLED))
+        func = mock.Mock()
+        jobs.run_job(job['id'], func)
+        func.assert_not_called()
+        self.assertEqual(jobs.get_job(job['id'])['status'], jobs.CANCELLED)
+
+    def test_cancel_running(self):
+        def work(job_id):
+            jobs.report_progress(job_id, 1, 3)
+            jobs.request_cancel(job_id)  # From another worker, between two progress writes
+            jobs.update_job(job_id, note='still writing')  # A late write doesn't lose the request
+            jobs.report_progress(job_id, 2, 3)
+            return 'never'
+
+        job = jobs.create_job('test')
+        jobs.run_job(job['id'], work)
+        job = jobs.get_job(job['id'])
+        self.assertEqual((job['status'], job['cancel_requested'], job['result']), (jobs.CANCELLED, True, None))
+        self.assertEqual(jobs.request_cancel(job['id'])['status'], jobs.CANCELLED)  # Finished jobs are left alone
+
+    def test_report_export_and_download(self):
+        loans = [make_loan(make_member(n)) for n in range(3)]
+        make_loan(make_member(3), status='pending')
+        generate_amortization_schedules(loans)
+        with self.run_inline():
+            response = self.client.post('/api/loans/reports/export/', {'status': 'released'}, format='json')
+        self.assertEqual(response.status_code, 202)
+        job = self.client.get(f"/api/jobs/{response.data['id']}/").data
+        self.assertEqual((job['status'], job['done'], job['total'], job['result']), (jobs.COMPLETED, 3, 3, 'loan_reports.zip'))
+
+        response = self.client.get(f"/api/jobs/{job['id']}/download/")
+        self.assertEqual(response.status_code, 200)
+        with zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content))) as archive:
+            self.assertEqual(sorted(archive.namelist()), sorted(f'Loan_Report_{loan.id}.xlsx' for loan in loans))
+
+        other = User.objects.create_user('clerk', 'secret', firstname='Clerk', lastname='User', usertype='Personnel')
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get(f"/api/jobs/{job['id']}/download/").status_code, 404)
+
+    def test_download_unfinished_or_cancelled_export(self):
+        make_loan(make_member(1))
+        with mock.patch.object(jobs, 'start_job'):
+            response = self.client.post('/api/loans/reports/export/', {}, format='json')
+        job_id = response.data['id']
+        self.assertEqual(self.client.get(f'/api/jobs/{job_id}/download/').status_code, 409)
+
+        # Cancelled between two chunks: the partial archive is removed and there's nothing to download
+        real_report_progress = jobs.report_progress
+
+        def cancel_after_first(job_id, done, total):
+            if done == 1:
+                jobs.request_cancel(job_id)
+            return real_report_progress(job_id, done, total)
+
+        make_loan(make_member(2))
+        with self.run_inline(), mock.patch.object(reports, 'EXPORT_CHUNK_SIZE', 1), \
+                mock.patch.object(jobs, 'report_progress', side_effect=cancel_after_first):
+            job_id = self.client.post('/api/loans/reports/export/', {}, format='json').data['id']
+        self.assertEqual(jobs.get_job(job_id)['status'], jobs.CANCELLED)
+        self.assertFalse(os.path.exists(jobs.job_file(job_id, 'loan_reports.zip')))
+        self.assertEqual(self.client.get(f'/api/jobs/{job_id}/download/').status_code, 409)
+
+
+class IncrementalBackupTests(TestCase):
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        self.root = root.name
+        self.media = os.path.join(self.root, 'media')
+        os.makedirs(os.path.join(self.root, 'backups'))
+        store = os.path.join(self.root, 'backups', 'store')
+        self.enterContext(override_settings(BASE_DIR=self.root, MEDIA_ROOT=self.media, BACKUP_INCREMENTAL_KEEP=0))
+        self.enterContext(mock.patch.multiple(backup_store, STORE_DIR=store, OBJECTS_DIR=os.path.join(store, 'objects'),
+                                              MANIFESTS_DIR=os.path.join(store, 'manifests')))
+
+    def write_media(self, path, data):
+        full_path = os.path.join(self.media, path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, 'wb') as f:
+            f.write(data)
+
+    def read_media(self):
+        files = {}
+        for root, _, names in os.walk(self.media):
+            for name in names:
+                with open(os.path.join(root, name), 'rb') as f:
+                    files[os.path.relpath(os.path.join(root, name), self.media)] = f.read()
+        return files
+
+    def objects(self):
+        return {os.path.join(root, name) for root, _, names in os.walk(backup_store.OBJECTS_DIR) for name in names}
+
+    def test_backup_restore_round_trip(self):
+        self.write_media('member_pictures/a.png', b'a' * 5000)
+        self.write_media('signatures/b.png', b'b' * 3000)
+        media = self.read_media()
+        name, stats = backup_restore.incremental_backup()
+        with open(settings.DATABASES['default']['NAME'], 'rb') as f:
+            database = f.read()
+        self.assertEqual(BackupLog.objects.get(filename=name).bytes_written, stats.bytes_written)
+
+        # Media changed after the backup; the restore brings back exactly what was backed up
+        self.write_media('member_pictures/a.png', b'changed')
+        self.write_media('member_pictures/new.png', b'new')
+        loaded = []
+        with mock.patch.object(backup_restore, 'load_database', side_effect=lambda path: loaded.append(open(path, 'rb').read())):
+            self.assertEqual(backup_restore.restore_from_manifest(name), 2)
+        self.assertEqual(loaded, [database])
+        self.assertEqual(self.read_media(), media)
+        self.assertEqual(os.listdir(os.path.join(self.root, 'backups')), ['store'])  # Temporary dump removed
+
+    def test_unchanged_content_stored_once(self):
+        self.write_media('member_pictures/a.png', os.urandom(5000))
+        first_name, _ = backup_restore.incremental_backup()
+        objects = self.objects()
+
+        self.write_media('member_pictures/b.png', os.urandom(2000))
+        second_name, second = backup_restore.incremental_backup()
+        first, second_manifest = (backup_store.load_manifest(name) for name in (first_name, second_name))
+        new_picture = next(entry for entry in second_manifest['media'] if entry['path'].endswith('b.png'))
+        self.assertEqual(self.objects() - objects, {backup_store.object_path(new_picture['sha256'])})
+        self.assertEqual(second_manifest['database']['chunks'], first['database']['chunks'])
+        # Only the new picture was written; the database and a.png were already stored
+        self.assertEqual(second.bytes_written, 2000)
+        self.assertEqual(second.bytes_deduplicated, os.path.getsize(settings.DATABASES['default']['NAME']) + 5000)
+
+    def test_prune(self):
+        for n in range(3):
+            self.write_media('member_pictures/photo.png', bytes([n]) * 4000)
+            backup_restore.incremental_backup()
+        manifests = backup_store.list_manifests()
+        old_photos = {backup_store.object_path(backup_store.load_manifest(m['name'])['media'][0]['sha256']) for m in manifests[1:]}
+
+        # Recently written objects survive the first pass; only the manifests go
+        self.assertEqual(backup_store.prune(1), (2, 0, 0))
+        self.assertEqual(backup_store.prune(1, grace=0), (0, 2, 8000))
+        self.assertEqual([m['name'] for m in backup_store.list_manifests()], [manifests[0]['name']])
+        self.assertFalse(old_photos & self.objects())
+        backup_store.restore_media(backup_store.load_manifest(manifests[0]['name']), self.media)
+        self.assertEqual(self.read_media(), {os.path.join('member_pictures', 'photo.png'): bytes([2]) * 4000})
+        with self.assertRaises(ValueError):
+            backup_store.prune(0)
+
+        # Retention applied by every incremental backup
+        with override_settings(BACKUP_INCREMENTAL_KEEP=2):
+            backup_restore.incremental_backup()
+            backup_restore.incremental_backup()
+        self.assertEqual(len(backup_store.list_manifests()), 2)
+
+    def test_parallel_gzip_stream(self):
+        data = os.urandom(50000) + b'loan ledger ' * 20000
+        out = io.BytesIO()
+        with compression.ParallelGzipWriter(out, workers=3, block_size=8192) as gz:
+            for start in range(0, len(data), 7000):
+                gz.write(data[start:start + 7000])
+        self.assertEqual(gzip.decompress(out.getvalue()), data)
+        self.assertLess(len(out.getvalue()), len(data))
+
+        empty = io.BytesIO()
+        compression.ParallelGzipWriter(empty).close()
+        self.assertEqual(gzip.decompress(empty.getvalue()), b'')
+
+        # A tar written through it extracts from a non-seekable stream, as a streamed restore reads it
+        self.write_media('member_pictures/a.png', data)
+        archive = io.BytesIO()
+        with compression.ParallelGzipWriter(archive, block_size=4096) as gz, tarfile.open(fileobj=gz, mode='w|') as tar:
+            for path, arcname in backup_restore.media_entries(self.media):
+                tar.add(path, arcname=arcname, recursive=False)
+        target = os.path.join(self.root, 'extract')
+        backup_restore.extract_stream(io.BytesIO(archive.getvalue()), target)
+        with open(os.path.join(target, 'media', 'member_pictures', 'a.png'), 'rb') as f:
+            self.assertEqual(f.read(), data)
+
+
+class StreamingRestoreTests(TestCase):
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        self.root = root.name
+        self.media = os.path.join(self.root, 'media')
+        self.enterContext(override_settings(MEDIA_ROOT=self.media, JOBS_ROOT=os.path.join(self.root, 'jobs')))
+        self.enterContext(mock.patch.object(jobs, 'connection'))  # Jobs run inline, in the test's transaction
+        self.loaded = []
+        self.load_database = self.enterContext(mock.patch.object(
+            backup_restore, 'load_database', side_effect=lambda path: self.loaded.append(open(path, 'rb').read())))
+        self.user = User.objects.create_user('admin', 'secret', firstname='Admin', lastname='User', usertype='Admin')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.picture = os.urandom(200 * 1024)  # Several upload chunks
+
+    def archive(self, members=None):
+        members = members or {'db.sqlite3': b'SQLite format 3\x00', 'media/member_pictures/a.png': self.picture}
+        data = io.BytesIO()
+        with tarfile.open(fileobj=data, mode='w:gz') as tar:
+            for name, content in members.items():
+                info = tarfile.TarInfo(name)
+                info.size = len(content)
+                tar.addfile(info, io.BytesIO(content))
+        return data.getvalue()
+
+    def upload(self, data, start_job=jobs.run_job):
+        with mock.patch.object(jobs, 'start_job', side_effect=start_job):
+            return self.client.post('/api/restore/', {'backup_file': SimpleUploadedFile('backup.tar.gz', data)}, format='multipart')
+
+    def assert_cleaned_up(self, job_id):
+        self.assertFalse(os.path.exists(jobs.job_file(job_id, 'extract')))
+
+    def test_streamed_restore(self):
+        response = self.upload(self.archive())
+        self.assertEqual(response.status_code, 202)
+        job = jobs.get_job(response.json()['id'])
+        self.assertEqual((job['status'], job['progress'], job['media_restored']), (jobs.COMPLETED, 100, True))
+        self.assertEqual(self.loaded, [b'SQLite format 3\x00'])
+        with open(os.path.join(self.media, 'member_pictures', 'a.png'), 'rb') as f:
+            self.assertEqual(f.read(), self.picture)
+        self.assertEqual(RestoreLog.objects.count(), 1)
+        self.assert_cleaned_up(job['id'])
+
+    def test_cancelled_while_queued(self):
+        def cancel_then_run(job_id, *args, **kwargs):
+            jobs.request_cancel(job_id)
+            jobs.run_job(job_id, *args, **kwargs)
+
+        response = self.upload(self.archive(), start_job=cancel_then_run)
+        self.assertEqual(jobs.get_job(response.json()['id'])['status'], jobs.CANCELLED)
+        self.load_database.assert_not_called()
+        self.assert_cleaned_up(response.json()['id'])
+
+    def test_cancelled_during_upload(self):
+        with mock.patch.object(jobs, 'cancel_requested', return_value=True):
+            response = self.upload(self.archive())
+        self.assertEqual((response.status_code, response.json()['status']), (202, jobs.CANCELLED))
+        self.load_database.assert_not_called()
+        self.assert_cleaned_up(response.json()['id'])
+
+    def test_invalid_archives(self):
+        archive = self.archive()
+        invalid = {
+            'truncated': archive[:len(archive) // 2],
+            'not gzip': b'this is not a backup' * 1000,
+            'path traversal': self.archive({'../escape.txt': b'x'}),
+            'no database': self.archive({'media/a.png': b'x'}),
+        }
+        for name, data in invalid.items():
+            with self.subTest(name), self.assertLogs('api', 'ERROR'):
+                response = self.upload(data)
+                job = jobs.get_job(response.json()['id'])
+                if name == 'no database':  # Only noticed once the job looks for it
+                    self.assertEqual((response.status_code, job['status']), (202, jobs.FAILED))
+                else:
+                    self.assertEqual((response.status_code, job['status']), (400, jobs.FAILED))
+                self.assert_cleaned_up(job['id'])
+        self.assertFalse(os.path.exists(os.path.join(self.root, 'escape.txt')))
+        self.load_database.assert_not_called()
+        self.assertEqual(self.client.post('/api/restore/', {}, format='multipart').status_code, 400)
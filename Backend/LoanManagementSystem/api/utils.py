@@ -1,60 +1,119 @@
-from datetime import timedelta
-from decimal import Decimal, ROUND_HALF_UP
-from api.models import Amortization
+import time
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from api.models import Amortization, LoanLedger
+from api.amortization import build_loan_schedule
+from api.summaries import refresh_loan_summaries
+from api.conditional import bump_table_versions
+from api.payments import new_ledgers
+
+# Cache key for the aggregated dashboard summary served by dashboard_summary
+DASHBOARD_SUMMARY_CACHE_KEY = 'dashboard_summary'
+DASHBOARD_SUMMARY_CACHE_TIMEOUT = 300  # Seconds; signals invalidate earlier on writes
+
+
+# Version of the loans/schedules data behind api.analytics; results and snapshots are keyed on it
+PORTFOLIO_VERSION_KEY = 'portfolio_version'
+
+
+def invalidate_dashboard_summary():
+    # Drop the cached dashboard summary so the next request recomputes it
+    cache.delete(DASHBOARD_SUMMARY_CACHE_KEY)
+
+
+def invalidate_portfolio_analytics():
+    # New version: every process reloads its analytics snapshot on next use
+    cache.set(PORTFOLIO_VERSION_KEY, time.time_ns(), None)
+
+def schedules_changed():
+    # bulk_create skips post_save: drop what the signals would have, once the schedules are committed
+    invalidate_dashboard_summary()
+    invalidate_portfolio_analytics()
+    bump_table_versions('amortization')
+
+
+def schedule_to_models(loan, schedule):
+    # Unsaved Amortization instances for a list of amortization.ScheduleRow
+    return [Amortization(loan=loan, **row._asdict()) for row in schedule]
+
+
+def open_ledgers(schedules, batch_size=1000):
+    """
+    Writes the LoanLedger each new schedule ({loan_id: ScheduleRow list}) starts with.
+    Its updated_at is the schedule's version (api.conditional); a ledger left over from
+    a deleted schedule starts again from the new one.
+    """
+    LoanLedger.objects.bulk_create(
+        [LoanLedger(loan_id=loan_id, installments=len(schedule), principal_balance=sum(row.principal for row in schedule))
+         for loan_id, schedule in schedules.items()],
+        batch_size=batch_size, update_conflicts=True, unique_fields=['loan'],
+        update_fields=['installments', 'next_seq', 'principal_balance', 'principal_paid', 'interest_paid', 'credit',
+                       'payment_count', 'last_payment_date', 'updated_at'],
+    )
+
+
+def touch_ledgers(loan_ids):
+    # New schedule versions for loans whose installments were written one by one (signals)
+    if LoanLedger.objects.filter(loan_id__in=loan_ids).update(updated_at=timezone.now()) < len(loan_ids):
+        # Schedules generated before ledgers were opened with them
+        LoanLedger.objects.bulk_create(new_ledgers(loan_ids), ignore_conflicts=True)
+
 
 def generate_amortization_schedule(loan, amortization):
     # Print start of schedule generation for debugging
     print(f"Generating amortization schedule for loan {loan.id} with fixed amortization {amortization}...")
 
-    # Check if amortization schedule for this loan already exists to avoid duplicates
-    if Amortization.objects.filter(loan=loan).exists():
-        print("Amortization records already exist.")
-        return
-
-    seq = 1  # Sequence number of amortization payment
-    due_date = loan.payment_start_date  # Initial due date
-    remaining_balance = Decimal(loan.loan_amount)  # Starting loan principal balance
-    amortization = Decimal(amortization)  # Fixed amortization payment amount
-
-    # Monthly interest rate calculated from annual interest percentage
-    monthly_rate = (Decimal(loan.interest) / Decimal('100')) / Decimal('12')
-
-    term = loan.term  # Number of months for loan term
-
-    for month in range(1, term + 1):
-        # Calculate interest for current month based on remaining balance
-        interest = (remaining_balance * monthly_rate).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-        # Calculate principal portion by subtracting interest from amortization payment
-        principal = (amortization - interest).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-
-        # Adjust principal and amortization if principal payment exceeds remaining balance (final payment)
-        if principal > remaining_balance:
-            principal = remaining_balance
-            amortization = (principal + interest).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-
-        # Subtract principal payment from remaining balance and round
-        remaining_balance -= principal
-        remaining_balance = remaining_balance.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-
-        # Create amortization record with all calculated fields and save to DB
-        amort = Amortization(
-            loan=loan,
-            seq=seq,
-            due_date=due_date,
-            amortization=float(amortization),
-            principal=float(principal),
-            interest=float(interest),
-            remaining_balance=float(max(remaining_balance, Decimal('0.00')))  # Ensure balance not negative
-        )
-        amort.save()
+    with transaction.atomic():
+        # Check if amortization schedule for this loan already exists to avoid duplicates
+        if Amortization.objects.filter(loan=loan).exists():
+            print("Amortization records already exist.")
+            return []
 
-        # Increment sequence number and move due date to next month (+30 days)
-        seq += 1
-        due_date += timedelta(days=30)
+        # Compute the whole schedule in memory, then write it with a single INSERT
+        schedule = build_loan_schedule(loan, amortization)
+        records = Amortization.objects.bulk_create(schedule_to_models(loan, schedule))
+        open_ledgers({loan.id: schedule})
 
-        # Exit loop if loan is fully paid off
-        if remaining_balance <= 0:
-            break
+    # bulk_create skips post_save, so refresh the summary and drop the caches explicitly
+    refresh_loan_summaries([loan.id])
+    transaction.on_commit(schedules_changed)
 
     # Print confirmation that records were created
     print("Amortization records created.")
+    return records
+
+
+def generate_amortization_schedules(loans, amortizations=None, batch_size=1000):
+    """
+    Builds schedules for many released loans in one pass.
+
+    `amortizations` optionally maps loan id -> fixed amortization; loans without an entry
+    use the level payment for their amount, rate and term. Loans that are not released or
+    already have a schedule are skipped. Returns {loan_id: number of installments created}.
+    """
+    amortizations = amortizations or {}
+    loans = [loan for loan in loans if loan.status == 'released']
+
+    with transaction.atomic():
+        # One query to find which loans already have schedules
+        existing = set(
+            Amortization.objects.filter(loan__in=loans).values_list('loan_id', flat=True).distinct()
+        )
+        records = []
+        schedules = {}
+        for loan in loans:
+            if loan.id in existing:
+                continue
+            schedule = build_loan_schedule(loan, amortizations.get(loan.id))
+            records.extend(schedule_to_models(loan, schedule))
+            schedules[loan.id] = schedule
+
+        Amortization.objects.bulk_create(records, batch_size=batch_size)
+        open_ledgers(schedules, batch_size)
+    created = {loan_id: len(schedule) for loan_id, schedule in schedules.items()}
+
+    refresh_loan_summaries(created)
+    if created:
+        transaction.on_commit(schedules_changed)
+    return created
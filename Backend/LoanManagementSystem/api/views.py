@@ -1,12 +1,15 @@
 from rest_framework import status
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
-from .models import User, Member, Loans, Amortization, BackupLog, RestoreLog
+from .models import User, Member, MemberSignature, Loans, Amortization, LoanSummary, Payment, BackupLog, RestoreLog
 from auditlog.models import LogEntry
 from .serializers import UserSerializer, LoanSerializer, AmortizationSerializer, AuditLogSerializer
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from .serializers import MemberSerializer
+from .serializers import MemberSerializer, LoanQuoteSerializer, ReportExportSerializer, LoanSummarySerializer, LoanStatusBatchSerializer
+from .serializers import AuditLogFilterSerializer, AuditLogHistorySerializer, HistoryStateSerializer
+from .serializers import PaymentSerializer, PaymentLineSerializer, LoanLedgerSerializer
+from django.contrib.contenttypes.models import ContentType
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework_simplejwt.tokens import RefreshToken
@@ -19,28 +22,39 @@ from rest_framework import generics
 from django.conf import settings
 from auditlog.middleware import set_actor
 from django.shortcuts import get_object_or_404
-from openpyxl import load_workbook
-from io import BytesIO
 import datetime
-from django.http import HttpResponse
+from django.http import HttpResponse, FileResponse
 import os
 from api.backup_restore import backup_view, restore_view  # import the views
 from rest_framework.response import Response
-from django.db.models import Q
+from django.db.models import Count, Sum, Max
+from django.core.cache import cache
+from django.utils import timezone
+from decimal import Decimal, InvalidOperation
+import time
+from api.utils import DASHBOARD_SUMMARY_CACHE_KEY, DASHBOARD_SUMMARY_CACHE_TIMEOUT
+from api.authentication import user_cache
+from api.pagination import ListCursorPagination, paginated_list_response, parse_fields_param
+from api import search, reports, jobs, analytics, summaries, imports, loan_batches, audit, audit_archive, history, pictures, signatures, profiling, payments
+from django.views.static import serve
+from django.utils.cache import patch_cache_control
+from api.amortization import DUE_DATE_STEP, normalize_quote, quote_schedule, summarize_schedule
+from api.conditional import on_tables, on_schedule
 
 #---USERS--------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 
 @permission_classes([IsAuthenticated])
 # Get all users
 @api_view(['GET'])
+@on_tables('user')  # ETag / Last-Modified; If-None-Match gets a 304 without reading users
 def user_list(request):
     if request.method == 'GET':
         users = User.objects.all()
-        serializer = UserSerializer(users, many=True)
-        return Response(serializer.data)
+        return paginated_list_response(request, users, UserSerializer)  # Cursor paged, supports ?fields=
 @permission_classes([IsAuthenticated])
 # Get a single user by ID
 @api_view(['GET'])
+@on_tables('user')
 def user_detail(request, pk):
     try:
         user = User.objects.get(pk=pk)
@@ -87,36 +101,15 @@ def update_user(request, pk):
 
 @api_view(['GET'])
 def search_users(request, query):
-  
-    if query.isdigit():
-        users = User.objects.filter(
-            Q(firstname__icontains=query) |
-            Q(lastname__icontains=query) |
-            Q(id=int(query))  # Convert to an integer for numeric ID search
-        )
-    else:
-        users = User.objects.filter(
-            Q(firstname__icontains=query) |
-            Q(lastname__icontains=query)
-        )
-    
+    # Ranked prefix search over the token index (names, username, numeric ID)
+    users = search.search(User.objects.all(), query, search.parse_limit(request))
     serializer = UserSerializer(users, many=True)
     return Response(serializer.data)
 
 @api_view(['GET'])
 def search_members(request, query):
-    if query.isdigit():
-        members = Member.objects.filter(
-            Q(firstname__icontains=query) |
-            Q(lastname__icontains=query) |
-            Q(id=int(query))
-        )
-    else:
-        members = Member.objects.filter(
-            Q(firstname__icontains=query) |
-            Q(lastname__icontains=query)
-        )
-
+    # Ranked prefix search over the token index (names, service_no, unit_assignment, numeric ID)
+    members = search.search(Member.objects.all(), query, search.parse_limit(request))
     serializer = MemberSerializer(members, many=True)
     return Response(serializer.data)
 #---LOGIN/AUTH/JWT--------------------------------------------------------------------------------------------------------------------------------------------------------------------------
@@ -230,14 +223,43 @@ def protected_view(request):
         'usertype': request.user.usertype
     })
     
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def auth_cache_stats(request):
+    """
+    Hit rate of this process's authenticated-user cache and the lookup time it saved
+    (admins only). ?reset=true zeroes the counters after reading them.
+    """
+    if request.user.usertype != User.ADMIN:
+        return Response({'detail': 'Admins only.'}, status=status.HTTP_403_FORBIDDEN)
+    stats = user_cache.stats()
+    if request.query_params.get('reset', '').lower() in ('1', 'true', 'yes'):
+        user_cache.reset_stats()
+    return Response(stats)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def profiling_summary(request):
+    """
+    p50/p95/p99 wall time, database time, serializer time and query count per endpoint,
+    from this process's sampled requests (api.profiling; admins only). Slowest in total
+    first. ?reset=true starts a new window after reading.
+    """
+    if request.user.usertype != User.ADMIN:
+        return Response({'detail': 'Admins only.'}, status=status.HTTP_403_FORBIDDEN)
+    summary = profiling.endpoint_stats.summary()
+    if request.query_params.get('reset', '').lower() in ('1', 'true', 'yes'):
+        profiling.endpoint_stats.reset()
+    return Response(summary)
+    
 #---MEMBERS--------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 
 # View to get all members (GET request)
 @api_view(['GET'])
+@on_tables('member')  # ETag / Last-Modified; If-None-Match gets a 304 without reading members
 def get_members(request):
-    members = Member.objects.all()  # Fetch all members from the database
-    serializer = MemberSerializer(members, many=True)  # Serialize the members
-    return Response(serializer.data)  # Return the serialized data as JSON
+    members = Member.objects.all()  # Base queryset; narrowed by ?fields= and paged by cursor
+    return paginated_list_response(request, members, MemberSerializer)
 
 @api_view(['POST'])
 def create_member(request):
@@ -248,6 +270,25 @@ def create_member(request):
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def import_members(request):
+    """
+    Creates members from an uploaded .csv or .xlsx file (multipart field "file") whose
+    header row names the member fields. Valid rows are imported; the response lists the
+    rows that were skipped and why. With dry_run=true the file is only validated.
+    """
+    upload = request.FILES.get('file')
+    if upload is None:
+        return Response({'detail': 'Upload a .csv or .xlsx file in the "file" field.'}, status=status.HTTP_400_BAD_REQUEST)
+    dry_run = str(request.data.get('dry_run', '')).lower() in ('1', 'true', 'yes')
+
+    try:
+        report = imports.import_members(imports.read_rows(upload, upload.name), actor=request.user, dry_run=dry_run)
+    except ValueError as exc:
+        return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({**report, 'dry_run': dry_run})
+
 @permission_classes([IsAuthenticated])
 # View to update an existing member
 @api_view(['PUT', 'PATCH'])
@@ -267,21 +308,54 @@ def update_member(request, pk):
         return Response(serializer.data)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+@api_view(['GET'])
+@on_tables('membersignature')
+def member_signature(request, pk):
+    # The signature image itself, decompressed; member lists only carry its URL
+    signature = MemberSignature.objects.filter(member_id=pk).first()
+    if signature is None:
+        return Response({'detail': 'Signature not found'}, status=status.HTTP_404_NOT_FOUND)
+    raw = signatures.decode(signature)
+    if signatures.is_image(signature.mime_type, raw):
+        response = HttpResponse(raw, content_type=signature.mime_type)
+    else:
+        # Converted free text (or anything stored before images were enforced): a download, never a page
+        response = HttpResponse(raw, content_type=signatures.TEXT if signature.mime_type == signatures.TEXT else 'application/octet-stream')
+        response['Content-Disposition'] = f'attachment; filename="signature-{pk}"'
+    response['Content-Security-Policy'] = 'sandbox'
+    response['X-Content-Type-Options'] = 'nosniff'
+    return response
+
+def serve_derived_image(request, path, document_root=None):
+    # Derived pictures (api.pictures) never change under their content-hash path: clients keep them for good
+    response = serve(request, path, document_root=document_root)
+    patch_cache_control(response, public=True, max_age=pictures.IMMUTABLE_MAX_AGE, immutable=True)
+    return response
+
 #---LOANS--------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 
 
 # View to get all loans (GET request)
 @api_view(['GET'])
+@on_tables('loans', 'member')  # Loans embed their member's details
 def get_loan(request):
+    loans = Loans.objects.all()  # Base queryset; narrowed by ?fields= and paged by cursor
+    return paginated_list_response(request, loans, LoanSerializer)
 
-    loans = Loans.objects.all()  # Fetch all loans from the database
-    serializer = LoanSerializer(loans, many=True)  # Serialize the loans
-    return Response(serializer.data)  # Return the serialized data as JSON
+# Current balances of all loans from the materialized summaries (GET request)
+@api_view(['GET'])
+def loan_summaries(request):
+    summaries.refresh_stale_summaries()  # Only rows whose next due date has passed; indexed
+    loan_summaries = LoanSummary.objects.all()
+    if request.query_params.get('status'):
+        loan_summaries = loan_summaries.filter(status=request.query_params['status'])
+    return paginated_list_response(request, loan_summaries, LoanSummarySerializer, ordering='loan_id')
 
 @api_view(['GET'])
+@on_tables('loans', 'member')
 def search_loan(request, pk):
     try:
-        loan = Loans.objects.get(pk=pk)  # Get the loan by primary key (ID)
+        loan = Loans.objects.select_related('member').get(pk=pk)  # Get the loan and its member in one query
     except Loans.DoesNotExist:
         return Response({'detail': 'Loan not found'}, status=status.HTTP_404_NOT_FOUND)
 
@@ -312,10 +386,30 @@ def update_loan(request, pk):
         return Response(serializer.data)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def batch_update_loan_status(request):
+    """
+    Moves many loans to one status in a single transaction (one UPDATE, bulk audit entries).
+    Each id gets its own result: updated, unchanged, not_found or not_allowed
+    (released and rejected loans can't change). With generate_schedules, newly released
+    loans get their level-payment schedules in the same pass.
+    """
+    serializer = LoanStatusBatchSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    data = serializer.validated_data
+
+    results = loan_batches.transition_loans(data['ids'], data['status'], actor=request.user,
+                                            generate_schedules=data['generate_schedules'])
+    updated = sum(1 for result in results if result['result'] == loan_batches.UPDATED)
+    return Response({'status': data['status'], 'updated': updated, 'results': results})
+
 @api_view(['GET'])
+@on_schedule()  # Per-loan validators: generating the schedule or posting a payment bumps them
 def amortization_list(request, pk):
     try:
-        amortizations = Amortization.objects.filter(loan_id=pk)
+        amortizations = Amortization.objects.filter(loan_id=pk).order_by('seq')  # Served by the (loan, seq) index
         serializer = AmortizationSerializer(amortizations, many=True)
         return Response(serializer.data)
     except Amortization.DoesNotExist:
@@ -336,152 +430,385 @@ def create_amortization_schedule(request, pk):
         return Response({"error": "Amortization value required."}, status=400)
 
     try:
-        amortization = float(amortization)
-    except ValueError:
+        amortization = Decimal(str(amortization))  # Keep exact cents; floats would round
+    except InvalidOperation:
+        return Response({"error": "Invalid amortization value."}, status=400)
+    if not amortization.is_finite() or amortization <= 0:
         return Response({"error": "Invalid amortization value."}, status=400)
 
- 
-    generate_amortization_schedule(loan, amortization) #Calls this function to generate schedule
+    # Builds the schedule in memory and inserts it in one bulk write
+    amortizations = generate_amortization_schedule(loan, amortization)
 
-    # After generating, query the created amortizations
-    amortizations = Amortization.objects.filter(loan=loan).order_by('seq')
     serializer = AmortizationSerializer(amortizations, many=True)
     return Response(serializer.data, status=201)
 
+@api_view(['POST'])
+def loan_quote(request):
+    """
+    Prices a loan without saving anything. Returns the schedule for one
+    amount/interest/term, or, when `terms` and/or `interests` lists are given,
+    a summary for every combination in the grid (add include_schedule to get rows too).
+    Omitting `amortization` solves for the level monthly payment.
+    As for saved loans, payment_start_date is the first due date; without one, the
+    first payment falls `grace` periods after today.
+    """
+    serializer = LoanQuoteSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    data = serializer.validated_data
+
+    start_date = data.get('payment_start_date') or timezone.localdate() + DUE_DATE_STEP * data['grace']
+    grid = 'terms' in data or 'interests' in data
+    include_schedule = data.get('include_schedule', not grid)
+
+    quotes = []
+    for term in data.get('terms', [data.get('term')]):
+        for interest in data.get('interests', [data.get('interest')]):
+            # Identical normalized inputs are served from the LRU cache
+            key = normalize_quote(data['loan_amount'], interest, term, start_date, data.get('amortization'))
+            schedule = quote_schedule(*key)
+            quote = {'term': key[2], 'interest': key[1], **summarize_schedule(schedule)}
+            if include_schedule:
+                quote['schedule'] = AmortizationSerializer(schedule, many=True).data
+            quotes.append(quote)
+
+    if grid:
+        return Response({'loan_amount': data['loan_amount'], 'payment_start_date': start_date, 'quotes': quotes})
+    return Response({'loan_amount': data['loan_amount'], 'payment_start_date': start_date, **quotes[0]})
+
+#---PAYMENTS--------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+@api_view(['GET', 'POST'])
+@on_tables('payment')  # GET only; posting passes straight through
+def loan_payments(request, pk):
+    """
+    GET lists the loan's payments (cursor-paged, ?fields= like the other lists).
+    POST posts one payment ({"amount", "paid_on"?, "reference"?}), applied to the
+    installments interest first; returns the payment and the loan's updated ledger.
+    """
+    if request.method == 'GET':
+        return paginated_list_response(request, Payment.objects.filter(loan_id=pk), PaymentSerializer)
+
+    data = request.data.copy()
+    data['loan_id'] = pk
+    serializer = PaymentLineSerializer(data=data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    data = serializer.validated_data
+    try:
+        payment = payments.post_payment(pk, data['amount'], data.get('paid_on'), data.get('reference', ''), actor=request.user)
+    except ValueError as exc:
+        return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({
+        'payment': PaymentSerializer(payment).data,
+        'ledger': LoanLedgerSerializer(payments.ledger_for(pk)).data,
+    }, status=status.HTTP_201_CREATED)
+
+@api_view(['GET'])
+def loan_ledger(request, pk):
+    # Running totals kept by every posting: balance, what was paid, the next installment due
+    ledger = payments.ledger_for(pk)
+    if ledger is None:
+        return Response({'detail': 'Loan has no amortization schedule.'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(LoanLedgerSerializer(ledger).data)
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def post_payroll(request):
+    """
+    Posts a payroll deduction file (multipart field "file", .csv or .xlsx) with loan_id and
+    amount columns, and optional paid_on and reference columns that default to the
+    paid_on and reference fields of the request. Valid rows are posted; the response lists
+    the rows that were skipped and why. With dry_run=true nothing is kept.
+    """
+    upload = request.FILES.get('file')
+    if upload is None:
+        return Response({'detail': 'Upload a .csv or .xlsx file in the "file" field.'}, status=status.HTTP_400_BAD_REQUEST)
+    dry_run = str(request.data.get('dry_run', '')).lower() in ('1', 'true', 'yes')
+    defaults = PaymentLineSerializer(data={key: request.data[key] for key in ('paid_on', 'reference') if request.data.get(key)},
+                                     partial=True)  # Only the file-wide defaults; each row brings the rest
+    if not defaults.is_valid():
+        return Response(defaults.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        report = payments.post_payroll(
+            imports.read_rows(upload, upload.name, PaymentLineSerializer), paid_on=defaults.validated_data.get('paid_on'),
+            reference=defaults.validated_data.get('reference', ''), actor=request.user, dry_run=dry_run,
+        )
+    except ValueError as exc:
+        return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({**report, 'dry_run': dry_run})
+
+#---DASHBOARD--------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def dashboard_queries():
+    """
+    The independent aggregate queries behind the dashboard, as name -> callable. The sync
+    view runs them one after the other; the async one (api.async_views) concurrently.
+    """
+    return {
+        # One GROUP BY query covers both the status and the loan type breakdowns
+        'grouped': lambda: list(Loans.objects.values('status', 'loan_type').annotate(count=Count('id'), total=Sum('loan_amount'))),
+        # Principal already due on the schedules of released loans
+        'principal_due': lambda: Amortization.objects.filter(
+            loan__status='released', due_date__lte=timezone.localdate()
+        ).aggregate(total=Sum('principal'))['total'],
+        'total_users': User.objects.count,
+        'total_members': Member.objects.count,
+        'last_backup': lambda: BackupLog.objects.aggregate(last=Max('backup_time'))['last'],
+        'last_restore': lambda: RestoreLog.objects.aggregate(last=Max('timestamp'))['last'],
+    }
+
+
+def compute_dashboard_summary(results=None):
+    """
+    Builds the dashboard numbers with database aggregates instead of serializing every row.
+    Loan totals are grouped once by (status, loan_type) and folded into both breakdowns here.
+    `results` are the dashboard_queries() results when they were already run.
+    """
+    if results is None:
+        results = {name: query() for name, query in dashboard_queries().items()}
+    zero = Decimal('0.00')
+    by_status = {key: {'count': 0, 'total_amount': zero} for key, _ in Loans.STATUS_CHOICES}
+    by_type = {key: {'count': 0, 'total_amount': zero} for key, _ in Loans.LOAN_TYPE_CHOICES}
+    total_loans = 0
+    total_amount = zero
+
+    for row in results['grouped']:
+        amount = row['total'] or zero
+        for bucket, key in ((by_status, row['status']), (by_type, row['loan_type'])):
+            entry = bucket.setdefault(key, {'count': 0, 'total_amount': zero})
+            entry['count'] += row['count']
+            entry['total_amount'] += amount
+        total_loans += row['count']
+        total_amount += amount
+
+    # Outstanding principal = released principal minus principal already due on the schedules
+    released_amount = by_status.get('released', {}).get('total_amount', zero)
+    principal_due = results['principal_due'] or zero
+
+    return {
+        'total_users': results['total_users'],
+        'total_members': results['total_members'],
+        'total_loans': total_loans,
+        'total_loan_amount': total_amount,
+        'loans_by_status': by_status,
+        'loans_by_type': by_type,
+        'outstanding_principal': max(released_amount - principal_due, zero),
+        'last_backup': results['last_backup'],
+        'last_restore': results['last_restore'],
+    }
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def dashboard_summary(request):
+    # Serve the cached summary when available; signals drop it whenever a counted table changes
+    started = time.perf_counter()
+    summary = cache.get(DASHBOARD_SUMMARY_CACHE_KEY)
+    cached = summary is not None
+    if not cached:
+        summary = compute_dashboard_summary()
+        summary['computed_ms'] = round((time.perf_counter() - started) * 1000, 2)  # Cost of the aggregate queries
+        summary['computed_at'] = timezone.now()
+        cache.set(DASHBOARD_SUMMARY_CACHE_KEY, summary, DASHBOARD_SUMMARY_CACHE_TIMEOUT)
+
+    return Response({
+        **summary,
+        'cached': cached,
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 2),  # Time spent serving this request
+    })
+
+#---ANALYTICS--------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def portfolio_analytics(request):
+    # Portfolio projections (api.analytics); ?as_of=YYYY-MM-DD defaults to today, ?months=N to 12
+    try:
+        as_of = request.query_params.get('as_of')
+        as_of = datetime.date.fromisoformat(as_of) if as_of else timezone.localdate()
+        months = int(request.query_params.get('months', analytics.DEFAULT_MONTHS))
+    except ValueError:
+        return Response({'detail': 'as_of must be a YYYY-MM-DD date and months an integer.'}, status=status.HTTP_400_BAD_REQUEST)
+    if not 1 <= months <= analytics.MAX_MONTHS:
+        return Response({'detail': f'months must be between 1 and {analytics.MAX_MONTHS}.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    started = time.perf_counter()
+    result, cached = analytics.portfolio_analytics(as_of, months)
+    return Response({
+        **result,
+        'cached': cached,
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 2),
+    })
+
 #---AUDIT LOGS--------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 
 @permission_classes([IsAuthenticated])
 @api_view(['GET'])
 def get_audit_logs(request):
-    logs = LogEntry.objects.all().order_by('-timestamp')  # Gets all logs, latest first
-    serializer = AuditLogSerializer(logs, many=True)
-    return Response(serializer.data)
+    """
+    Audit entries, latest first, with cursor paging. Optional filters: actor (username),
+    model (user/member/loans), object_id, action (create/update/delete), date_from/date_to.
+    ?latest=N returns just the newest N entries as a plain list (recent activity).
+    """
+    return audit_log_response(request)
+
+def audit_log_response(request):
+    # Body of get_audit_logs, shared with its async version (api.async_views)
+    filters = AuditLogFilterSerializer(data=request.query_params)
+    if not filters.is_valid():
+        return Response(filters.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    logs = audit.filter_entries(LogEntry.objects.all(), filters.validated_data)
+    latest = filters.validated_data.get('latest')
+    if latest:
+        # Fast path: one LIMIT read down the timestamp index, no cursor to build
+        fields, error = parse_fields_param(request, AuditLogSerializer)
+        if error:
+            return Response({'fields': [error]}, status=status.HTTP_400_BAD_REQUEST)
+        logs = AuditLogSerializer.setup_eager_loading(logs.order_by('-timestamp'), fields)[:latest]
+        return Response(AuditLogSerializer(logs, many=True, fields=fields).data)
+    return paginated_list_response(request, logs, AuditLogSerializer, ordering='-timestamp')  # Latest first
 
-#---REPORT GENERATION--------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+@permission_classes([IsAuthenticated])
+@api_view(['GET'])
+def get_archived_audit_logs(request):
+    """
+    Entries moved out of the table by archive_audit_logs, newest first, with the same
+    filters as get_audit_logs. Pages are ?page_size=N long; follow `next` for older entries.
+    """
+    filters = AuditLogFilterSerializer(data=request.query_params)
+    if not filters.is_valid():
+        return Response(filters.errors, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        before_id = int(request.query_params['before_id']) if 'before_id' in request.query_params else None
+        page_size = min(int(request.query_params.get('page_size', ListCursorPagination.page_size)), ListCursorPagination.max_page_size)
+    except ValueError:
+        return Response({'detail': 'before_id and page_size must be integers.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    rows, more = audit_archive.search(filters.validated_data, before_id, max(page_size, 1))
+    next_url = None
+    if more:
+        params = request.query_params.copy()
+        params['before_id'] = rows[-1]['id']
+        next_url = request.build_absolute_uri(f"{request.path}?{params.urlencode()}")
+    return Response({'next': next_url, 'previous': None, 'results': [audit_archive.represent(row) for row in rows]})
+
+def audited_model_or_404(model):
+    models = audit.audited_models()
+    if model not in models:
+        raise Http404(f"No history for model {model}.")
+    return models[model]
 
-def replace_first_occurrence(ws, target_text, replacement, occurrence=1):
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def object_history(request, model, pk):
     """
-    Searches the worksheet for cells whose value exactly equals target_text.
-    When the nth occurrence (n = occurrence) is found, that cell’s value is replaced.
+    Change timeline of one user, member or loan, latest first, with cursor paging.
+    Each entry lists the changed fields as {field: [old, new]}.
     """
-    count = 0
-    # Iterate over all cells in the worksheet row by row
-    for row in ws.iter_rows():
-        for cell in row:
-            # Check if cell value matches the target text exactly (case sensitive, trimmed)
-            if cell.value and str(cell.value).strip() == target_text:
-                count += 1
-                # When the target occurrence is reached, replace the cell value and return True
-                if count == occurrence:
-                    cell.value = replacement
-                    return True
-    # If the target occurrence is not found, return False
-    return False
-
-
-def set_merged_cell_value(ws, cell_coordinate, value):
+    content_type = ContentType.objects.get_for_model(audited_model_or_404(model))
+    entries = LogEntry.objects.filter(content_type=content_type, object_id=pk)  # (content_type, object_id, timestamp) index
+    return paginated_list_response(request, entries, AuditLogHistorySerializer, ordering='-timestamp')
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def object_state(request, model, pk):
     """
-    Writes a value into the cell specified by cell_coordinate.
-    If that cell belongs to a merged range, the value is written into the top-left cell of that range.
+    What a user, member or loan looked like at ?at=<datetime> (default now), rebuilt from
+    the audit log: the latest snapshot checkpoint before that time plus the few diffs after it.
     """
-    # Loop through all merged cell ranges in the worksheet
-    for merged_range in ws.merged_cells.ranges:
-        # Check if the target cell coordinate belongs to this merged range
-        if cell_coordinate in merged_range:
-            # Get the boundaries of the merged range (top-left corner)
-            min_row, min_col, _, _ = merged_range.bounds
-            # Set the value to the top-left cell of the merged range
-            ws.cell(row=min_row, column=min_col, value=value)
-            return
-    # If the cell is not merged, set the value directly
-    ws[cell_coordinate].value = value
+    model_class = audited_model_or_404(model)
+    params = HistoryStateSerializer(data=request.query_params)
+    if not params.is_valid():
+        return Response(params.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    at = params.validated_data.get('at') or timezone.now()
+    return Response({'model': model, 'id': pk, 'at': at, **history.state_at(model_class, pk, at)})
+
+#---REPORT GENERATION--------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def generate_loan_report(request, loan_id):
     """
-    Generates a Loan Report using the pre-formatted "Report Format.xlsx" template.
-
-    -- Top Section Mapping --
-      • Replace the cell with literal "loan_id" with "Loan: {loan_id}".
-      • Replace "date of download" with today's date (dd-mm‑yyyy).
-      • (Do not do any placeholder replacement for "Start of Payment" or "Maturity Date".)
-      • Replace the 2nd occurrence of "Interest" with the loan’s interest value.
-      • Set cell P11 with the Loan Amount (for formula inputs) and R33 with the same value.
-      • Set R16 with the term and O24 with the loan type; clear O26.
-      • --- FINAL DATE REVISION ---
-           Forcefully assign the **actual date objects** from the loan record to cells R27 and R28.
-           (Here, R27 will get **payment_start_date** [the correct field name] and
-            R28 will get **maturity_date**. Their number formats are forced to "DD-MM-YYYY".)
-
-    -- Amortization Table Mapping (records start at row 34) --
-      • Column A (index 1): record.seq
-      • Column C (index 3): record.due_date (formatted as dd‑mm‑yyyy)
-      • Column O (index 15): record.principal
-      • Column P (index 16): record.interest
-      • Column Q (index 17): record.amortization
-      • Column R (index 18): record.remaining_balance
-
-    All date cells are forced to display as "DD-MM-YYYY".
+    Generates a Loan Report using the pre-formatted "Report Format.xlsx" template
+    (see api.reports for the cell mapping). The template is parsed once per process
+    and the finished workbook is streamed from a spooled temp file.
     """
     # Retrieve the loan instance by primary key or return 404 if not found
     loan = get_object_or_404(Loans, pk=loan_id)
 
-    # Get today's date formatted as string dd-mm-yyyy for header replacement
-    today = datetime.date.today().strftime("%d-%m-%Y")
+    # Fetch amortization records related to the loan, ordered by sequence number
+    amortizations = Amortization.objects.filter(loan=loan).order_by("seq")
+
+    output = reports.render_loan_report(loan, amortizations)
+
+    # Stream the Excel file for download in chunks
+    return FileResponse(
+        output,
+        as_attachment=True,
+        filename=f'Loan_Report_{loan.id}.xlsx',
+        content_type=reports.XLSX_CONTENT_TYPE,
+    )
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def create_report_export(request):
+    """
+    Starts a background job that renders the report of every loan matching the
+    filters (status, loan_type, member, date_from/date_to on payment_start_date)
+    into one zip. Poll /api/jobs/<id>/ for progress, then fetch /api/jobs/<id>/download/.
+    """
+    serializer = ReportExportSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-    # Load the Excel template workbook
-    template_path = os.path.join(settings.BASE_DIR, "template", "excel", "Report Format.xlsx")
-    wb = load_workbook(template_path)
-    ws = wb.active
+    job = jobs.create_job('loan_report_export', serializer.validated_data, request.user)
+    jobs.start_job(job['id'], reports.export_loan_reports, job['params'])
+    return Response(job, status=status.HTTP_202_ACCEPTED)
 
-    # Replace placeholders in the template's header cells
-    replace_first_occurrence(ws, "loan_id", f"Loan: {loan.id}", occurrence=1)
-    replace_first_occurrence(ws, "date of download", today, occurrence=1)
-    replace_first_occurrence(ws, "Interest", loan.interest, occurrence=2)
+#---BACKGROUND JOBS--------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 
-    # Set specific cells with loan data; handle merged cells properly
-    set_merged_cell_value(ws, "P11", loan.loan_amount)  # Loan amount for formulas
-    ws["R33"].value = loan.loan_amount  # Loan amount repeated
-    set_merged_cell_value(ws, "R16", loan.term)  # Loan term in months
-    set_merged_cell_value(ws, "O24", loan.loan_type)  # Loan type
-    set_merged_cell_value(ws, "O26", "")  # Clear this cell
+def get_job_for(request, job_id):
+    # The job if it exists and belongs to the requesting user (admins see every job)
+    try:
+        job = jobs.get_job(job_id)
+    except ValueError:
+        return None
+    if job and (job['user'] == request.user.username or request.user.usertype == User.ADMIN):
+        return job
+    return None
 
-    # Set actual date objects for payment start and maturity dates with formatting
-    ws["R27"].value = loan.payment_start_date
-    ws["R27"].number_format = "DD-MM-YYYY"
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def job_status(request, job_id):
+    job = get_job_for(request, job_id)
+    if job is None:
+        return Response({'detail': 'Job not found'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(job)
 
-    ws["R28"].value = loan.maturity_date
-    ws["R28"].number_format = "DD-MM-YYYY"
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def cancel_job(request, job_id):
+    if get_job_for(request, job_id) is None:
+        return Response({'detail': 'Job not found'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(jobs.request_cancel(job_id))
 
-    # Fetch amortization records related to the loan, ordered by sequence number
-    amortizations = Amortization.objects.filter(loan=loan).order_by("seq")
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def download_job_result(request, job_id):
+    job = get_job_for(request, job_id)
+    if job is None:
+        return Response({'detail': 'Job not found'}, status=status.HTTP_404_NOT_FOUND)
+    if job['status'] != jobs.COMPLETED:
+        return Response({'detail': f"Job is {job['status']}."}, status=status.HTTP_409_CONFLICT)
+    try:
+        result = open(jobs.job_file(job_id, job['result'] or ''), 'rb')
+    except (FileNotFoundError, IsADirectoryError):
+        return Response({'detail': 'Job has no file to download.'}, status=status.HTTP_404_NOT_FOUND)
+    return FileResponse(result, as_attachment=True, filename=job['result'])
 
-    current_row = 34  # Starting row for amortization table in the sheet
-    for record in amortizations:
-        # Write amortization schedule data to the correct columns and rows
-        ws.cell(row=current_row, column=1, value=record.seq)  # Sequence number
-        ws.cell(row=current_row, column=3, value=record.due_date)  # Due date
-        ws.cell(row=current_row, column=3).number_format = "DD-MM-YYYY"  # Date format
-        ws.cell(row=current_row, column=15, value=record.principal)  # Principal amount
-        ws.cell(row=current_row, column=16, value=record.interest)  # Interest amount
-        ws.cell(row=current_row, column=17, value=record.amortization)  # Amortization payment
-        ws.cell(row=current_row, column=18, value=record.remaining_balance)  # Remaining balance
-        current_row += 1  # Move to next row for next record
-
-    # Save the workbook to an in-memory bytes buffer
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-
-    # Prepare HTTP response with the Excel file for download
-    response = HttpResponse(
-        output,
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
-    response['Content-Disposition'] = f'attachment; filename=Loan_Report_{loan.id}.xlsx'
-    return response
 #---BACKUP & RESTORE--------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 
 @api_view(["GET"])
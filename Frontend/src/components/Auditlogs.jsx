@@ -13,10 +13,10 @@ export default function AuditLogs() {
     fetchAuditLogs();
   }, []);
 
-  // Function to fetch audit logs from the backend API
+  // Function to fetch the most recent audit logs from the backend API
   const fetchAuditLogs = async () => {
     try {
-      const response = await axios.get('http://localhost:8000/api/auditlogs/');
+      const response = await axios.get('http://localhost:8000/api/auditlogs/?latest=200');
       setLogs(response.data); // Store logs in state
     } catch (err) {
       setError('Error fetching audit logs'); // Set error if request fails
@@ -11,16 +11,47 @@ export default function Backup() {
   // Timestamp of last successful backup download
   const [timestamp, setTimestamp] = useState('');
 
+  // Progress (0-100) of the running backup job
+  const [progress, setProgress] = useState(null);
+  // Id of the running backup job, used for cancelling
+  const [jobId, setJobId] = useState(null);
+
+  // Poll the backup job until it finishes
+  const waitForJob = async (id) => {
+    while (true) {
+      const { data } = await axios.get(`http://localhost:8000/api/jobs/${id}/`);
+      setProgress(data.progress);
+      if (['completed', 'failed', 'cancelled'].includes(data.status)) {
+        return data;
+      }
+      await new Promise((resolve) => setTimeout(resolve, 1000));
+    }
+  };
+
   // Function to handle actual backup download after confirmation
   const handleBackupClick = async () => {
     setShowModal(false);  
     setLoading(true);     
     setMessage('');       // Clear any previous messages
     setTimestamp('');     // Clear previous timestamp
+    setProgress(0);
 
     try {
-      // Send GET request to backup endpoint expecting a blob (file)
-      const response = await axios.get('http://localhost:8000/api/backup/', {
+      // Start the backup as a background job, then wait for it
+      const { data: started } = await axios.post('http://localhost:8000/api/backup/');
+      setJobId(started.id);
+      const job = await waitForJob(started.id);
+      if (job.status === 'cancelled') {
+        setMessage('Backup cancelled.');
+        return;
+      }
+      if (job.status !== 'completed') {
+        setMessage(`Backup failed: ${job.error}`);
+        return;
+      }
+
+      // Download the finished archive as a blob (file)
+      const response = await axios.get(`http://localhost:8000/api/jobs/${started.id}/download/`, {
         responseType: 'blob',
       });
 
@@ -29,7 +60,7 @@ export default function Backup() {
       const link = document.createElement('a');
       link.href = url;
       // Set the filename for download
-      link.setAttribute('download', 'backup.tar.gz');
+      link.setAttribute('download', job.result || 'backup.tar.gz');
       document.body.appendChild(link);
       link.click();  // Trigger the download
       link.remove(); // Clean up the link element
@@ -44,6 +75,15 @@ export default function Backup() {
     } finally {
       // Stop loading state in either case
       setLoading(false);
+      setJobId(null);
+      setProgress(null);
+    }
+  };
+
+  // Ask the backend to stop the running backup job
+  const cancelBackup = async () => {
+    if (jobId) {
+      await axios.post(`http://localhost:8000/api/jobs/${jobId}/cancel/`);
     }
   };
 
@@ -64,9 +104,19 @@ export default function Backup() {
           loading ? 'bg-blue-400 cursor-not-allowed' : 'bg-blue-600 hover:bg-blue-700'
         }`}
       >
-        {loading ? 'Downloading...' : 'Download Backup'}
+        {loading ? `Backing up... ${progress ?? 0}%` : 'Download Backup'}
       </button>
 
+      {/* Cancel the running backup job */}
+      {loading && jobId && (
+        <button
+          onClick={cancelBackup}
+          className="w-full py-2 px-4 rounded bg-gray-200 text-gray-800 hover:bg-gray-300"
+        >
+          Cancel Backup
+        </button>
+      )}
+
       {/* Display success or error message and timestamp */}
       {message && (
         <div className="text-sm text-gray-700">
@@ -14,95 +14,34 @@ export default function Dashboard() {
   const [totalMembers, setTotalMembers] = useState(0);
   const [totalLoans, setTotalLoans] = useState(0);
   const [showAuditLogs, setShowAuditLogs] = useState(false);
-  const [auditLogs, setAuditLogs] = useState([]);
   const [lastBackupTime, setLastBackupTime] = useState('');
   const [lastRestoreTime, setLastRestoreTime] = useState('');
 
-  // Fetch all necessary data when the component is mounted
+  // Fetch the aggregated dashboard summary when the component is mounted
   useEffect(() => {
-    fetchUsers();
-    fetchMembers();
-    fetchLoans();
-    fetchLastBackupTime();
-    fetchLastRestoreTime();
+    fetchSummary();
   }, []);
 
-  // Fetch total users from API
-  const fetchUsers = async () => {
+  // Fetch counts and last backup/restore timestamps in a single request
+  const fetchSummary = async () => {
     try {
-      const response = await axios.get('http://localhost:8000/api/users/');
-      setTotalUsers(response.data.length);
+      const response = await axios.get('http://localhost:8000/api/dashboard/summary/');
+      const summary = response.data;
+      setTotalUsers(summary.total_users);
+      setTotalMembers(summary.total_members);
+      setTotalLoans(summary.total_loans);
+      setLastBackupTime(summary.last_backup ? new Date(summary.last_backup).toLocaleString() : 'No backups yet');
+      setLastRestoreTime(summary.last_restore ? new Date(summary.last_restore).toLocaleString() : 'No restores yet');
     } catch (error) {
-      console.error('Error fetching users:', error);
-    }
-  };
-
-  // Fetch total members from API
-  const fetchMembers = async () => {
-    try {
-      const response = await axios.get('http://localhost:8000/api/members/');
-      setTotalMembers(response.data.length);
-    } catch (error) {
-      console.error('Error fetching members:', error);
-    }
-  };
-
-  // Fetch total loans from API
-  const fetchLoans = async () => {
-    try {
-      const response = await axios.get('http://localhost:8000/api/loans/');
-      setTotalLoans(response.data.length);
-    } catch (error) {
-      console.error('Error fetching loans:', error);
-    }
-  };
-
-  // Fetch last backup timestamp from API and format it
-  const fetchLastBackupTime = async () => {
-    try {
-      const response = await axios.get('http://localhost:8000/api/backup/last/');
-      if (response.data.last_backup) {
-        const date = new Date(response.data.last_backup);
-        setLastBackupTime(date.toLocaleString());
-      } else {
-        setLastBackupTime('No backups yet');
-      }
-    } catch (error) {
-      console.error('Error fetching last backup time:', error);
+      console.error('Error fetching dashboard summary:', error);
       setLastBackupTime('Unavailable');
-    }
-  };
-
-  // Fetch last restore timestamp from API and format it
-  const fetchLastRestoreTime = async () => {
-    try {
-      const response = await axios.get('http://localhost:8000/api/restore/last/');
-      if (response.data.last_restore_timestamp) {
-        const date = new Date(response.data.last_restore_timestamp);
-        setLastRestoreTime(date.toLocaleString());
-      } else {
-        setLastRestoreTime('No restores yet');
-      }
-    } catch (error) {
-      console.error('Error fetching last restore time:', error);
       setLastRestoreTime('Unavailable');
     }
   };
 
-  // Toggle audit logs modal; fetch logs if not already shown
-  const handleAuditLogsClick = async () => {
-    if (showAuditLogs) {
-      setShowAuditLogs(false);
-      return;
-    }
-
-    try {
-      const response = await axios.get('http://localhost:8000/api/auditlogs/');
-      setAuditLogs(response.data);
-      setShowAuditLogs(true);
-    } catch (error) {
-      console.error('Error fetching audit logs:', error);
-    }
+  // Toggle audit logs modal; the modal fetches the recent entries itself
+  const handleAuditLogsClick = () => {
+    setShowAuditLogs(!showAuditLogs);
   };
 
   return (
@@ -170,7 +109,7 @@ export default function Dashboard() {
 
       {/* Conditional rendering of Audit Logs modal */}
       {showAuditLogs && (
-        <AuditLogs logs={auditLogs} onClose={() => setShowAuditLogs(false)} />
+        <AuditLogs onClose={() => setShowAuditLogs(false)} />
       )}
     </div>
   );
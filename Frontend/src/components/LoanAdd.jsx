@@ -20,7 +20,7 @@ export default function LoanAdd({ onLoanAdded, closeAddModal }) {
     useEffect(() => {
         const fetchMembers = async () => {
             try {
-                const response = await axios.get('http://localhost:8000/api/members/');
+                const response = await axios.get('http://localhost:8000/api/members/?paginate=false');
                 setMembers(response.data); 
             } catch (error) {
                 console.error('Error fetching members:', error);
@@ -10,14 +10,15 @@ export default function LoanManagement() {
     const [showAddModal, setShowAddModal] = useState(false);
     const [amortizationLoanId, setAmortizationLoanId] = useState(null);
     const [loanTypeFilter, setLoanTypeFilter] = useState('All');
-    const [selectedLoanId, setSelectedLoanId] = useState(null);
+    const [selectedLoanIds, setSelectedLoanIds] = useState([]);
+    const [checkedLoanIds, setCheckedLoanIds] = useState([]);
     const [selectedNewStatus, setSelectedNewStatus] = useState('');
     const [showConfirmModal, setShowConfirmModal] = useState(false);
 
     // Load loans from backend and sort by most recent payment start date
     const loadLoans = async () => {
         try {
-            const response = await axios.get('http://localhost:8000/api/loans/');
+            const response = await axios.get('http://localhost:8000/api/loans/?paginate=false');
             const sortedLoans = response.data.sort(
                 (a, b) => new Date(b.payment_start_date) - new Date(a.payment_start_date)
             );
@@ -50,21 +51,32 @@ export default function LoanManagement() {
     const openAmortizationModal = (loanId) => setAmortizationLoanId(loanId);
     const closeAmortizationModal = () => setAmortizationLoanId(null);
 
-    // Open confirmation modal before changing loan status
-    const openConfirmModal = (loanId, newStatus) => {
-        setSelectedLoanId(loanId);
+    // Tick or untick a pending loan for a batch status change
+    const toggleChecked = (loanId) => {
+        setCheckedLoanIds(ids => ids.includes(loanId) ? ids.filter(id => id !== loanId) : [...ids, loanId]);
+    };
+
+    // Open confirmation modal before changing the status of one or more loans
+    const openConfirmModal = (loanIds, newStatus) => {
+        setSelectedLoanIds(loanIds);
         setSelectedNewStatus(newStatus);
         setShowConfirmModal(true);
     };
 
-    // Confirm loan status change and update via API
+    // Confirm loan status change; all selected loans are updated in one batch request
     const confirmStatusChange = async () => {
         try {
-            await axios.put(`http://localhost:8000/api/loans/update/${selectedLoanId}/`, {
+            const response = await axios.post('http://localhost:8000/api/loans/status/batch/', {
+                ids: selectedLoanIds,
                 status: selectedNewStatus
             });
+            const skipped = response.data.results.filter(result => result.result !== 'updated' && result.result !== 'unchanged');
+            if (skipped.length > 0) {
+                alert(`${skipped.length} loan(s) could not be changed: ${skipped.map(result => `#${result.id} (${result.result})`).join(', ')}`);
+            }
             setShowConfirmModal(false);
-            setSelectedLoanId(null);
+            setSelectedLoanIds([]);
+            setCheckedLoanIds([]);
             setSelectedNewStatus('');
             loadLoans(); // Refresh loan list
         } catch (error) {
@@ -76,7 +88,7 @@ export default function LoanManagement() {
     // Cancel status change action
     const cancelStatusChange = () => {
         setShowConfirmModal(false);
-        setSelectedLoanId(null);
+        setSelectedLoanIds([]);
         setSelectedNewStatus('');
     };
 
@@ -93,6 +105,23 @@ export default function LoanManagement() {
                 >
                     Add Loan
                 </button>
+                {checkedLoanIds.length > 0 && (
+                    <div>
+                        <span className="mr-2">{checkedLoanIds.length} selected</span>
+                        <button
+                            onClick={() => openConfirmModal(checkedLoanIds, 'released')}
+                            className="bg-green-500 text-white px-4 py-2 rounded-md mr-2"
+                        >
+                            Release Selected
+                        </button>
+                        <button
+                            onClick={() => openConfirmModal(checkedLoanIds, 'reject')}
+                            className="bg-red-500 text-white px-4 py-2 rounded-md"
+                        >
+                            Reject Selected
+                        </button>
+                    </div>
+                )}
                 <div>
                     <label className="mr-2 font-semibold">Filter by Type:</label>
                     <select
@@ -114,6 +143,7 @@ export default function LoanManagement() {
                 <table className="min-w-full table-auto border-collapse border border-gray-300">
                     <thead>
                         <tr>
+                            <th className="border-b px-4 py-2 text-center"></th>
                             <th className="border-b px-4 py-2 text-center">Member</th>
                             <th className="border-b px-4 py-2 text-center">Loan ID</th>
                             <th className="border-b px-4 py-2 text-center">Type</th>
@@ -134,6 +164,14 @@ export default function LoanManagement() {
 
                                 return (
                                     <tr key={loan.id}>
+                                        <td className="border-b px-4 py-2 text-center">
+                                            <input
+                                                type="checkbox"
+                                                disabled={isStatusLocked}
+                                                checked={checkedLoanIds.includes(loan.id)}
+                                                onChange={() => toggleChecked(loan.id)}
+                                            />
+                                        </td>
                                         <td className="border-b px-4 py-2 text-center">{loan.member_details.lastname}</td>
                                         <td className="border-b px-4 py-2 text-center">{loan.id}</td>
                                         <td className="border-b px-4 py-2 text-center">{loan.loan_type}</td>
@@ -147,7 +185,7 @@ export default function LoanManagement() {
                                             <select
                                                 value={loan.status}
                                                 disabled={isStatusLocked}
-                                                onChange={(e) => openConfirmModal(loan.id, e.target.value)}
+                                                onChange={(e) => openConfirmModal([loan.id], e.target.value)}
                                                 className={`border rounded-md px-2 py-1 ${isStatusLocked ? 'bg-gray-200 cursor-not-allowed' : ''}`}
                                             >
                                                 <option value="pending">Pending</option>
@@ -168,7 +206,7 @@ export default function LoanManagement() {
                             })
                         ) : (
                             <tr>
-                                <td colSpan="11" className="text-center py-4">No Records Found!</td>
+                                <td colSpan="12" className="text-center py-4">No Records Found!</td>
                             </tr>
                         )}
                     </tbody>
@@ -197,7 +235,7 @@ export default function LoanManagement() {
                     <div className="bg-white p-6 rounded-lg shadow-lg w-full max-w-md">
                         <h2 className="text-lg font-semibold mb-4">Confirm Status Change</h2>
                         <p className="mb-6">
-                            Are you sure you want to change the loan status to <strong>{selectedNewStatus}</strong>?
+                            Are you sure you want to change the status of {selectedLoanIds.length === 1 ? 'this loan' : `${selectedLoanIds.length} loans`} to <strong>{selectedNewStatus}</strong>?
                         </p>
                         <div className="flex justify-end">
                             <button
@@ -23,7 +23,7 @@ export default function MemberManagement() {
     // Fetch all members from the backend
     const loadMembers = async () => {
         try {
-            const response = await axios.get('http://localhost:8000/api/members/');
+            const response = await axios.get('http://localhost:8000/api/members/?paginate=false');
             setMembers(response.data);
         } catch (error) {
             console.error('Error loading members:', error);
@@ -112,8 +112,10 @@ export default function MemberManagement() {
                     {members.length > 0 ? (
                         members.map((member) => {
                             const isHovered = hoveredMemberId === member.id;
-                            const memberImageUrl = member.member_picture
-                                ? `http://localhost:8000${member.member_picture}`
+                            // Small thumbnail when it has been generated, else the original upload
+                            const memberPicture = member.thumbnail_url || member.member_picture;
+                            const memberImageUrl = memberPicture
+                                ? `http://localhost:8000${memberPicture}`
                                 : placeholderImage;
 
                             return (
@@ -160,8 +162,8 @@ export default function MemberManagement() {
                                     <strong>Picture:</strong>
                                     <img
                                         src={
-                                            selectedMember?.member_picture
-                                                ? `http://localhost:8000${selectedMember.member_picture}`
+                                            selectedMember?.preview_url || selectedMember?.member_picture
+                                                ? `http://localhost:8000${selectedMember.preview_url || selectedMember.member_picture}`
                                                 : placeholderImage
                                         }
                                         alt="Member"
@@ -184,7 +186,11 @@ export default function MemberManagement() {
                                 <p className="text-sm mt-4">
                                     <strong>Signature:</strong>
                                     <img
-                                        src={selectedMember?.member_signature}
+                                        src={
+                                            selectedMember?.signature_url
+                                                ? `http://localhost:8000${selectedMember.signature_url}`
+                                                : placeholderImage
+                                        }
                                         alt="Signature"
                                         className="mt-1 w-full h-auto max-h-32 object-contain border border-gray-300"
                                         onError={(e) => (e.target.src = placeholderImage)}
@@ -114,7 +114,7 @@ export default function MemberUpdate({ selectedMember, onUpdate }) {
         }
 
         // Check signature only if user cleared the signature pad
-        if (signaturePadRef.current && signaturePadRef.current.isEmpty() && !selectedMember.member_signature) {
+        if (signaturePadRef.current && signaturePadRef.current.isEmpty() && !selectedMember.signature_url) {
             newErrors.member_signature = 'Signature is required';
         }
 
@@ -166,16 +166,16 @@ export default function MemberUpdate({ selectedMember, onUpdate }) {
 
         // Add all form fields to FormData object
         for (const [key, value] of Object.entries(formData)) {
-            updateData.append(key, value);
+            if (key !== 'member_signature') {
+                updateData.append(key, value);
+            }
         }
 
-        // Add signature data if provided, otherwise keep existing signature
+        // Add signature data if provided; leaving it out keeps the existing signature
+        // (the member list no longer carries it, and a blank value would remove it)
         if (signaturePadRef.current && !signaturePadRef.current.isEmpty()) {
             const signatureData = signaturePadRef.current.toDataURL();
             updateData.append('member_signature', signatureData);
-        } else {
-            // If the signature pad is empty, keep the existing signature
-            updateData.append('member_signature', selectedMember.member_signature || '');
         }
     
         // Add picture file if provided
@@ -12,7 +12,7 @@ export default function ReportGeneration() {
     // Fetch loans from API and sort them by start date (most recent first)
     const loadLoans = async () => {
         try {
-            const response = await axios.get('http://localhost:8000/api/loans/');
+            const response = await axios.get('http://localhost:8000/api/loans/?paginate=false');
             const sortedLoans = response.data.sort(
                 (a, b) => new Date(b.payment_start_date) - new Date(a.payment_start_date)
             );
@@ -12,6 +12,8 @@ export default function BackupRestore() {
   const [loading, setLoading] = useState(false);
   // Controls display of confirmation modal
   const [showModal, setShowModal] = useState(false);
+  // Progress (0-100) of the upload and restore job
+  const [progress, setProgress] = useState(null);
 
   // Handle file selection from file input
   const handleFileChange = (e) => {
@@ -43,13 +45,27 @@ export default function BackupRestore() {
     formData.append('backup_file', selectedFile);
 
     try {
-      // Send POST request to restore endpoint
-      const response = await axios.post('http://localhost:8000/api/restore/', formData, {
+      // Upload the archive; the server extracts it while it streams in and answers with a restore job
+      const { data: started } = await axios.post('http://localhost:8000/api/restore/', formData, {
         headers: { 'Content-Type': 'multipart/form-data' },
+        onUploadProgress: (e) => e.total && setProgress(Math.round((e.loaded * 60) / e.total)),
       });
-      // Display success message and timestamp
-      setMessage(response.data.detail);
-      setTimestamp(response.data.timestamp || '');
+
+      // Poll the restore job until the database and media are loaded
+      let job = started;
+      while (!['completed', 'failed', 'cancelled'].includes(job.status)) {
+        setProgress(job.progress);
+        await new Promise((resolve) => setTimeout(resolve, 1000));
+        ({ data: job } = await axios.get(`http://localhost:8000/api/jobs/${started.id}/`));
+      }
+
+      // Display result message and timestamp
+      if (job.status === 'completed') {
+        setMessage('Restore completed successfully.');
+        setTimestamp(new Date(job.updated_at).toLocaleString());
+      } else {
+        setMessage(job.status === 'cancelled' ? 'Restore cancelled.' : `Restore failed: ${job.error}`);
+      }
     } catch (error) {
       // Display error message if restore fails
       setMessage(error.response?.data?.detail || 'Restore failed.');
@@ -57,6 +73,7 @@ export default function BackupRestore() {
     } finally {
       // Reset loading state
       setLoading(false);
+      setProgress(null);
     }
   };
 
@@ -81,7 +98,7 @@ export default function BackupRestore() {
           loading ? 'bg-blue-400 cursor-not-allowed' : 'bg-blue-600 hover:bg-blue-700'
         }`}
       >
-        {loading ? 'Restoring...' : 'Upload & Restore'}
+        {loading ? `Restoring... ${progress ?? 0}%` : 'Upload & Restore'}
       </button>
 
       {/* Display restore result message and timestamp */}
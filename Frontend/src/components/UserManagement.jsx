@@ -21,7 +21,7 @@ export default function UserManagement() {
     // Fetch all users and filter by status
     const loadUsers = async () => {
         try {
-            const response = await axios.get('http://localhost:8000/api/users/');
+            const response = await axios.get('http://localhost:8000/api/users/?paginate=false');
             const filtered = response.data.filter(user =>
                 filterStatus === 'active' ? user.is_active === 1 :
                 filterStatus === 'inactive' ? user.is_active === 0 :
@@ -39,7 +39,7 @@ export default function UserManagement() {
             let response;
             if (!query || query.trim() === '') {
                 // Fetch all users if query is empty
-                response = await axios.get('http://localhost:8000/api/users/');
+                response = await axios.get('http://localhost:8000/api/users/?paginate=false');
             } else {
                 // Search users by query
                 response = await axios.get(`http://localhost:8000/api/users/search/${query}`);